@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+对比两次 run_bench.py 的结果（如基线提交与当前提交）。
+
+    python bench/compare.py base.json head.json --threshold 1.2
+
+按 (规模, Pass) 列出两边的中位耗时与比值；任一项比值超过 --threshold 时以非零状态退出。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, Tuple
+
+Row = Tuple[int, str, float]
+
+
+def iter_rows(report: Dict[str, Any]) -> Iterable[Row]:
+    for entry in report["results"]:
+        for name, rec in entry["passes"].items():
+            yield entry["contracts"], name, rec["median_s"]
+        yield entry["contracts"], "<pipeline>", entry["pipeline"]["median_s"]
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> int:
+    if base.get("params", {}).get("spec") != head.get("params", {}).get("spec"):
+        print("[WARN] corpus parameters differ; timings are not directly comparable")
+    old = {(size, name): t for size, name, t in iter_rows(base)}
+    regressions = 0
+    print(f"{'contracts':>9}  {'pass':<14} {'base_s':>10} {'head_s':>10} {'ratio':>7}")
+    for size, name, t in iter_rows(head):
+        if (size, name) not in old:
+            print(f"{size:>9}  {name:<14} {'-':>10} {t:>10.4f} {'-':>7}")
+            continue
+        ratio = t / old[(size, name)] if old[(size, name)] > 0 else float("inf")
+        flag = ""
+        if ratio > threshold:
+            regressions += 1
+            flag = "  <-- slower"
+        print(f"{size:>9}  {name:<14} {old[(size, name)]:>10.4f} {t:>10.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare two benchmark result files")
+    ap.add_argument("base", type=str)
+    ap.add_argument("head", type=str)
+    ap.add_argument("--threshold", type=float, default=1.2, help="head/base 超过该比值视为退化")
+    args = ap.parse_args()
+    base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    head = json.loads(Path(args.head).read_text(encoding="utf-8"))
+    print(f"base: {base['revision'].get('commit')}  head: {head['revision'].get('commit')}")
+    regressions = compare(base, head, args.threshold)
+    if regressions:
+        print(f"{regressions} regression(s) above {args.threshold:.2f}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
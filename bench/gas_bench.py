@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+本地 EVM 上的实测 gas 基准：原始合约 vs. 各 Pass/密度下的混淆合约。
+
+    python bench/gas_bench.py --dir solidity_project/src --passes cf,dead,literal,op,layout \
+        --densities 0.3,1.0 --literal-strategies chars,xor --out bench/results/gas.json
+
+对每个变体（original、cf/dead × 密度、op × 改写方式、literal × 编码策略、full 整条管线）：
+1. 用 main 的管线混淆 --dir 下的全部 .sol 文件（Layout 使用项目映射，便于把改名后的函数对应回原名）；
+2. 用本地 solc（--standard-json）编译；
+3. 部署到进程内的 py-evm（eth-tester，无网络），按原函数名排序依次调用每个 public/external 函数，
+   参数按 ABI 类型生成（每个变体的调用序列相同）；
+4. 记录部署 gas、运行时字节码大小、每个函数的 gas（revert 的调用单独标记）。
+结果写成 JSON，并打印相对 original 的变化。
+
+依赖（均为可选，只有本脚本需要）：solc 可执行文件，以及 `pip install "eth-tester[py-evm]" eth-abi eth-utils`。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from run_bench import REPO_ROOT, git_revision  # 同时把 obfusion_project 加入 sys.path
+
+from js_parser import shutdown_pool  # noqa: E402
+from obf_log import configure_logging  # noqa: E402
+from obf_literal import AUTO_STRATEGY, DEFAULT_LITERAL_STRATEGY, LITERAL_STRATEGIES  # noqa: E402
+from obf_mathOperation import OP_MODES  # noqa: E402
+from main import (FileJob, build_passes, derive_file_seed, enumerate_sol_files,  # noqa: E402
+                  prepare_project_layout, run_pipeline)
+
+try:
+    from eth_abi import encode as abi_encode
+    from eth_tester import EthereumTester, PyEVMBackend
+    from eth_tester.exceptions import TransactionFailed
+    from eth_utils import keccak
+except ImportError:  # 只有本脚本需要，缺失时在 main() 中给出提示
+    EthereumTester = None
+
+RESULTS_VERSION = 1
+# StringLiteralPass 不按密度抽样（每个字面量都编码），literal 改为逐个编码策略测量
+DENSITY_PASSES = ("cf", "dead")
+INT_SAMPLES = (7, 3, 5)
+
+
+# ---------------- 混淆 ----------------
+def obfuscate_tree(src_dir: Path, out_dir: Path, enable: List[str], options: Dict[str, Any],
+                   seed: int) -> Dict[str, str]:
+    """
+    用指定的 Pass 组合混淆 src_dir 下全部文件到 out_dir；options 原样交给 build_passes。
+    返回 Layout 的 原名 -> 新名 映射（无 Layout 时为空）。
+    """
+    passes = build_passes(enable, **options)
+    files = [p.relative_to(src_dir).as_posix() for p in enumerate_sol_files(src_dir)]
+    jobs = [FileJob(src_dir, f, out_dir / f, derive_file_seed(seed, f)) for f in files]
+    mapping: Dict[str, str] = {}
+    if "layout" in enable:
+        mapping = prepare_project_layout(jobs, passes, out_dir / "layout_map.json", "counter", seed).mapping
+    for job in jobs:
+        src, _ = run_pipeline(src_dir, job.file_name, passes, seed=job.seed)
+        job.out_path.parent.mkdir(parents=True, exist_ok=True)
+        job.out_path.write_text(src, encoding="utf-8")
+    return mapping
+
+
+# ---------------- 编译 ----------------
+def solc_version(solc: str) -> str:
+    out = subprocess.run([solc, "--version"], capture_output=True, text=True, check=True).stdout
+    return out.strip().splitlines()[-1]
+
+
+def find_project_root(src_dir: Path) -> Path:
+    """src_dir 所在的 Solidity 工程根：向上找到的第一个含 remappings.txt / foundry.toml 的目录，找不到时为 src_dir。"""
+    for d in (src_dir, *src_dir.parents):
+        if (d / "remappings.txt").is_file() or (d / "foundry.toml").is_file():
+            return d
+    return src_dir
+
+
+def read_remappings(project_root: Path) -> List[str]:
+    """工程根下 remappings.txt 的条目（如 "@openzeppelin/=lib/oz/lib"，目标相对工程根）；文件不存在时为空。"""
+    try:
+        text = (project_root / "remappings.txt").read_text(encoding="utf-8")
+    except OSError:
+        return []
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+
+
+def compile_file(solc: str, base_dir: Path, file_name: str, optimize: bool,
+                 project_root: Optional[Path] = None, remappings: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    solc --standard-json 编译一个文件，返回 {合约名: {"abi", "bytecode", "runtime"}}；编译失败抛 RuntimeError。
+    base_dir 是（混淆后的）源码目录；project_root 作为 --include-path，remappings 的目标按它解析。
+    """
+    request = {
+        "language": "Solidity",
+        "sources": {file_name: {"urls": [file_name]}},
+        "settings": {
+            "remappings": list(remappings or []),
+            "optimizer": {"enabled": optimize, "runs": 200},
+            "outputSelection": {"*": {"*": ["abi", "evm.bytecode.object", "evm.deployedBytecode.object"]}},
+        },
+    }
+    cmd = [solc, "--standard-json", "--base-path", str(base_dir)]
+    allow = [str(base_dir)]
+    if project_root is not None and project_root != base_dir:
+        cmd += ["--include-path", str(project_root)]
+        allow.append(str(project_root))
+    proc = subprocess.run(cmd + ["--allow-paths", ",".join(allow)],
+                          input=json.dumps(request), capture_output=True, text=True)
+    output = json.loads(proc.stdout or "{}")
+    errors = [e for e in output.get("errors", []) if e.get("severity") == "error"]
+    if errors or proc.returncode != 0:
+        msg = "; ".join(e.get("formattedMessage", e.get("message", "")).strip() for e in errors) or proc.stderr
+        raise RuntimeError(msg[:2000])
+    contracts = {}
+    for name, c in output.get("contracts", {}).get(file_name, {}).items():
+        contracts[name] = {
+            "abi": c["abi"],
+            "bytecode": c["evm"]["bytecode"]["object"],
+            "runtime": c["evm"]["deployedBytecode"]["object"],
+        }
+    return contracts
+
+
+# ---------------- ABI 参数 ----------------
+def abi_type(param: Dict[str, Any]) -> str:
+    t = param["type"]
+    if t.startswith("tuple"):
+        return "(" + ",".join(abi_type(c) for c in param["components"]) + ")" + t[len("tuple"):]
+    return t
+
+
+def sample_value(param: Dict[str, Any], position: int, sender: str) -> Any:
+    t = param["type"]
+    if t.endswith("]"):
+        base, dim = t[:t.rindex("[")], t[t.rindex("[") + 1:-1]
+        return [sample_value(dict(param, type=base), position + i, sender) for i in range(int(dim) if dim else 2)]
+    if t == "tuple":
+        return tuple(sample_value(c, position + i, sender) for i, c in enumerate(param["components"]))
+    if t.startswith("uint") or t.startswith("int"):
+        return INT_SAMPLES[position % len(INT_SAMPLES)]
+    if t == "address":
+        return sender
+    if t == "bool":
+        return True
+    if t == "string":
+        return "bench"
+    if t == "bytes":
+        return b"bench"
+    if t.startswith("bytes"):
+        return b"\x01" * int(t[len("bytes"):])
+    raise ValueError(f"unsupported ABI type {t}")
+
+
+def encode_args(inputs: List[Dict[str, Any]], sender: str) -> bytes:
+    types = [abi_type(p) for p in inputs]
+    return abi_encode(types, [sample_value(p, i, sender) for i, p in enumerate(inputs)])
+
+
+def signature(entry: Dict[str, Any], rename: Optional[Dict[str, str]] = None) -> str:
+    name = entry["name"]
+    if rename:
+        name = rename.get(name, name)
+    return f"{name}({','.join(abi_type(p) for p in entry['inputs'])})"
+
+
+# ---------------- 部署与调用 ----------------
+class LocalChain:
+    """进程内 py-evm 链（eth-tester）。"""
+
+    def __init__(self, gas_limit: int):
+        params = PyEVMBackend.generate_genesis_params(overrides={"gas_limit": gas_limit})
+        self.tester = EthereumTester(PyEVMBackend(genesis_parameters=params))
+        self.sender = self.tester.get_accounts()[0]
+        self.gas_limit = gas_limit
+
+    def _send(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        tx_hash = self.tester.send_transaction(dict(tx, **{"from": self.sender, "gas": self.gas_limit - 1}))
+        return self.tester.get_transaction_receipt(tx_hash)
+
+    def deploy(self, bytecode: str, ctor_inputs: List[Dict[str, Any]]) -> Tuple[str, int]:
+        data = bytes.fromhex(bytecode) + encode_args(ctor_inputs, self.sender)
+        receipt = self._send({"data": "0x" + data.hex(), "value": 0})
+        return receipt["contract_address"], receipt["gas_used"]
+
+    def call(self, address: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """以交易方式调用（view/pure 函数同样计量执行 gas）；revert 时返回 reverted=True。"""
+        selector = keccak(text=signature(entry))[:4]
+        data = selector + encode_args(entry["inputs"], self.sender)
+        try:
+            receipt = self._send({"to": address, "data": "0x" + data.hex(), "value": 0})
+        except TransactionFailed as e:
+            return {"gas": None, "reverted": True, "reason": str(e)[:200]}
+        return {"gas": receipt["gas_used"], "reverted": False}
+
+
+def measure_contract(chain: LocalChain, contract: Dict[str, Any],
+                     inverse: Dict[str, str]) -> Dict[str, Any]:
+    """部署并调用一个合约的全部函数；函数以原名签名为键、按原名排序调用。"""
+    abi = contract["abi"]
+    ctor = next((e for e in abi if e.get("type") == "constructor"), {"inputs": []})
+    address, deploy_gas = chain.deploy(contract["bytecode"], ctor["inputs"])
+    funcs = sorted((e for e in abi if e.get("type") == "function"), key=lambda e: signature(e, inverse))
+    return {
+        "deploy_gas": deploy_gas,
+        "bytecode_size": len(contract["runtime"]) // 2,
+        "functions": {signature(e, inverse): chain.call(address, e) for e in funcs},
+    }
+
+
+def measure_tree(base_dir: Path, files: List[str], solc: str, optimize: bool, gas_limit: int,
+                 mapping: Dict[str, str], project_root: Optional[Path] = None) -> Dict[str, Any]:
+    inverse = {new: old for old, new in mapping.items()}
+    remappings = read_remappings(project_root) if project_root is not None else []
+    chain = LocalChain(gas_limit)
+    out: Dict[str, Any] = {}
+    for f in files:
+        try:
+            contracts = compile_file(solc, base_dir, f, optimize, project_root, remappings)
+        except RuntimeError as e:
+            out[f] = {"error": str(e)}
+            continue
+        out[f] = {}
+        for name, c in contracts.items():
+            original = inverse.get(name, name)
+            if not c["bytecode"] or "__$" in c["bytecode"]:
+                continue    # 接口/抽象合约，或需要链接外部库
+            try:
+                out[f][original] = measure_contract(chain, c, inverse)
+            except Exception as e:
+                out[f][original] = {"error": f"{type(e).__name__}: {e}"[:500]}
+    return out
+
+
+# ---------------- 汇总 ----------------
+def variants(pass_keys: List[str], densities: List[float], op_modes: List[str],
+             literal_strategies: List[str]) -> List[Tuple[str, List[str], Dict[str, Any]]]:
+    """[(变体名, 启用的 Pass, build_passes 参数)]，第一个是 original"""
+    out: List[Tuple[str, List[str], Dict[str, Any]]] = [("original", [], {})]
+    for key in pass_keys:
+        if key in DENSITY_PASSES:
+            out += [(f"{key}@{d:g}", [key], {f"{key}_density": d}) for d in densities]
+        elif key == "op":
+            out += [(f"op:{m}", ["op"], {"op_mode": m}) for m in op_modes]
+        elif key == "literal":
+            out += [(f"literal:{s}", ["literal"], {"literal_strategy": s}) for s in literal_strategies]
+        else:
+            out.append((key, [key], {}))
+    out.append(("full", ["cf", "dead", "literal", "layout"], {"op_mode": op_modes[0]}))
+    return out
+
+
+def print_summary(results: Dict[str, Dict[str, Any]]) -> None:
+    base = results.get("original", {})
+    print(f"{'variant':<14} {'file:contract':<36} {'deploy':>10} {'Δdeploy':>8} {'size':>7} {'Δsize':>7} {'Δcall(avg)':>10}")
+    for variant, files in results.items():
+        for f, contracts in files.items():
+            if "error" in contracts:
+                print(f"{variant:<14} {f:<36} compile error")
+                continue
+            for name, m in contracts.items():
+                label = f"{f}:{name}"[-36:]
+                if "error" in m:
+                    print(f"{variant:<14} {label:<36} {m['error'][:40]}")
+                    continue
+                b = base.get(f, {}).get(name, {})
+                d_deploy = _pct(m["deploy_gas"], b.get("deploy_gas"))
+                d_size = _pct(m["bytecode_size"], b.get("bytecode_size"))
+                ratios = [_ratio(r["gas"], b.get("functions", {}).get(sig, {}).get("gas"))
+                          for sig, r in m["functions"].items()]
+                ratios = [r for r in ratios if r is not None]
+                d_call = f"{(sum(ratios) / len(ratios) - 1) * 100:+.1f}%" if ratios else "-"
+                print(f"{variant:<14} {label:<36} {m['deploy_gas']:>10} {d_deploy:>8} "
+                      f"{m['bytecode_size']:>7} {d_size:>7} {d_call:>10}")
+
+
+def _ratio(value: Optional[int], base: Optional[int]) -> Optional[float]:
+    return value / base if value is not None and base else None
+
+
+def _pct(value: Optional[int], base: Optional[int]) -> str:
+    r = _ratio(value, base)
+    return f"{(r - 1) * 100:+.1f}%" if r is not None else "-"
+
+
+def _split(value: str) -> List[str]:
+    return [x.strip() for x in value.split(",") if x.strip()]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Measure gas of original vs. obfuscated contracts on a local EVM")
+    ap.add_argument("--dir", type=str, default=str(REPO_ROOT / "solidity_project" / "src"), help="合约目录")
+    ap.add_argument("--passes", type=str, default="cf,dead,literal,op,layout", help="逐个测量的 Pass(逗号分隔)")
+    ap.add_argument("--densities", type=str, default="0.3,1.0", help="cf/dead 的密度(逗号分隔)")
+    ap.add_argument("--op-modes", type=str, default="mba", help=f"op 的改写方式(逗号分隔，可选 {','.join(OP_MODES)})")
+    ap.add_argument("--literal-strategies", type=str, default=DEFAULT_LITERAL_STRATEGY,
+                    help=f"literal 的编码策略(逗号分隔，可选 {','.join(LITERAL_STRATEGIES + (AUTO_STRATEGY,))})")
+    ap.add_argument("--seed", type=int, default=1, help="混淆随机种子")
+    ap.add_argument("--solc", type=str, default="solc", help="solc 可执行文件")
+    ap.add_argument("--no-optimize", action="store_true", help="编译时关闭优化器")
+    ap.add_argument("--gas-limit", type=int, default=30_000_000, help="本地链的区块 gas 上限")
+    ap.add_argument("--out", type=str, default=str(REPO_ROOT / "bench" / "results" / "gas.json"), help="结果 JSON")
+    args = ap.parse_args()
+
+    if EthereumTester is None:
+        sys.exit('gas_bench needs eth-tester with py-evm: pip install "eth-tester[py-evm]" eth-abi eth-utils')
+    if shutil.which(args.solc) is None:
+        sys.exit(f"solc not found: {args.solc} (install solc or pass --solc PATH)")
+    op_modes = _split(args.op_modes)
+    for m in op_modes:
+        if m not in OP_MODES:
+            ap.error(f"unknown op mode {m!r}; choose from {','.join(OP_MODES)}")
+    literal_strategies = _split(args.literal_strategies)
+    for st in literal_strategies:
+        if st not in LITERAL_STRATEGIES + (AUTO_STRATEGY,):
+            ap.error(f"unknown literal strategy {st!r}; choose from {','.join(LITERAL_STRATEGIES + (AUTO_STRATEGY,))}")
+
+    configure_logging("warning")
+    src_dir = Path(args.dir).resolve()
+    project_root = find_project_root(src_dir)
+    files = [p.relative_to(src_dir).as_posix() for p in enumerate_sol_files(src_dir)]
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, enable, options in variants(_split(args.passes), [float(d) for d in _split(args.densities)],
+                                                  op_modes, literal_strategies):
+                if enable:
+                    variant_dir = Path(tmp) / name.replace(":", "_").replace("@", "_")
+                    mapping = obfuscate_tree(src_dir, variant_dir, enable, options, args.seed)
+                else:
+                    variant_dir, mapping = src_dir, {}
+                results[name] = measure_tree(variant_dir, files, args.solc, not args.no_optimize,
+                                             args.gas_limit, mapping, project_root)
+                print(f"[GAS-BENCH] {name}: {len(files)} file(s)")
+    finally:
+        shutdown_pool()
+
+    report = {
+        "version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "solc": solc_version(args.solc),
+        "params": {"passes": _split(args.passes), "densities": _split(args.densities), "op_modes": op_modes,
+                   "literal_strategies": literal_strategies,
+                   "seed": args.seed, "optimize": not args.no_optimize},
+        "variants": results,
+    }
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print_summary(results)
+    print(f"[GAS-BENCH] results -> {out}")
+
+
+if __name__ == "__main__":
+    main()
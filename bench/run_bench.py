@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Pass 与整条管线的规模基准。
+
+    python bench/run_bench.py --sizes 1,2,4,8,16 --repeat 3 --out bench/results/HEAD.json
+    python bench/compare.py bench/results/base.json bench/results/HEAD.json
+
+对每个规模（每个文件的合约数）用 gen_corpus 生成语料，然后：
+- 单独运行每个 Pass（Operation / ControlFlow / DeadCode / StringLiteral / Layout / Chaos），
+- 运行整条管线（--pipeline 指定的 Pass 组合），
+每次运行都使用空的内存 AST 缓存（冷启动，解析耗时计入触发它的 Pass），
+取 --repeat 次中的中位数。结果写成 JSON，附带提交号与环境信息，可用 compare.py 在提交间对比。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_ROOT / "obfusion_project"))
+
+from gen_corpus import CorpusSpec, add_spec_args, spec_from_args, write_corpus  # noqa: E402
+from ast_cache import configure_cache  # noqa: E402
+from js_parser import configure_pool, shutdown_pool  # noqa: E402
+from obf_log import configure_logging  # noqa: E402
+from obf_profile import PassProbe  # noqa: E402
+from main import apply_pass, build_context, build_passes  # noqa: E402
+
+RESULTS_VERSION = 1
+
+# --enable 中的名字 -> Pass 名
+PASS_KEYS = {"op": "Operation", "cf": "ControlFlow", "dead": "DeadCode",
+             "literal": "StringLiteral", "layout": "Layout", "chaos": "Chaos"}
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*cmd: str) -> Optional[str]:
+        try:
+            return subprocess.run(("git",) + cmd, cwd=REPO_ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def run_once(project_dir: Path, files: List[str], enable: List[str], seed: int,
+             cache_size: int) -> Dict[str, Any]:
+    """冷启动运行一次：各文件依次执行 enable 对应的 Pass，返回按 Pass 累加的度量。"""
+    configure_cache(cache_size, None)
+    probe = PassProbe(trace_memory=False)
+    per_pass: Dict[str, Dict[str, Any]] = {}
+    errors: List[str] = []
+    bytes_in = bytes_out = 0
+    t0 = time.perf_counter()
+    for name in files:
+        passes = build_passes(enable)
+        random.seed(seed)
+        ctx = build_context(project_dir, name)
+        bytes_in += len(ctx.src.encode("utf-8"))
+        for i in range(len(passes)):
+            meta = apply_pass(ctx, passes, i, probe)
+            rec = meta["profile"]
+            slot = per_pass.setdefault(meta["pass"], {"wall_s": 0.0, "parse_s": 0.0, "edits": 0})
+            slot["wall_s"] += rec["wall_s"]
+            slot["parse_s"] += rec["py_parse_s"] + rec["js_parse_s"] + rec["symtab_s"]
+            slot["edits"] += rec["edits"] or 0
+            if meta.get("error"):
+                errors.append(f"{name}: {meta['pass']}: {meta['error']}")
+        bytes_out += len(ctx.src.encode("utf-8"))
+    return {"wall_s": time.perf_counter() - t0, "passes": per_pass, "errors": errors,
+            "bytes_in": bytes_in, "bytes_out": bytes_out}
+
+
+def measure(project_dir: Path, files: List[str], enable: List[str], seed: int, repeat: int,
+            cache_size: int) -> Dict[str, Any]:
+    runs = [run_once(project_dir, files, enable, seed, cache_size) for _ in range(repeat)]
+    walls = [r["wall_s"] for r in runs]
+    result: Dict[str, Any] = {
+        "median_s": round(statistics.median(walls), 6),
+        "min_s": round(min(walls), 6),
+        "runs_s": [round(w, 6) for w in walls],
+        "bytes_in": runs[0]["bytes_in"],
+        "bytes_out": runs[0]["bytes_out"],
+        "passes": {},
+    }
+    for pass_name in runs[0]["passes"]:
+        recs = [r["passes"][pass_name] for r in runs]
+        result["passes"][pass_name] = {
+            "median_s": round(statistics.median(x["wall_s"] for x in recs), 6),
+            "parse_s": round(statistics.median(x["parse_s"] for x in recs), 6),
+            "edits": recs[0]["edits"],
+        }
+    if runs[0]["errors"]:
+        result["errors"] = runs[0]["errors"]
+    return result
+
+
+def run_bench(sizes: List[int], spec: CorpusSpec, pass_keys: List[str], pipeline: List[str],
+              repeat: int = 3, seed: int = 1, cache_size: int = 256,
+              work_dir: Optional[Path] = None) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        for size in sizes:
+            size_spec = CorpusSpec(**dict(spec.to_dict(), contracts=size))
+            project_dir = Path(tmp) / f"size_{size}"
+            files = write_corpus(size_spec, project_dir)
+            lines = sum((project_dir / f).read_text(encoding="utf-8").count("\n") for f in files)
+            # 预热：启动 node 解析进程、加载各模块，不计入结果
+            run_once(project_dir, files, pipeline, seed, cache_size)
+            entry: Dict[str, Any] = {"contracts": size, "files": len(files), "lines": lines, "passes": {}}
+            for key in pass_keys:
+                entry["passes"][PASS_KEYS[key]] = measure(project_dir, files, [key], seed, repeat, cache_size)
+                print(f"[BENCH] contracts={size} lines={lines} {PASS_KEYS[key]}: "
+                      f"{entry['passes'][PASS_KEYS[key]]['median_s']:.4f}s")
+            entry["pipeline"] = measure(project_dir, files, pipeline, seed, repeat, cache_size)
+            print(f"[BENCH] contracts={size} lines={lines} pipeline: {entry['pipeline']['median_s']:.4f}s")
+            results.append(entry)
+    return {
+        "version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "machine": platform.machine()},
+        "params": {"spec": {k: v for k, v in spec.to_dict().items() if k != "contracts"}, "sizes": sizes, "passes": pass_keys, "pipeline": pipeline,
+                   "repeat": repeat, "seed": seed},
+        "results": results,
+    }
+
+
+def _split(value: str) -> List[str]:
+    return [x.strip() for x in value.split(",") if x.strip()]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark obfuscation passes over synthetic corpora")
+    ap.add_argument("--sizes", type=str, default="1,2,4,8,16", help="每个文件的合约数(逗号分隔，依次增大)")
+    add_spec_args(ap)
+    ap.add_argument("--passes", type=str, default=",".join(PASS_KEYS), help="单独计时的 Pass(逗号分隔)")
+    ap.add_argument("--pipeline", type=str, default=",".join(PASS_KEYS), help="整条管线启用的 Pass(逗号分隔)")
+    ap.add_argument("--repeat", type=int, default=3, help="每项重复次数(取中位数)")
+    ap.add_argument("--seed", type=int, default=1, help="混淆随机种子")
+    ap.add_argument("--parser-workers", type=int, default=1, help="常驻 Node.js 解析进程数量")
+    ap.add_argument("--cache-size", type=int, default=256, help="内存 AST 缓存条目上限")
+    ap.add_argument("--out", type=str, default=str(BENCH_DIR / "results" / "latest.json"), help="结果 JSON")
+    args = ap.parse_args()
+
+    for key in _split(args.passes) + _split(args.pipeline):
+        if key not in PASS_KEYS:
+            ap.error(f"unknown pass {key!r}; choose from {','.join(PASS_KEYS)}")
+    configure_logging("warning")
+    configure_pool(args.parser_workers)
+    spec = spec_from_args(args, CorpusSpec.contracts)
+    try:
+        report = run_bench([int(x) for x in _split(args.sizes)], spec, _split(args.passes),
+                           _split(args.pipeline), repeat=max(1, args.repeat), seed=args.seed,
+                           cache_size=args.cache_size)
+    finally:
+        shutdown_pool()
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"[BENCH] results -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+按内容寻址的 AST 缓存，Python (Zellic) 与 JS (@solidity-parser) 两条解析路径共用。
+
+key = sha256(kind, 解析器版本, 源码)。
+- 进程内：LRU，按条目数与源码总字节数双重限制，超限时淘汰最久未用的条目；
+- 磁盘（可选）：仅对可 JSON 序列化的 AST（JS 侧）生效，以紧凑 JSON 存放，
+  按总字节数限制，超限时按 mtime 从旧到新删除。
+缓存中的 AST 对象在多个 Pass 间共享，调用方须视为只读。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class AstCache:
+    def __init__(self,
+                 max_entries: int = 256,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 disk_dir: Optional[Path] = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.max_disk_bytes = max(1, int(max_disk_bytes))
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+
+        # key -> (ast, weight)
+        self._lru: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(p.stat().st_size for p in self.disk_dir.glob("*/*.json"))
+
+    # ---------------- key ----------------
+    @staticmethod
+    def make_key(kind: str, version: str, source: str) -> str:
+        h = hashlib.sha256()
+        h.update(f"{kind}\0{version}\0".encode("utf-8"))
+        h.update(source.encode("utf-8"))
+        return h.hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    # ---------------- 内存 LRU ----------------
+    def _lru_get(self, key: str) -> Optional[Any]:
+        item = self._lru.get(key)
+        if item is None:
+            return None
+        self._lru.move_to_end(key)
+        return item[0]
+
+    def _lru_put(self, key: str, ast: Any, weight: int) -> None:
+        old = self._lru.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._lru[key] = (ast, weight)
+        self._bytes += weight
+        while len(self._lru) > 1 and (len(self._lru) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, w) = self._lru.popitem(last=False)
+            self._bytes -= w
+            self.evictions += 1
+
+    # ---------------- 磁盘 ----------------
+    def _disk_get(self, key: str) -> Optional[Any]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        try:
+            ast = json.loads(text)
+        except ValueError:
+            # 半写入/损坏的条目直接丢弃
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # 刷新 mtime，作为磁盘侧的 LRU 依据
+        return ast
+
+    def _disk_put(self, key: str, ast: Any) -> None:
+        path = self._disk_path(key)
+        if path.exists():
+            return
+        data = json.dumps(ast, separators=(",", ":"), ensure_ascii=False)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再原子替换，避免并发运行读到半截 JSON
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._disk_bytes += path.stat().st_size
+        if self._disk_bytes > self.max_disk_bytes:
+            self._disk_evict()
+
+    def _disk_evict(self) -> None:
+        entries = []
+        for p in self.disk_dir.glob("*/*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort(key=lambda x: x[0])
+        total = sum(e[1] for e in entries)
+        # 降到上限的 90%，避免每次写入都触发一次全量扫描
+        target = int(self.max_disk_bytes * 0.9)
+        for _, size, p in entries:
+            if total <= target:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            self.disk_evictions += 1
+        self._disk_bytes = total
+
+    # ---------------- 对外接口 ----------------
+    def get(self, kind: str, version: str, source: str, persist: bool = False) -> Optional[Any]:
+        key = self.make_key(kind, version, source)
+        with self._lock:
+            ast = self._lru_get(key)
+            if ast is not None:
+                self.hits += 1
+                return ast
+            if persist:
+                ast = self._disk_get(key)
+                if ast is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._lru_put(key, ast, len(source))
+                    return ast
+            self.misses += 1
+            return None
+
+    def put(self, kind: str, version: str, source: str, ast: Any, persist: bool = False) -> None:
+        if ast is None:
+            return
+        key = self.make_key(kind, version, source)
+        with self._lock:
+            self._lru_put(key, ast, len(source))
+            if persist and self.disk_dir is not None:
+                self._disk_put(key, ast)
+
+    def discard(self, kind: str, version: str, source: str) -> None:
+        """从内存 LRU 中移除一条（调用方要原地修改该 AST 时使用）。"""
+        key = self.make_key(kind, version, source)
+        with self._lock:
+            item = self._lru.pop(key, None)
+            if item is not None:
+                self._bytes -= item[1]
+
+    def get_or_parse(self, kind: str, version: str, source: str,
+                     parse: Callable[[str], Any], persist: bool = False) -> Any:
+        """命中则返回缓存的 AST，否则调用 parse(source) 并写回缓存。persist 仅用于 JSON AST。"""
+        ast = self.get(kind, version, source, persist=persist)
+        if ast is None:
+            ast = parse(source)
+            self.put(kind, version, source, ast, persist=persist)
+        return ast
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "entries": len(self._lru),
+                "bytes": self._bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+_CACHE: Optional[AstCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def configure_cache(max_entries: int = 256, disk_dir: Optional[Path] = None) -> AstCache:
+    """替换进程内共享缓存（main 根据命令行参数调用）。"""
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = AstCache(max_entries=max_entries, disk_dir=disk_dir)
+    return _CACHE
+
+
+def get_cache() -> AstCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = AstCache()
+    return _CACHE
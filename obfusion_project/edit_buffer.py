@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+各 Pass 共用的文本编辑缓冲区。
+
+所有编辑都以“原始源码”的下标表示（左闭右开），先收集，再一次性线性拼接输出，
+取代逐条 left + text + right 的切片拼接（O(文件长度 × 编辑数)）。
+- replace(start, end, text): 替换 [start, end)
+- insert(pos, text):         在 pos 处插入（即 start == end 的替换）
+同一位置的多个插入按调用顺序输出，且位于该位置的替换之前；
+完全相同的重复替换会被合并；其他重叠一律视为冲突。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Tuple
+
+
+class EditConflictError(ValueError):
+    """两条编辑的范围重叠，无法同时应用。"""
+
+
+@dataclass(frozen=True)
+class Edit:
+    start: int
+    end: int    # 不含；start == end 表示插入
+    text: str
+    seq: int    # 提交顺序，用于稳定排序
+
+    @property
+    def is_insert(self) -> bool:
+        return self.start == self.end
+
+
+class EditBuffer:
+    def __init__(self, src: str):
+        self.src = src
+        self._edits: List[Edit] = []
+
+    def replace(self, start: int, end: int, text: str) -> None:
+        if not (0 <= start <= end <= len(self.src)):
+            raise EditConflictError(f"edit range [{start}:{end}) out of bounds (len={len(self.src)})")
+        self._edits.append(Edit(start, end, text, len(self._edits)))
+
+    def insert(self, pos: int, text: str) -> None:
+        self.replace(pos, pos, text)
+
+    def __len__(self) -> int:
+        return len(self._edits)
+
+    def __bool__(self) -> bool:
+        return bool(self._edits)
+
+    def edits(self) -> List[Edit]:
+        """按位置排序、去重并检查冲突后的编辑列表。"""
+        ordered = sorted(self._edits, key=lambda e: (e.start, e.end, e.seq))
+        out: List[Edit] = []
+        cursor = 0          # 已被替换覆盖到的位置
+        last_replace = None
+        for e in ordered:
+            if not e.is_insert and last_replace is not None \
+                    and (e.start, e.end, e.text) == (last_replace.start, last_replace.end, last_replace.text):
+                continue
+            if e.start < cursor:
+                raise EditConflictError(
+                    f"edit [{e.start}:{e.end}) overlaps previous edit "
+                    f"[{last_replace.start}:{last_replace.end})")
+            out.append(e)
+            if not e.is_insert:
+                cursor = e.end
+                last_replace = e
+        return out
+
+    def render(self) -> str:
+        """单次线性拼接出编辑后的源码。"""
+        parts: List[str] = []
+        cursor = 0
+        for e in self.edits():
+            parts.append(self.src[cursor:e.start])
+            parts.append(e.text)
+            cursor = e.end
+        parts.append(self.src[cursor:])
+        return "".join(parts)
+
+    def spans(self) -> List[Tuple[int, int, int]]:
+        """变化区间 [(原 start, 原 end, 新文本长度)]，相邻/同位置的编辑已合并；供增量重建 AST 使用。"""
+        merged: List[List[int]] = []
+        for e in self.edits():
+            if merged and merged[-1][1] == e.start:
+                merged[-1][1] = e.end
+                merged[-1][2] += len(e.text)
+            else:
+                merged.append([e.start, e.end, len(e.text)])
+        return [(s, e, n) for s, e, n in merged]
+
+
+def trailing_whitespace(src: str, pos: int) -> str:
+    """pos 之前紧邻的空格/制表符（即所在行在 pos 处的缩进）。"""
+    i = pos
+    while i > 0 and src[i - 1] in " \t":
+        i -= 1
+    return src[i:pos]
@@ -27,10 +27,62 @@ const path = require("path");
 
 // 用法：node getGrammarTree.js <solidity-file> 
 // 也支持：node getGrammarTree.js -      （从 stdin 读取源码）
+// 常驻模式：node getGrammarTree.js --serve
+//   每行一个 JSON 请求 {"id", "path"} / {"id", "source"} / {"id", "method": "version"}，
+//   每行回写一个 JSON 响应 {"id", "ast"} / {"id", "version"} / {"id", "error", "location"}
 // 若不传参，则回退到 ./solidity_project/contracts/TestContract.sol
 
 const argPath = process.argv[2];
 
+// loc/range 都要打开，保持你 Python 侧访问的字段一致
+const PARSE_OPTIONS = { loc: true, range: true, tolerant: true };
+
+function parserVersion() {
+  try {
+    return require("@solidity-parser/parser/package.json").version;
+  } catch (e) {
+    return "unknown";
+  }
+}
+
+function handleRequest(req) {
+  if (req.method === "version") {
+    return { id: req.id, version: parserVersion() };
+  }
+  let source = req.source;
+  if (typeof source !== "string") {
+    const abs = path.isAbsolute(req.path) ? req.path : path.resolve(req.path);
+    source = fs.readFileSync(abs, "utf8");
+  }
+  return { id: req.id, ast: parser.parse(source, PARSE_OPTIONS) };
+}
+
+function serve() {
+  const readline = require("readline");
+  const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+  rl.on("line", (line) => {
+    if (!line.trim()) {
+      return;
+    }
+    let req = {};
+    let resp;
+    try {
+      req = JSON.parse(line);
+      resp = handleRequest(req);
+    } catch (err) {
+      // 单个请求失败不影响常驻进程
+      resp = { id: req.id === undefined ? null : req.id, error: err.message, location: err.location || null };
+    }
+    process.stdout.write(JSON.stringify(resp) + "\n");
+  });
+  rl.on("close", () => process.exit(0));
+}
+
+if (argPath === "--serve") {
+  serve();
+  return;
+}
+
 function readSource(fpOrDash) {
   if (fpOrDash === "-") {
     // 从 stdin 读取
@@ -64,8 +116,7 @@ if (argPath && argPath !== "-") {
 const source = readSource(targetPath);
 
 try {
-  // loc/range 都要打开，保持你 Python 侧访问的字段一致
-  const ast = parser.parse(source, { loc: true, range: true, tolerant: true });
+  const ast = parser.parse(source, PARSE_OPTIONS);
   process.stdout.write(JSON.stringify(ast));
 } catch (err) {
   // solidity-parser 出错时 location 可能有行列信息
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+增量重建 Python(Zellic) AST。
+
+Pass 通过 EditBuffer.spans() 报告本次修改的原始区间 [(start, end, 新长度)]。
+这里把旧 AST 的顶层单元（pragma/import/contract/自由函数…）及其间隙切成若干段：
+- 与编辑区间接触的段标记为“脏”，相邻的脏段合并后只对这部分新文本重新解析；
+- 未接触的顶层单元复用：位置不变时直接共享，否则复制一份再把 buffer 下标与行列号整体平移
+  （旧 AST 可能在缓存里被其他文件/任务共享，不能原地修改）。
+无法安全增量处理时返回 None，由调用方退回完整解析。
+"""
+
+from __future__ import annotations
+
+import copy
+
+from bisect import bisect_right
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+Span = Tuple[int, int, int]
+
+# 脏区占比超过该阈值时，增量解析已无优势，直接整体重解析
+MAX_DIRTY_RATIO = 0.6
+
+
+def _line_starts(src: str) -> List[int]:
+    starts = [0]
+    pos = src.find("\n")
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = src.find("\n", pos + 1)
+    return starts
+
+
+def _line_col(starts: List[int], pos: int) -> Tuple[int, int]:
+    """返回 (1 起始的行号, 距行首的字符偏移)。"""
+    line = bisect_right(starts, pos)
+    return line, pos - starts[line - 1]
+
+
+def _map_pos(spans: Sequence[Span], pos: int) -> int:
+    """把不落在任何编辑区间内部的旧下标映射到新源码。"""
+    delta = 0
+    for s, e, n in spans:
+        if e > pos:
+            break
+        delta += n - (e - s)
+    return pos + delta
+
+
+def _iter_nodes(unit: Any):
+    yield unit
+    yield from unit.get_all_children(lambda _: True)
+
+
+def _shift_loc(loc: Any, dline: int, dcol: int) -> Any:
+    return type(loc)(loc.line + dline, loc.column + dcol)
+
+
+def shift_unit(unit: Any, didx: int, dline: int, first_line: int, dcol: int) -> None:
+    """原地平移一个顶层单元：buffer 下标 +didx，行号 +dline，位于原首行 first_line 的列号 +dcol。"""
+    if not (didx or dline or dcol):
+        return
+    for node in _iter_nodes(unit):
+        for attr in ("start_buffer_index", "end_buffer_index"):
+            v = getattr(node, attr, None)
+            if isinstance(v, int):
+                setattr(node, attr, v + didx)
+        for attr in ("start_location", "end_location"):
+            loc = getattr(node, attr, None)
+            if loc is None:
+                continue
+            setattr(node, attr, _shift_loc(loc, dline, dcol if loc.line == first_line else 0))
+
+
+def shifted_copy(unit: Any, didx: int, dline: int, first_line: int, dcol: int) -> Any:
+    """shift_unit 的非破坏版本：需要平移时返回深拷贝（父节点引用保持共享），否则返回 unit 本身。"""
+    if not (didx or dline or dcol):
+        return unit
+    parent = getattr(unit, "parent", None)
+    memo = {id(parent): parent} if parent is not None else {}
+    unit = copy.deepcopy(unit, memo)
+    shift_unit(unit, didx, dline, first_line, dcol)
+    return unit
+
+
+def reparse_incremental(old_src: str, new_src: str, roots: Sequence[Any], spans: Sequence[Span],
+                        parse: Callable[[str], List[Any]]) -> Optional[List[Any]]:
+    """
+    根据编辑区间增量得到 new_src 的顶层 AST 列表；roots 不会被修改（需要平移的单元先复制）。
+    :param roots: old_src 的顶层 AST 列表（ModuleContext.ast_root）
+    :param spans: 原始下标的编辑区间，按 start 升序且互不重叠
+    :param parse: 源码 -> 顶层 AST 列表（如 make_ast）
+    """
+    units = [u for u in roots if u is not None]
+    if not units or not spans:
+        return None
+    if any(not isinstance(getattr(u, "start_buffer_index", None), int)
+           or not isinstance(getattr(u, "end_buffer_index", None), int) for u in units):
+        return None
+    units.sort(key=lambda u: u.start_buffer_index)
+
+    # 段：[start, end, unit 或 None(间隙)]，覆盖整个旧源码
+    segments: List[List[Any]] = []
+    cursor = 0
+    for u in units:
+        s, e = u.start_buffer_index, u.end_buffer_index
+        if s < cursor or e < s:
+            return None  # 顶层单元重叠/乱序，放弃增量
+        segments.append([cursor, s, None])
+        segments.append([s, e, u])
+        cursor = e
+    segments.append([cursor, len(old_src), None])
+
+    # 与任一编辑区间接触（闭区间相交）的段为脏
+    dirty = [False] * len(segments)
+    i = 0
+    for a, b, _ in spans:
+        while i < len(segments) and segments[i][1] < a:
+            i += 1
+        j = i
+        while j < len(segments) and segments[j][0] <= b:
+            dirty[j] = True
+            j += 1
+
+    dirty_len = sum(seg[1] - seg[0] for seg, d in zip(segments, dirty) if d)
+    if dirty_len > MAX_DIRTY_RATIO * max(len(old_src), 1):
+        return None
+
+    old_lines = _line_starts(old_src)
+    new_lines = _line_starts(new_src)
+    new_roots: List[Any] = []
+
+    k = 0
+    while k < len(segments):
+        if not dirty[k]:
+            s, _, unit = segments[k]
+            if unit is not None:
+                ns = _map_pos(spans, s)
+                old_line, old_off = _line_col(old_lines, s)
+                new_line, new_off = _line_col(new_lines, ns)
+                new_roots.append(shifted_copy(unit, ns - s, new_line - old_line, old_line, new_off - old_off))
+            k += 1
+            continue
+
+        # 合并连续脏段，整体重新解析对应的新文本
+        region_start = segments[k][0]
+        while k < len(segments) and dirty[k]:
+            k += 1
+        region_end = segments[k - 1][1]
+        na, nb = _map_pos(spans, region_start), _map_pos(spans, region_end)
+        snippet = new_src[na:nb]
+        if not snippet.strip():
+            continue
+        parsed = [u for u in parse(snippet) if u is not None]
+        line, off = _line_col(new_lines, na)
+        for u in parsed:
+            shift_unit(u, na, line - 1, 1, off)
+        new_roots.extend(parsed)
+
+    return new_roots
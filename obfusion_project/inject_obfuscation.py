@@ -7,6 +7,7 @@ import argparse
 
 from solidity_parser import filesys
 from solidity_parser.ast import symtab, solnodes
+from sol_lexer import tokenize
 
 # 死代码模板
 DEAD_CODE_TEMPLATES = [
@@ -58,60 +59,9 @@ def find_body_insert_offset(source: str, func: solnodes.FunctionDefinition) -> i
 def _find_block_end(source: str, open_brace_idx: int) -> int:
     """
     给定函数体 '{' 的位置，返回与之匹配的 '}' 的位置。
-    识别 // 行注释、/* */ 块注释、'...'/"..." 字符串与转义，避免误判。
-    找不到时返回 -1。
+    注释/字符串由 sol_lexer 统一识别，避免误判。找不到时返回 -1。
     """
-    i = open_brace_idx + 1
-    n = len(source)
-    depth = 1
-    in_line_cmt = False
-    in_block_cmt = False
-    in_str = False
-    str_ch = ""
-    escape = False
-    paren = 0  # 仅用于跳过括号内的内容（这里不参与深度）
-
-    while i < n:
-        ch = source[i]
-        nxt = source[i + 1] if i + 1 < n else ""
-
-        if in_line_cmt:
-            if ch == "\n":
-                in_line_cmt = False
-        elif in_block_cmt:
-            if ch == "*" and nxt == "/":
-                in_block_cmt = False
-                i += 1
-        elif in_str:
-            if escape:
-                escape = False
-            elif ch == "\\":
-                escape = True
-            elif ch == str_ch:
-                in_str = False
-        else:
-            # 不在注释/字符串
-            if ch == "/" and nxt == "/":
-                in_line_cmt = True
-                i += 1
-            elif ch == "/" and nxt == "*":
-                in_block_cmt = True
-                i += 1
-            elif ch in ("'", '"'):
-                in_str = True
-                str_ch = ch
-            elif ch == "(":
-                paren += 1
-            elif ch == ")":
-                paren = max(paren - 1, 0)
-            elif ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    return i
-        i += 1
-    return -1
+    return tokenize(source).block_end(open_brace_idx)
 
 def _collect_top_level_slots(source: str, body_lbrace: int) -> list[tuple[int, str, int]]:
     """
@@ -121,84 +71,30 @@ def _collect_top_level_slots(source: str, body_lbrace: int) -> list[tuple[int, s
     - 匹配的 '}' 之前
     返回: 列表[(insert_pos, indent, line_no)]
     """
-    end = _find_block_end(source, body_lbrace)
+    tokens = tokenize(source)
+    end = tokens.block_end(body_lbrace)
     if end < 0:
         return []
 
     slots: list[tuple[int, str, int]] = []
 
     def _mk_slot(pos: int):
-        left = source[:pos]
-        line_no = left.count("\n") + 1
-        line_start = left.rfind("\n") + 1
-        indent = left[line_start: len(left) - len(left[line_start:].lstrip())]
+        line_no = tokens.line_no(pos)
+        seg = source[tokens.line_starts[line_no - 1]:pos]
+        indent = seg[:len(seg) - len(seg.lstrip())]
         return (pos, indent, line_no)
 
+    def _skip_ws(i: int) -> int:
+        while i < end and source[i] in " \t\r\n":
+            i += 1
+        return i
+
     # 1) '{' 后首插槽（跳过空白）
-    i = body_lbrace + 1
-    while i < end and source[i] in " \t\r\n":
-        i += 1
-    slots.append(_mk_slot(i))
-
-    # 2) 扫描顶层分号
-    in_line_cmt = in_block_cmt = False
-    in_str = False
-    str_ch = ""
-    escape = False
-    depth = 1          # 从函数体开始
-    paren = 0
-    bracket = 0
-
-    i = body_lbrace + 1
-    while i < end:
-        ch = source[i]
-        nxt = source[i + 1] if i + 1 < len(source) else ""
-
-        if in_line_cmt:
-            if ch == "\n":
-                in_line_cmt = False
-        elif in_block_cmt:
-            if ch == "*" and nxt == "/":
-                in_block_cmt = False
-                i += 1
-        elif in_str:
-            if escape:
-                escape = False
-            elif ch == "\\":
-                escape = True
-            elif ch == str_ch:
-                in_str = False
-        else:
-            if ch == "/" and nxt == "/":
-                in_line_cmt = True
-                i += 1
-            elif ch == "/" and nxt == "*":
-                in_block_cmt = True
-                i += 1
-            elif ch in ("'", '"'):
-                in_str = True
-                str_ch = ch
-            elif ch == "(":
-                paren += 1
-            elif ch == ")":
-                paren = max(paren - 1, 0)
-            elif ch == "[":
-                bracket += 1
-            elif ch == "]":
-                bracket = max(bracket - 1, 0)
-            elif ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    break
-            elif ch == ";" and depth == 1 and paren == 0 and bracket == 0:
-                # 分号之后跳过空白，记录插槽
-                j = i + 1
-                while j < end and source[j] in " \t\r\n":
-                    j += 1
-                slots.append(_mk_slot(j))
-        i += 1
+    slots.append(_mk_slot(_skip_ws(body_lbrace + 1)))
+
+    # 2) 顶层分号之后跳过空白，记录插槽
+    for semi in tokens.top_level_semicolons(body_lbrace):
+        slots.append(_mk_slot(_skip_ws(semi + 1)))
 
     # 3) '}' 之前（回退空白）
     j = end
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+常驻 Node.js 解析进程 (getGrammarTree.js --serve) 的 Python 客户端。
+
+每个 JsParserWorker 维护一个 node 子进程，通过 stdin/stdout 按行收发 JSON；
+JsParserPool 在多个 worker 之间分配请求，供各个 Pass 共享。
+worker 崩溃（管道断开/进程退出）或在 request_timeout 秒内没有响应时，会被杀掉并重启，请求重试一次。
+"""
+
+from __future__ import annotations
+
+import atexit
+import collections
+import json
+import os
+import queue
+import subprocess
+import threading
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from ast_cache import get_cache
+
+GRAMMAR_TREE_SCRIPT = Path(__file__).with_name("getGrammarTree.js")
+
+# 单个请求等待响应的上限（秒）；超时视同崩溃
+DEFAULT_REQUEST_TIMEOUT = 60.0
+
+
+class JsParserError(RuntimeError):
+    """JS 侧解析失败，或 worker 无法启动/通信。"""
+
+
+# 进程内累计的子进程统计（--profile 按 Pass 取差值）
+_STATS: Dict[str, int] = {"spawns": 0, "requests": 0, "bytes_sent": 0, "bytes_received": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def count_parser_io(**deltas: int) -> None:
+    with _STATS_LOCK:
+        for k, v in deltas.items():
+            _STATS[k] += v
+
+
+def parser_stats() -> Dict[str, int]:
+    """node 进程启动次数、请求数与收发字节数（当前进程内累计）。"""
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+
+class JsParserWorker:
+    """单个常驻 node 进程；线程安全（串行化请求）。"""
+
+    def __init__(self, script: Path = GRAMMAR_TREE_SCRIPT, node: str = "node",
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        self.script = Path(script)
+        self.node = node
+        self.timeout = timeout
+        self._proc: Optional[subprocess.Popen] = None
+        # 当前进程 stdout 的逐行队列（EOF 时放入 ""）；每个进程一个，旧进程的残留行不会串到新进程
+        self._lines: "queue.Queue[str]" = queue.Queue()
+        self._stderr_tail: collections.deque = collections.deque(maxlen=50)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.restarts = 0
+
+    def _start(self) -> None:
+        self._stderr_tail.clear()
+        self._proc = subprocess.Popen(
+            [self.node, str(self.script), "--serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        count_parser_io(spawns=1)
+        # stdout 由读线程转入队列，request 才能带超时等待；stderr 必须持续读取，否则写满管道会阻塞 node 进程
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read_stdout, args=(self._proc, self._lines), daemon=True).start()
+        threading.Thread(target=self._drain_stderr, args=(self._proc,), daemon=True).start()
+
+    @staticmethod
+    def _read_stdout(proc: subprocess.Popen, lines: "queue.Queue[str]") -> None:
+        try:
+            for line in proc.stdout:
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        lines.put("")
+
+    def _readline(self) -> str:
+        try:
+            return self._lines.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no response from parser worker within {self.timeout:g}s") from None
+
+    def _drain_stderr(self, proc: subprocess.Popen) -> None:
+        for line in proc.stderr:
+            self._stderr_tail.append(line.rstrip("\n"))
+
+    def _kill(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.kill()
+            proc.wait(timeout=5)
+        except Exception:
+            pass
+
+    def _alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """发送一个请求并等待对应响应；worker 异常退出时重启后重试一次。"""
+        with self._lock:
+            self._next_id += 1
+            payload = dict(payload, id=self._next_id)
+            line = json.dumps(payload, ensure_ascii=False) + "\n"
+
+            for attempt in range(2):
+                if not self._alive():
+                    self._kill()
+                    self._start()
+                try:
+                    self._proc.stdin.write(line)
+                    self._proc.stdin.flush()
+                    resp_line = self._readline()
+                    if not resp_line:
+                        raise EOFError("parser worker closed stdout")
+                    count_parser_io(requests=1, bytes_sent=len(line), bytes_received=len(resp_line))
+                    resp = json.loads(resp_line)
+                    if resp.get("id") != payload["id"]:
+                        raise EOFError(f"out-of-sync response id={resp.get('id')}")
+                    return resp
+                except (OSError, EOFError, ValueError) as e:
+                    # TimeoutError 是 OSError 的子类：与崩溃一样杀掉进程后重试
+                    proc = self._proc
+                    self._kill()
+                    code = proc.returncode if proc is not None else None
+                    self.restarts += 1
+                    if attempt:
+                        detail = "\n".join(self._stderr_tail)
+                        raise JsParserError(f"parser worker failed (exit={code}): {e}\n{detail}") from e
+        raise JsParserError("unreachable")
+
+    def close(self) -> None:
+        with self._lock:
+            proc, self._proc = self._proc, None
+            if proc is None:
+                return
+            try:
+                proc.stdin.close()
+                proc.wait(timeout=5)
+            except Exception:
+                proc.kill()
+
+
+class JsParserPool:
+    """按需启动至多 size 个 worker；请求在空闲 worker 间分配。"""
+
+    def __init__(self, size: int = 2, script: Path = GRAMMAR_TREE_SCRIPT, node: str = "node",
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        self.size = max(1, int(size))
+        self.script = script
+        self.node = node
+        self.timeout = timeout
+        self._idle: "queue.Queue[JsParserWorker]" = queue.Queue()
+        self._workers: List[JsParserWorker] = []
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> JsParserWorker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._workers) < self.size:
+                worker = JsParserWorker(self.script, self.node, self.timeout)
+                self._workers.append(worker)
+                return worker
+        return self._idle.get()
+
+    def _call(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        worker = self._acquire()
+        try:
+            resp = worker.request(payload)
+        finally:
+            self._idle.put(worker)
+        if "error" in resp:
+            raise JsParserError(json.dumps({"error": resp["error"], "location": resp.get("location")}))
+        return resp
+
+    def parse_file(self, file_path: str) -> Any:
+        """解析磁盘上的 .sol 文件，返回 AST (dict)。"""
+        return self._call({"path": str(Path(file_path).resolve())})["ast"]
+
+    def parse_source(self, source: str) -> Any:
+        """直接解析源码文本，返回 AST (dict)。"""
+        return self._call({"source": source})["ast"]
+
+    def version(self) -> str:
+        return self._call({"method": "version"})["version"]
+
+    def close(self) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for w in workers:
+            w.close()
+        self._idle = queue.Queue()
+
+
+_POOL: Optional[JsParserPool] = None
+_POOL_LOCK = threading.Lock()
+_POOL_SIZE = 2
+
+
+def configure_pool(size: int) -> None:
+    """设置共享池大小；需在首次 get_pool() 之前调用。"""
+    global _POOL_SIZE
+    _POOL_SIZE = max(1, int(size))
+
+
+def get_pool() -> JsParserPool:
+    """进程内共享的解析池（惰性创建）。"""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = JsParserPool(size=_POOL_SIZE)
+    return _POOL
+
+
+_VERSION: Optional[str] = None
+
+
+def parser_version() -> str:
+    """@solidity-parser/parser 的版本号，作为 AST 缓存 key 的一部分。
+
+    按 node 的模块解析顺序（脚本所在目录逐级向上的 node_modules，再到 NODE_PATH）
+    直接读取 package.json，缓存命中时无需启动 node 进程。
+    """
+    global _VERSION
+    if _VERSION is not None:
+        return _VERSION
+    candidates = [d / "node_modules" for d in GRAMMAR_TREE_SCRIPT.resolve().parents]
+    candidates += [Path(p) for p in os.environ.get("NODE_PATH", "").split(os.pathsep) if p]
+    for base in candidates:
+        pkg = base / "@solidity-parser" / "parser" / "package.json"
+        try:
+            _VERSION = json.loads(pkg.read_text(encoding="utf-8"))["version"]
+            return _VERSION
+        except (OSError, ValueError, KeyError):
+            continue
+    _VERSION = get_pool().version()
+    return _VERSION
+
+
+def parse_source(source: str) -> Any:
+    """解析源码文本（经 AST 缓存）；相同源码只会送给 node 一次。"""
+    return get_cache().get_or_parse("js", parser_version(), source,
+                                    get_pool().parse_source, persist=True)
+
+
+@atexit.register
+def shutdown_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
@@ -4,93 +4,236 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import random
 import os
-import subprocess
-import re
 import json
+import queue
+import sys
+import threading
+import time
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from functools import partial
-from typing import List, Tuple, Dict, Any, Optional, Iterable, Callable
+from typing import List, Tuple, Dict, Any, Optional, Iterable, Callable, FrozenSet
 from pathlib import Path
 from dataclasses import dataclass, field
 from solidity_parser import filesys
 from solidity_parser.ast import symtab, solnodes, helper as ast_helper
-from obf_deadcode import iter_ast_roots, collect_top_level_slots, generate_dead_code, safe_func_name
-from obf_literal import obfuscate_code_literals
-from obf_controlflow import obfuscate_code_cf, minify_code, shuffle_code_blocks
-from obf_mathOperation import ConfusingMathOperationClass as MathOps
+from obf_deadcode import iter_ast_roots, collect_top_level_slots, generate_dead_code, safe_func_name, SourceIndex
+from obf_literal import (plan_code_literals, AUTO_STRATEGY, DEFAULT_LITERAL_STRATEGY,
+                         DEFAULT_LITERAL_STRENGTH, LITERAL_STRATEGIES)
+from obf_controlflow import plan_code_cf, minify_code, shuffle_code_blocks
+from obf_mathOperation import ConfusingMathOperationClass as MathOps, OP_MODES, DEFAULT_OP_MODE
+from js_parser import get_pool, configure_pool, parse_source
+from ast_cache import get_cache, configure_cache
+from edit_buffer import EditBuffer
+from obf_names import NAME_STRATEGIES, make_namer
+from obf_layout import RenameMap, build_project_map
+from manifest import BuildManifest, config_fingerprint, default_manifest_path, dependency_sources
+from incremental_ast import reparse_incremental
+from obf_profile import PassProbe, write_report
+from obf_gas import estimate_delta
+from obf_hotpath import DEFAULT_HOT_THRESHOLD, FunctionDensity, HotProfile, load_profile, node_name
+from obf_log import TRACE, LOG_LEVELS, configure_logging, flush_journal, get_logger, journal_buffer, open_journal
 
 
 # =========================================================
 # Pass 上下文与基类
 # =========================================================
 
-def get_grammar_tree(file_path) -> str:
-    # 调用 Node.js 脚本
-    # 调用 Node.js 脚本（已支持传入目标文件路径）
-    result = subprocess.run(
-        ["node", "./obfusion_project/getGrammarTree.js", file_path],
-        capture_output=True,
-        text=True
-    )
-    if result.returncode != 0 and result.stderr:
-        raise RuntimeError(result.stderr)
+def get_grammar_tree(file_path) -> Any:
+    # 经由常驻 Node.js 解析进程（getGrammarTree.js --serve）解析，返回 AST(dict)
+    return get_pool().parse_file(file_path)
+
+
+def parse_grammar_tree(src: str) -> Any:
+    # 直接把内存中的源码发给解析进程，无需落盘；相同源码命中 AST 缓存
+    return parse_source(src)
+
+
+def _py_parser_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("solidity-parser")
+    except Exception:
+        return "unknown"
+
+
+PY_PARSER_VERSION = _py_parser_version()
+
+log = get_logger("pipeline")
+
+
+def make_ast_cached(src: str, origin=None):
+    """ast_helper.make_ast 的缓存版本；相同源码只解析一次（Python AST 只存内存）。"""
+    return get_cache().get_or_parse("py", PY_PARSER_VERSION, src,
+                                    partial(ast_helper.make_ast, origin=origin))
+
+
+# ModuleContext 能提供的几种表示；Pass 通过 requires 声明自己需要哪些
+REPR_TEXT = "text"        # 纯源码文本
+REPR_PY_AST = "py_ast"    # Zellic 解析出的 Python AST
+REPR_SYMTAB = "symtab"    # VFS + symtab.Builder2 符号表
+REPR_JS_AST = "js_ast"    # @solidity-parser 的 JSON AST
 
-    return result.stdout
 
 @dataclass
 class ModuleContext:
-    """每处理一个文件, 构造一个上下文; Pass 在其中读取 AST/源码并回写。"""
+    """
+    每处理一个文件, 构造一个上下文; Pass 在其中读取 AST/源码并回写。
+    除 src 外的各种表示都在首次访问时才构建，源码变更后失效，
+    因此只启用 layout/op/chaos 的运行不会触发 Zellic 解析和符号解析。
+    """
     project_dir: Path
     file_name: str
-    vfs: Any
-    sym_builder: Any
-    ast_root: Any
     src: str
     meta: Dict[str, Any] = field(default_factory=dict)
 
-    def rebuild_ast(self, origin=None) -> None:
-        """
-            根据当前 self.src 重建 AST。
-            逻辑相同: self.vfs._add_loaded_source(self.file_name, self.src)
-        """
-        creator_options = {
-            'origin': origin
-        }
-        partial_creator = partial(ast_helper.make_ast, **creator_options)
-        loaded_source = filesys.LoadedSource(self.file_name, self.src, None, partial_creator)
-        self.vfs.sources[self.file_name] = loaded_source
-        self.ast_root = self.vfs.sources[self.file_name].ast
-
-    def rebuild(self, new_src: str) -> None:
+    _ast_root: Any = field(default=None, repr=False)
+    _vfs: Any = field(default=None, repr=False)
+    _sym_builder: Any = field(default=None, repr=False)
+    _js_ast: Any = field(default=None, repr=False)
+    # (旧源码, 旧 AST, 编辑区间)：下次访问 ast_root 时据此增量重建
+    _pending_rebuild: Any = field(default=None, repr=False)
+
+    @property
+    def origin(self) -> Path:
+        return self.project_dir / self.file_name
+
+    def _count(self, key: str) -> None:
+        self.meta[key] = self.meta.get(key, 0) + 1
+
+    def _add_time(self, key: str, t0: float) -> None:
+        # 各表示的累计构建耗时（秒），--profile 按 Pass 取差值
+        self.meta[key] = self.meta.get(key, 0.0) + (time.perf_counter() - t0)
+
+    # ---------------- Python AST ----------------
+    @property
+    def ast_root(self) -> Any:
+        if self._ast_root is None:
+            t0 = time.perf_counter()
+            if self._pending_rebuild is not None:
+                self._ast_root = self._rebuild_incremental(*self._pending_rebuild)
+                self._pending_rebuild = None
+            if self._ast_root is None:
+                self._ast_root = make_ast_cached(self.src, origin=self.origin)
+                self._count("py_parses")
+            self._add_time("py_parse_s", t0)
+        return self._ast_root
+
+    def _rebuild_incremental(self, old_src: str, old_ast: Any, spans: List[Tuple[int, int, int]]) -> Any:
+        if get_cache().get("py", PY_PARSER_VERSION, self.src) is not None:
+            return None  # 已有缓存，交给常规路径直接取
+        try:
+            # 旧 AST 可能被缓存共享，reparse_incremental 只平移复制出的单元；
+            # 片段解析不走缓存：解析结果随后会被原地平移
+            ast_root = reparse_incremental(old_src, self.src, old_ast, spans, ast_helper.make_ast)
+        except Exception as e:
+            log.warning("[REBUILD] incremental reparse failed, falling back to full parse: %s", e)
+            return None
+        if ast_root is not None:
+            get_cache().put("py", PY_PARSER_VERSION, self.src, ast_root)
+            self._count("incremental_rebuilds")
+        return ast_root
+
+    # ---------------- 符号表 ----------------
+    def _build_symtab(self) -> None:
+        # 符号表按文件构建。目前没有 Pass 声明 REPR_SYMTAB，这里不会被触发，
+        # 所以也无需在项目内跨文件共享 VFS/Builder2。
+        vfs = filesys.VirtualFileSystem(self.project_dir, None, [])
+        # 预先放入当前源码（带缓存 creator），Builder2 会直接复用它而不是重新读盘解析
+        vfs.sources[self.file_name] = filesys.LoadedSource(
+            self.file_name, self.src, self.origin, lambda _src: self.ast_root)
+        builder = symtab.Builder2(vfs)
+        builder.process_or_find_from_base_dir(self.file_name)
+        self._vfs, self._sym_builder = vfs, builder
+        self._count("symtab_builds")
+
+    def _ensure_symtab(self) -> None:
+        if self._sym_builder is None:
+            t0 = time.perf_counter()
+            self._build_symtab()
+            self._add_time("symtab_s", t0)
+
+    @property
+    def vfs(self) -> Any:
+        self._ensure_symtab()
+        return self._vfs
+
+    @property
+    def sym_builder(self) -> Any:
+        self._ensure_symtab()
+        return self._sym_builder
+
+    # ---------------- JS AST ----------------
+    @property
+    def js_ast(self) -> Any:
+        if self._js_ast is None:
+            t0 = time.perf_counter()
+            self._js_ast = parse_grammar_tree(self.src)
+            self._count("js_parses")
+            self._add_time("js_parse_s", t0)
+        return self._js_ast
+
+    def set_js_ast(self, ast: Any) -> None:
+        """放入外部预先解析好的当前源码的 JS AST（如 async 前端并发预取的结果）。"""
+        self._js_ast = ast
+        self._count("js_parses")
+
+    def materialize(self, reprs) -> None:
+        """预先构建给定的表示（REPR_*）。"""
+        for r in reprs:
+            if r == REPR_PY_AST:
+                self.ast_root
+            elif r == REPR_SYMTAB:
+                self.sym_builder
+            elif r == REPR_JS_AST:
+                self.js_ast
+
+    def rebuild(self, new_src: str, spans: Optional[List[Tuple[int, int, int]]] = None,
+                keep_py_ast: bool = True) -> None:
         """
-        将 new_src 作为当前源码，并在需要时重建 AST。
-        注意：这里仅更新 self.src;如果你需要“变更后 AST”,
-        建议在实际实现时重新构建 VFS/符号表并赋值给 ast_root。
+        将 new_src 作为当前源码，并使所有派生表示失效（下次访问时重建）。
+        spans 为 Pass 报告的编辑区间（EditBuffer.spans()）；给出且已有 Python AST 时，
+        下次访问 ast_root 只重新解析被触及的顶层单元，其余单元平移下标后复用。
+        keep_py_ast=False 表示后续 Pass 不再需要 Python AST，直接丢弃。
         """
-        self.src = new_src
-        self.rebuild_ast()
+        old_src, self.src = self.src, new_src
+        if keep_py_ast and spans and self._ast_root is not None:
+            self._pending_rebuild = (old_src, self._ast_root, spans)
+        else:
+            self._pending_rebuild = None
+        self._ast_root = None
+        self._vfs = self._sym_builder = None
+        self._js_ast = None
 
-    def sync_tmp(self):
-        self.tmp_root = Path(".solp_tmp")
-        self.tmp_file = self.tmp_root / self.file_name
-        self.tmp_file.parent.mkdir(parents=True, exist_ok=True)
-        self.tmp_file.write_text(self.src, encoding="utf-8")
 
 class ObfuscationPass:
     """所有混淆 Pass 的抽象基类。"""
     name: str = "BasePass"
+    # 该 Pass 需要 ModuleContext 提供的表示（REPR_*）；管线据此决定哪些表示值得保留
+    requires: FrozenSet[str] = frozenset({REPR_TEXT})
 
     def __init__(self, **kwargs):
         self.params = kwargs or {}
 
+    def fingerprint(self) -> Dict[str, Any]:
+        """Pass 名与参数，写入增量构建清单；任一项变化都会让文件重新混淆。"""
+        params = dict(self.params)
+        if params.get("profile") is not None:
+            params["profile"] = params["profile"].fingerprint()
+        return {"name": self.name, "params": params}
+
     def transform(self, ctx: ModuleContext) -> Tuple[str, Dict[str, Any]]:
         """
         输入 ModuleContext, 输出 (new_src, metadata)。
+        metadata 中可选的 "spans" 为本次编辑的原始区间（EditBuffer.spans()），
+        管线据此增量重建 AST；不提供时整体重新解析。
+        可选的 "edit_ops" 为提交给 EditBuffer 的编辑条数（len(buffer)，spans 会合并相邻编辑），供 --profile 统计。
         这里默认不做修改，仅打印提示。
         """
-        print(f"[{self.name}] {ctx.project_dir / ctx.file_name}: (noop, scaffold only)")
+        log.debug("[%s] %s: (noop, scaffold only)", self.name, ctx.origin)
         return ctx.src, {"changed": False}
 
 
@@ -100,6 +243,7 @@ class ObfuscationPass:
 
 class StringLiteralPass(ObfuscationPass):
     name = "StringLiteral"
+    requires = frozenset({REPR_TEXT, REPR_PY_AST})
 
     def transform(self, ctx: ModuleContext):
         """
@@ -108,20 +252,30 @@ class StringLiteralPass(ObfuscationPass):
         """
         density = float(self.params.get("density", 0.3))
         ast_nodes = ctx.ast_root  # 与你脚本中 obfuscate_file 的 loaded_src.ast 一致
+        # 编码策略与单个字面量的 gas/字节码上限，见 obf_literal.choose_encoding
+        stats: Dict[str, int] = {}
 
         try:
-            new_src = obfuscate_code_literals(ctx.src, ast_nodes)
+            buffer = plan_code_literals(ctx.src, ast_nodes,
+                                        strategy=self.params.get("strategy", DEFAULT_LITERAL_STRATEGY),
+                                        strength=self.params.get("strength", DEFAULT_LITERAL_STRENGTH),
+                                        max_gas=self.params.get("max_gas"), max_size=self.params.get("max_size"),
+                                        stats=stats)
+            new_src = buffer.render()
         except Exception as e:
-            print(f"[{self.name}] ERROR {ctx.project_dir / ctx.file_name}: {e}")
+            log.error("[%s] ERROR %s: %s", self.name, ctx.origin, e)
             return ctx.src, {"changed": False, "error": str(e), "density": density}
 
         changed = (new_src != ctx.src)
-        print(f"[{self.name}] {ctx.project_dir / ctx.file_name}: density={density}, changed={changed}")
-        return new_src, {"changed": changed, "density": density}
+        journal_buffer(str(ctx.origin), self.name, buffer)
+        log.debug("[%s] %s: density=%s, changed=%s, encodings=%s", self.name, ctx.origin, density, changed, stats)
+        return new_src, {"changed": changed, "density": density, "encodings": stats, "spans": buffer.spans(),
+                         "edit_ops": len(buffer)}
 
 
 class ControlFlowPass(ObfuscationPass):
     name = "ControlFlow"
+    requires = frozenset({REPR_TEXT, REPR_PY_AST})
 
     def transform(self, ctx: ModuleContext):
         """
@@ -131,19 +285,29 @@ class ControlFlowPass(ObfuscationPass):
         density = float(self.params.get("density", 0.3))
         ast_nodes = ctx.ast_root  # 与你脚本中 obfuscate_file 的 loaded_src.ast 一致
 
+        # --profile-data：按函数热度调低密度
+        per_func = FunctionDensity(self.params.get("profile"), density)
+        density_for = (lambda unit, fn: per_func(node_name(unit), node_name(fn))) if per_func.profile else None
+
         try:
-            new_src = obfuscate_code_cf(ctx.src, ast_nodes, density=density)
+            buffer = plan_code_cf(ctx.src, ast_nodes, density=density, density_for=density_for)
+            new_src = buffer.render()
         except Exception as e:
-            print(f"[{self.name}] ERROR {ctx.project_dir / ctx.file_name}: {e}")
+            log.error("[%s] ERROR %s: %s", self.name, ctx.origin, e)
             return ctx.src, {"changed": False, "error": str(e), "density": density}
 
         changed = (new_src != ctx.src)
-        print(f"[{self.name}] {ctx.project_dir / ctx.file_name}: density={density}, changed={changed}")
-        return new_src, {"changed": changed, "density": density}
+        journal_buffer(str(ctx.origin), self.name, buffer)
+        log.debug("[%s] %s: density=%s, changed=%s", self.name, ctx.origin, density, changed)
+        meta = {"changed": changed, "density": density, "spans": buffer.spans(), "edit_ops": len(buffer)}
+        if per_func.profile is not None:
+            meta["lightened"] = len(per_func.lightened)
+        return new_src, meta
 
 
 class DeadCodePass(ObfuscationPass):
     name = "DeadCode"
+    requires = frozenset({REPR_TEXT, REPR_PY_AST})
 
     def transform(self, ctx: ModuleContext) -> Tuple[str, Dict[str, Any]]:
         density: float = float(self.params.get("density", 0.3))
@@ -153,6 +317,9 @@ class DeadCodePass(ObfuscationPass):
         total_funcs = 0
         candidates = 0
         prepared: List[Tuple[int, str, int, solnodes.FunctionDefinition, str]] = []
+        # 整个文件只扫描一次，各函数的插槽都从索引中查询
+        index = SourceIndex(ctx.src)
+        per_func = FunctionDensity(self.params.get("profile"), density)
 
         for root in roots:
             for fn in root.get_all_children(lambda x: isinstance(x, solnodes.FunctionDefinition)):
@@ -170,54 +337,91 @@ class DeadCodePass(ObfuscationPass):
                     except Exception:
                         continue  # 拿不到就跳过该函数
 
-                slots = collect_top_level_slots(ctx.src, int(lbrace))
+                slots = collect_top_level_slots(ctx.src, int(lbrace), index=index)
                 if not slots:
                     continue
 
                 candidates += 1
-                if random.random() < density:
+                if random.random() < per_func(node_name(root), node_name(fn)):
                     pos, indent, line_no = random.choice(slots)
                     dead_code = generate_dead_code()
                     prepared.append((pos, indent, line_no, fn, dead_code))
 
-        print(f"[SCAN][{self.name}] {ctx.project_dir / ctx.file_name}: "
-              f"functions={total_funcs}, with_body={candidates}, plan_inserts={len(prepared)}, density={density}")
+        log.debug("[SCAN][%s] %s: functions=%d, with_body=%d, plan_inserts=%d, density=%s",
+                  self.name, ctx.origin, total_funcs, candidates, len(prepared), density)
 
+        lightened = {"lightened": len(per_func.lightened)} if per_func.profile is not None else {}
         if not prepared:
-            return ctx.src, {"changed": False, "functions": total_funcs, "candidates": candidates, "inserts": 0}
+            return ctx.src, {"changed": False, "functions": total_funcs, "candidates": candidates, "inserts": 0,
+                             **lightened}
 
         src = ctx.src
-        for pos, indent, line_no, fn, dead_code in sorted(prepared, key=lambda x: x[0], reverse=True):
-            left, right = src[:pos], src[pos:]
+        buffer = EditBuffer(src)
+        trace = log.isEnabledFor(TRACE)
+        for pos, indent, line_no, fn, dead_code in sorted(prepared, key=lambda x: x[0]):
             needs_leading_nl = (pos > 0 and src[pos - 1] != "\n")
             prefix_nl = "\n" if needs_leading_nl else ""
             extra_indent = INDENT_UNIT if (pos < len(src) and src[pos] == "}") else ""
             indent_for_insert = indent + extra_indent
-            inserted = f"{prefix_nl}{indent_for_insert}{dead_code}\n{indent}"
-            src = left + inserted + right
+            buffer.insert(pos, f"{prefix_nl}{indent_for_insert}{dead_code}\n{indent}")
 
-            fn_name = safe_func_name(fn)
-            preview = dead_code.strip().replace("\n", " ")[:120]
-            print(f"[OBF][{self.name}] file={ctx.project_dir / ctx.file_name} "
-                  f"func={fn_name!r} offset={pos} line={line_no} -> insert: {preview}")
+            if trace:
+                preview = dead_code.strip().replace("\n", " ")[:120]
+                log.log(TRACE, "[OBF][%s] file=%s func=%r offset=%d line=%d -> insert: %s",
+                        self.name, ctx.origin, safe_func_name(fn), pos, line_no, preview)
 
-        return src, {
+        journal_buffer(str(ctx.origin), self.name, buffer)
+        return buffer.render(), {
             "changed": True,
             "functions": total_funcs,
             "candidates": candidates,
             "inserts": len(prepared),
+            "spans": buffer.spans(),
+            "edit_ops": len(buffer),
+            **lightened,
         }
 
 
 class LayoutPass(ObfuscationPass):
     name = "Layout"
+    requires = frozenset({REPR_TEXT, REPR_JS_AST})
+
+    def fingerprint(self) -> Dict[str, Any]:
+        # 同一代项目映射对已有名字是稳定的（只会追加），只计入映射的 generation，
+        # 否则新增一个定义就会让所有文件重跑；映射被删除或重建时 generation 改变，旧输出随之失效
+        params = {k: v for k, v in self.params.items() if k not in ("mapping", "map_generation")}
+        params["project"] = self.params.get("map_generation") if "mapping" in self.params else None
+        return {"name": self.name, "params": params}
 
     def transform(self, ctx: ModuleContext):
 
         # 直接用刚才封装好的入口
-        from obf_layout import layout_obfuscate
-        new_src, stats = layout_obfuscate(ctx.src, str(ctx.tmp_file))
-        print(f"[{self.name}] {ctx.project_dir / ctx.file_name}: renamed={stats['renamed']}, changed={stats['changed']}")
+        from obf_layout import layout_obfuscate, LayoutRenamer
+        mapping = self.params.get("mapping")
+        if mapping is not None:
+            # 项目模式：使用全局定义索引预先分配好的映射，只改索引内的名字
+            renamer = LayoutRenamer(mapping=mapping, restrict=True)
+        else:
+            strategy = self.params.get("names", "counter")
+            if strategy == "hash":
+                # hash 名只由 (--seed, 原名) 决定：跨文件、跨运行一致，导入方与定义方得到同一个名字
+                seed = self.params.get("seed")
+            else:
+                # 名字生成器的种子取自本文件的随机流，--seed 固定时输出可复现
+                seed = random.getrandbits(64)
+            namer = make_namer(strategy, seed=seed)
+            # 新名字也不得与传递 import 的文件中的标识符相同
+            for dep_src in dependency_sources(ctx.project_dir, ctx.file_name, ctx.src).values():
+                if dep_src is not None:
+                    namer.reserve_from_source(dep_src)
+            renamer = LayoutRenamer(namer)
+        try:
+            new_src, stats = layout_obfuscate(ctx.src, str(ctx.project_dir / ctx.file_name),
+                                              renamer=renamer, solidity_ast=ctx.js_ast)
+        except Exception as e:
+            log.error("[%s] ERROR %s: %s", self.name, ctx.origin, e)
+            return ctx.src, {"changed": False, "error": str(e)}
+        log.debug("[%s] %s: renamed=%s, changed=%s", self.name, ctx.origin, stats["renamed"], stats["changed"])
         return new_src, stats
 
 
@@ -228,7 +432,7 @@ class ChaosPass(ObfuscationPass):
         src = ctx.src
         # src = shuffle_code_blocks(src)
         src = minify_code(src)
-        print(f"[{self.name}] {ctx.project_dir / ctx.file_name}: minified and shuffled")
+        log.debug("[%s] %s: minified and shuffled", self.name, ctx.origin)
         return src, {"changed": True}    
 
 
@@ -242,136 +446,521 @@ class _ReplacePlan:
     text:  str
 
 class OperationPass(ObfuscationPass):
+    """
+    把 + - * / % 改写为等价的混合布尔-算术（MBA）形式，params["mode"] 见 OP_MODES：
+    mba 时两侧操作数都无副作用则内联恒等式，否则调用 ObfOps 库中用同样恒等式实现的函数；
+    asm 时全部调用内联汇编实现的库函数；loop 为旧的逐位循环实现。
+    库函数只接受 uint256，因此只改写两侧都可证明为 uint256 的运算；其余无符号运算只内联，
+    类型未知/有符号的运算只内联对有符号数也精确的 + - 形式，其他保持原样。
+    两侧都是数字字面量的常量运算（loop 模式除外）与 unchecked 块中的运算（库函数是 checked 的）保持不动。
+    """
     name = "Operation"
+    requires = frozenset({REPR_TEXT, REPR_JS_AST})
 
     # 统一库名
     LIB_NAME = "ObfOps"
 
-    # 位运算实现：内部函数，静态调用 ObfOps.func(a,b)
-    HELPERS_RAW = "\n".join([
-            MathOps.pre_defined_bitwise_adder,
-            MathOps.pre_defined_bitwise_subtractor_simpler,
-            MathOps.pre_defined_bitwise_subtractor,
-            MathOps.pre_defined_bitwise_multiplier,
-            MathOps.pre_defined_bitwise_divider,
-            MathOps.pre_defined_bitwise_modulo,
-        ]).strip("\n")
-
-    HELPERS_RAW = "library ObfOps {\n" + HELPERS_RAW + "\n}"
+    # 旧的位运算循环实现（loop 模式）：内部函数，静态调用 ObfOps.func(a,b)
+    HELPERS_RAW = MathOps.helper_library("loop", LIB_NAME)
 
     def transform(self, ctx: 'ModuleContext') -> Tuple[str, Dict[str, Any]]:
-        # 1) 把当前源码落盘到临时路径，供 JS 侧解析（保持和你的 get_grammar_tree 约定）
-
-        # 2) 解析 JS AST（必须是 loc/range 开启的）
-        js_ast: Any = json.loads(get_grammar_tree(str(ctx.tmp_file)))
+        # 1) 解析 JS AST（必须是 loc/range 开启的），源码直接经 stdin 传给解析进程
+        js_ast: Any = ctx.js_ast
         src = ctx.src
+        mode = self.params.get("mode", DEFAULT_OP_MODE)
+        if mode not in OP_MODES:
+            raise ValueError(f"unknown op mode {mode!r}; choose from {OP_MODES}")
 
-        # 3) DFS 收集 BinaryOperation，生成替换计划
+        # 2) DFS 收集 BinaryOperation，生成替换计划（只替换最外层，内层在生成文本时递归改写）
         plans: List[_ReplacePlan] = []
 
-        # op → helper 名
-        op_map = {
-            "+": "bitwiseAdd",
-            "-": "bitwiseSubtractByAdd",  # 用补码加法版，稳定
-            "*": "bitwiseMultiply",
-            "/": "bitwiseDivide",
-            "%": "bitwiseModulo",
-        }
+        def _is_target(node: Any) -> bool:
+            return (isinstance(node, dict) and node.get("type") == "BinaryOperation"
+                    and node.get("operator") in ("+", "-", "*", "/", "%") and "range" in node
+                    and isinstance(node.get("left"), dict) and "range" in node["left"]
+                    and isinstance(node.get("right"), dict) and "range" in node["right"]
+                    and (mode == "loop" or not MathOps.is_constant_operation(node)))
 
-        def _slice_src(r: List[int]) -> str:
-            # JS parser 的 range 为 [start, end]（闭区间）
-            return src[r[0]: r[1] + 1]
+        Types = Dict[str, dict]
+        Target = Tuple[dict, str, str, Types]
 
-        def _walk(node: Any):
+        def _declared_types(node: Any, out: Types) -> Types:
+            # 子树中所有变量声明（参数、返回值、局部变量）的 名字 -> 类型节点
             if isinstance(node, dict):
-                if node.get("type") == "BinaryOperation":
-                    op = node.get("operator")
-                    if op in op_map and "range" in node and isinstance(node.get("left"), dict) and isinstance(node.get("right"), dict):
-                        L, R = node["left"], node["right"]
-                        if "range" in L and "range" in R:
-                            left_txt  = _slice_src(L["range"])
-                            right_txt = _slice_src(R["range"])
-                            helper = op_map[op]
-                            # 包一层括号，避免与周围表达式结合优先级产生歧义
-                            call_txt = f"({self.LIB_NAME}.{helper}({left_txt}, {right_txt}))"
-                            start, end = node["range"]
-                            plans.append(_ReplacePlan(start=start, end=end, text=call_txt))
-                # 递归
+                if node.get("type") == "VariableDeclaration" and node.get("name"):
+                    out[node["name"]] = node.get("typeName") or {}
                 for v in node.values():
-                    _walk(v)
+                    _declared_types(v, out)
             elif isinstance(node, list):
                 for v in node:
-                    _walk(v)
+                    _declared_types(v, out)
+            return out
 
-        _walk(js_ast)
+        def _outermost_targets(node: Any, out: List[Target], contract: str = "", function: str = "",
+                               types: Optional[Types] = None) -> List[Target]:
+            # 收集 (运算节点, 所在合约名, 所在函数名, 可见变量的类型)
+            types = types if types is not None else {}
+            if isinstance(node, dict):
+                t = node.get("type")
+                if t == "ContractDefinition":
+                    if node.get("name") == self.LIB_NAME:
+                        return out  # 已注入的库自身不能再改写，否则会递归调用自己
+                    contract = node.get("name") or ""
+                    types = {}
+                    for sub in node.get("subNodes") or []:
+                        if sub.get("type") == "StateVariableDeclaration":
+                            _declared_types(sub.get("variables"), types)
+                elif t in ("FunctionDefinition", "ModifierDefinition"):
+                    function = node.get("name") or ""
+                    types = _declared_types(node, dict(types))
+                elif t == "UncheckedStatement":
+                    return out  # 库函数是 checked 的，改写会让原本回绕的运算 revert
+                if _is_target(node):
+                    out.append((node, contract, function, types))
+                    return out
+                for v in node.values():
+                    _outermost_targets(v, out, contract, function, types)
+            elif isinstance(node, list):
+                for v in node:
+                    _outermost_targets(v, out, contract, function, types)
+            return out
+
+        def _rewrite_operand(node: dict, types: Types) -> str:
+            # JS parser 的 range 为 [start, end]（闭区间）；把其中的目标运算替换为调用
+            start, end = node["range"]
+            inner = EditBuffer(src[start:end + 1])
+            for t, _, _, _ in _outermost_targets(node, [], types=types):
+                ts, te = t["range"]
+                inner.replace(ts - start, te + 1 - start, _rewrite_call(t, types))
+            return inner.render()
+
+        def _rewrite_call(node: dict, types: Types) -> str:
+            op = node["operator"]
+            left, right = node["left"], node["right"]
+            left_txt = _rewrite_operand(left, types)
+            right_txt = _rewrite_operand(right, types)
+            width = MathOps.combined_width(MathOps.unsigned_width(left, types), MathOps.unsigned_width(right, types))
+            unsigned = width is not None
+            if mode == "mba" and MathOps.can_inline(op, unsigned) and MathOps.is_side_effect_free(left) \
+                    and MathOps.is_side_effect_free(right):
+                # 操作数可重复求值：直接内联恒等式，不需要库
+                plans_count[0] += 1
+                inlined[0] += 1
+                return MathOps.mba_inline(op, left_txt, right_txt, unsigned=unsigned)
+            if width in (0, 256):
+                # 包一层括号，避免与周围表达式结合优先级产生歧义
+                plans_count[0] += 1
+                helpers[0] += 1
+                return f"({self.LIB_NAME}.{MathOps.helper_name(op, mode)}({left_txt}, {right_txt}))"
+            # 库函数只接受 uint256：保持原运算，只改写操作数内部
+            kept[0] += 1
+            start, end = node["range"]
+            (ls, le), (rs, re_) = left["range"], right["range"]
+            return src[start:ls] + left_txt + src[le + 1:rs] + right_txt + src[re_ + 1:end + 1]
+
+        plans_count = [0]
+        inlined = [0]
+        helpers = [0]
+        kept = [0]
+        # --profile-data：热函数中的运算按其密度抽样保留原样
+        per_func = FunctionDensity(self.params.get("profile"), 1.0)
+        hot_skipped = 0
+        for node, contract, function, types in _outermost_targets(js_ast, []):
+            if per_func.profile is not None and random.random() >= per_func(contract, function):
+                hot_skipped += 1
+                continue
+            start, end = node["range"]
+            text = _rewrite_call(node, types)
+            if text != src[start:end + 1]:
+                plans.append(_ReplacePlan(start=start, end=end, text=text))
+        profiled = ({"lightened": len(per_func.lightened), "hot_skipped": hot_skipped}
+                    if per_func.profile is not None else {})
 
         if not plans:
-            print(f"[{self.name}] {ctx.project_dir / ctx.file_name}: no binary ops to replace.")
-            return ctx.src, {"changed": False, "replaced": 0}
+            log.debug("[%s] %s: no binary ops to replace.", self.name, ctx.origin)
+            return ctx.src, {"changed": False, "replaced": 0, "kept": kept[0], **profiled}
 
-        # 4) 按 start 逆序应用替换（右侧用 end+1）
-        plans.sort(key=lambda p: p.start, reverse=True)
+        # 3) 统一交给 EditBuffer，按原始下标一次性拼接（右侧用 end+1）
+        buffer = EditBuffer(src)
+        trace = log.isEnabledFor(TRACE)
         for p in plans:
-            left, right = src[:p.start], src[p.end + 1:]
-            src = left + p.text + right
-            print(f"[OBF][{self.name}] replace range=[{p.start}:{p.end}] -> {p.text[:80]!r}")
+            buffer.replace(p.start, p.end + 1, p.text)
+            if trace:
+                log.log(TRACE, "[OBF][%s] replace range=[%d:%d] -> %r", self.name, p.start, p.end, p.text[:80])
 
-        # 5) 若文件未包含库，则在文件末尾追加一次
-        if f"library {self.LIB_NAME}" not in src:
+        # 4) 有库函数调用且文件未包含库时，在文件末尾追加一次
+        library_appended = False
+        if helpers[0] and f"library {self.LIB_NAME}" not in src:
             tail_sep = "" if src.endswith("\n") else "\n"
-            src = f"{src}{tail_sep}\n\n{self.HELPERS_RAW}\n"
-            print(f"[INJECT][{self.name}] appended library {self.LIB_NAME} at file end")
-
-        return src, {"changed": True, "replaced": len(plans), "library_appended": True}
+            buffer.insert(len(src), f"{tail_sep}\n\n{MathOps.helper_library(mode, self.LIB_NAME)}\n")
+            library_appended = True
+            log.debug("[INJECT][%s] appended library %s (%s) at file end", self.name, self.LIB_NAME, mode)
+        journal_buffer(str(ctx.origin), self.name, buffer)
+        src = buffer.render()
+        return src, {"changed": True, "replaced": plans_count[0], "inlined": inlined[0], "kept": kept[0],
+                     "library_appended": library_appended, "spans": buffer.spans(),
+                     "edit_ops": len(buffer), **profiled}
 
 
 # =========================================================
 # 管线执行 & I/O
 # =========================================================
 
-def build_context(project_dir: Path, file_name: str) -> ModuleContext:
-    vfs = filesys.VirtualFileSystem(project_dir, None, [])
-    builder = symtab.Builder2(vfs)
-    builder.process_or_find_from_base_dir(file_name)
-    loaded = vfs.sources[file_name]
-    ast_root = loaded.ast
-    src = loaded.contents
-    return ModuleContext(
-        project_dir=project_dir,
-        file_name=file_name,
-        vfs=vfs,
-        sym_builder=builder,
-        ast_root=ast_root,
-        src=src,
-    )
-
-
-def run_pipeline_on_file(project_dir: Path, file_name: str, passes: List[ObfuscationPass]) -> str:
-    ctx = build_context(project_dir, file_name)
-    print(f"[PIPELINE] Begin → {project_dir / file_name}")
+def build_context(project_dir: Path, file_name: str, src: Optional[str] = None) -> ModuleContext:
+    # 只读入源码（调用方已读好时直接传入 src）；AST / 符号表 / JS AST 均由 ModuleContext 按需构建
+    if src is None:
+        src = (project_dir / file_name).read_text(encoding="utf-8")
+    return ModuleContext(project_dir=project_dir, file_name=file_name, src=src)
+
+
+def derive_file_seed(base_seed: Optional[int], file_key: str) -> Optional[int]:
+    """由 --seed 与文件路径确定性地派生每个文件的种子，使结果与调度顺序无关。"""
+    if base_seed is None:
+        return None
+    digest = hashlib.sha256(f"{base_seed}:{file_key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def run_pipeline(project_dir: Path, file_name: str, passes: List[ObfuscationPass],
+                 seed: Optional[int] = None,
+                 src: Optional[str] = None,
+                 profile: bool = False) -> Tuple[str, List[Dict[str, Any]]]:
+    """对单个文件依次执行 passes，返回 (混淆后源码, 每个 Pass 的 meta 列表)。"""
+    if seed is not None:
+        random.seed(seed)
+    ctx = build_context(project_dir, file_name, src)
+    log.debug("[PIPELINE] Begin → %s", ctx.origin)
+    probe = PassProbe() if profile else None
+    metas = [apply_pass(ctx, passes, i, probe) for i in range(len(passes))]
+    log_pipeline_end(ctx)
+    flush_journal()
+    return ctx.src, metas
+
+
+def apply_pass(ctx: ModuleContext, passes: List[ObfuscationPass], i: int,
+               probe: Optional[PassProbe] = None) -> Dict[str, Any]:
+    """
+    执行 passes[i]，源码有改动时刷新上下文；返回该 Pass 的 meta。
+    给出 probe（--profile）时，meta["profile"] 中附带该 Pass 的耗时/内存/解析/子进程/编辑度量。
+    """
+    p = passes[i]
     current_src = ctx.src
-    ctx.sync_tmp()
+    if probe is not None:
+        probe.start(ctx.meta)
+    new_src, meta = p.transform(ctx)
+    spans = meta.pop("spans", None)
+    edit_ops = meta.pop("edit_ops", None)
+    profile = None
+    if probe is not None:
+        profile = probe.stop(ctx.meta, len(current_src.encode("utf-8")), len(new_src.encode("utf-8")), edit_ops)
+    # 如果 Pass 改动了源码，刷新上下文的源码；派生表示在后续 Pass 首次访问时再重建
+    if new_src != current_src:
+        upcoming = set().union(*(q.requires for q in passes[i + 1:]))
+        ctx.rebuild(new_src, spans, keep_py_ast=REPR_PY_AST in upcoming)
+        log.debug("  └─ [%s] changed=True, meta=%s", p.name, meta)
+    else:
+        log.debug("  └─ [%s] changed=False, meta=%s", p.name, meta)
+    if profile is not None:
+        meta["profile"] = profile
+    return {"pass": p.name, **meta}
+
+
+def log_pipeline_end(ctx: ModuleContext) -> None:
+    log.debug("[PIPELINE] End   → %s (py_parses=%d, incremental=%d, js_parses=%d, symtab=%d)",
+              ctx.origin, ctx.meta.get("py_parses", 0), ctx.meta.get("incremental_rebuilds", 0),
+              ctx.meta.get("js_parses", 0), ctx.meta.get("symtab_builds", 0))
+
+
+def run_pipeline_on_file(project_dir: Path, file_name: str, passes: List[ObfuscationPass],
+                         seed: Optional[int] = None) -> str:
+    return run_pipeline(project_dir, file_name, passes, seed=seed)[0]
+
+
+@dataclass
+class FileJob:
+    project_dir: Path
+    file_name: str      # 相对 project_dir 的路径(posix)
+    out_path: Path
+    seed: Optional[int] = None
+
+
+@dataclass
+class FileResult:
+    job: FileJob
+    src: Optional[str] = None
+    metas: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    skipped: bool = False
+    gas: Optional[Dict[str, Any]] = None    # --gas-report / --max-gas-delta 时的静态 gas 估计
+
+
+def estimate_gas(original: str, obfuscated: str) -> Dict[str, Any]:
+    """混淆前后的静态 gas 估计（两次 JS 解析都经 AST 缓存）；解析失败时只记录错误。"""
+    try:
+        return estimate_delta(parse_grammar_tree(original), parse_grammar_tree(obfuscated))
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def run_file_job(job: FileJob, passes: List[ObfuscationPass], src: Optional[str] = None,
+                 profile: bool = False, gas: bool = False) -> FileResult:
+    """在当前进程中处理一个文件；异常被记录到结果中，不影响其他文件。"""
+    try:
+        if src is None and gas:
+            src = (job.project_dir / job.file_name).read_text(encoding="utf-8")
+        new_src, metas = run_pipeline(job.project_dir, job.file_name, passes, seed=job.seed,
+                                      src=src, profile=profile)
+        return FileResult(job=job, src=new_src, metas=metas,
+                          gas=estimate_gas(src, new_src) if gas else None)
+    except Exception as e:
+        return FileResult(job=job, error=f"{type(e).__name__}: {e}")
+
+
+def _init_worker(parser_workers: int, cache_size: int, cache_dir: Optional[str],
+                 log_level: str = "info", journal: Optional[str] = None) -> None:
+    # 每个子进程各自持有解析池与内存缓存；磁盘缓存目录与编辑日志文件可以共享
+    configure_pool(parser_workers)
+    configure_cache(cache_size, Path(cache_dir) if cache_dir else None)
+    configure_logging(log_level)
+    open_journal(Path(journal) if journal else None)
+
+
+def prepare_project_layout(jobs: List[FileJob], passes: List[ObfuscationPass], map_path: Path,
+                           strategy: str, seed: Optional[int]) -> RenameMap:
+    """
+    项目级 Layout：对所有输入文件建立全局定义索引并分配新名字（沿用 map_path 中的旧映射），
+    把只读映射交给 LayoutPass。
+    """
+    previous = RenameMap.load(map_path)
+    sources: Dict[str, str] = {}
+    asts: Dict[str, Any] = {}
+    for job in jobs:
+        src = (job.project_dir / job.file_name).read_text(encoding="utf-8")
+        sources[job.file_name] = src
+        try:
+            asts[job.file_name] = parse_grammar_tree(src)
+        except Exception as e:
+            log.warning("[LAYOUT] skip index of %s: %s", job.file_name, e)
+
+    rename_map = build_project_map(sources, asts, strategy, seed, previous)
     for p in passes:
-        new_src, meta = p.transform(ctx)
-        # 如果 Pass 改动了源码，刷新上下文的源码；（AST 刷新可在具体 Pass 内实现）
-        if new_src != current_src:
-            ctx.rebuild(new_src)
-            ctx.sync_tmp()
-            current_src = new_src
-            print(f"  └─ [{p.name}] changed=True, meta={meta}")
-        else:
-            print(f"  └─ [{p.name}] changed=False, meta={meta}")
-    print(f"[PIPELINE] End   → {project_dir / file_name}")
-    return current_src
+        if isinstance(p, LayoutPass):
+            p.params["mapping"] = rename_map.mapping
+            p.params["map_generation"] = rename_map.generation
+
+    return rename_map
+
+
+def check_up_to_date(job: FileJob, src: str, manifest: BuildManifest, config: str,
+                     out_dir: Path, force: bool = False) -> Tuple[str, Dict[str, Any], bool]:
+    """
+    按清单判断输入、依赖、Pass 配置、种子与输出是否都未变化。
+    返回 (清单键, 本次的清单记录, 是否可跳过)；记录在写出结果后连同输出哈希一起登记。
+    """
+    key = manifest_key(job, out_dir)
+    entry = BuildManifest.make_entry(job.project_dir, job.file_name, src, config, job.seed)
+    return key, entry, (not force and manifest.is_up_to_date(key, entry, job.out_path))
+
+
+def manifest_key(job: FileJob, out_dir: Path) -> str:
+    try:
+        return job.out_path.relative_to(out_dir).as_posix()
+    except ValueError:
+        return job.out_path.as_posix()
+
+
+_STREAM_END = object()
+
+
+def _forward_result(done_q: "queue.Queue", seq: int, job: FileJob, extra: Any, fut) -> None:
+    try:
+        res = fut.result()
+    except Exception as e:  # 子进程崩溃等
+        res = FileResult(job=job, error=f"{type(e).__name__}: {e}")
+    done_q.put((seq, res, extra))
+
+
+def stream_jobs(jobs: Iterable[FileJob], passes: List[ObfuscationPass],
+                read: Callable[[FileJob], Optional[Tuple[str, Any]]],
+                write: Callable[[FileResult, Any], None],
+                n_jobs: int = 1, initargs: Tuple = (1, 256, None, "info", None), queue_size: int = 8,
+                profile: bool = False, gas: bool = False) -> None:
+    """
+    流式处理：发现 -> 读取 -> 变换 -> 写出，各阶段由有界队列连接。
+    - 发现与读取在读线程中进行，read(job) 返回 (源码, 附加信息)，返回 None 表示跳过；
+    - 变换在执行器中进行（n_jobs<=1 时为单个线程，否则为进程池）；
+    - 写出在写线程中按发现顺序调用 write(result, 附加信息)（乱序完成的结果在重排缓冲中等待）。
+    已读入但尚未写出的文件至多 queue_size 个（外加读队列中的 queue_size 个），内存占用与文件总数无关。
+    """
+    read_q: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    done_q: "queue.Queue" = queue.Queue()
+    permits = threading.BoundedSemaphore(max(1, queue_size))
+    errors: List[BaseException] = []
+    # 消费循环异常退出时置位：读线程不再在已满的 read_q 上无限阻塞
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                read_q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader() -> None:
+        try:
+            for seq, job in enumerate(jobs):
+                try:
+                    item = (seq, job, read(job), None)
+                except Exception as e:
+                    item = (seq, job, None, f"{type(e).__name__}: {e}")
+                if not put(item):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            put(_STREAM_END)
+
+    def writer() -> None:
+        pending: Dict[int, Tuple[FileResult, Any]] = {}
+        next_seq = 0
+        while True:
+            msg = done_q.get()
+            if msg is _STREAM_END:
+                break
+            seq, res, extra = msg
+            pending[seq] = (res, extra)
+            while next_seq in pending:
+                res, extra = pending.pop(next_seq)
+                try:
+                    write(res, extra)
+                except Exception as e:
+                    errors.append(e)
+                next_seq += 1
+                permits.release()
+
+    if n_jobs <= 1:
+        # 单线程执行变换：各 Pass 使用全局 random，不能在多个线程间交错
+        executor = ThreadPoolExecutor(max_workers=1)
+    else:
+        executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=initargs)
+
+    read_thread = threading.Thread(target=reader, name="obf-reader", daemon=True)
+    write_thread = threading.Thread(target=writer, name="obf-writer", daemon=True)
+    read_thread.start()
+    write_thread.start()
+    try:
+        with executor:
+            while True:
+                item = read_q.get()
+                if item is _STREAM_END:
+                    break
+                seq, job, payload, error = item
+                permits.acquire()   # 背压：在途文件数达到上限时阻塞，读线程随之在 read_q 上阻塞
+                if error is not None:
+                    done_q.put((seq, FileResult(job=job, error=error), None))
+                elif payload is None:
+                    done_q.put((seq, FileResult(job=job, skipped=True), None))
+                else:
+                    src, extra = payload
+                    fut = executor.submit(run_file_job, job, passes, src, profile, gas)
+                    fut.add_done_callback(partial(_forward_result, done_q, seq, job, extra))
+    finally:
+        done_q.put(_STREAM_END)
+        write_thread.join()
+        stop.set()
+        while True:
+            try:
+                read_q.get_nowait()
+            except queue.Empty:
+                break
+        read_thread.join()
+    if errors:
+        raise errors[0]
 
 
 def enumerate_sol_files(base: Path) -> Iterable[Path]:
-    for root, _, files in os.walk(base):
-        for f in files:
+    """按路径排序逐个产出 base 下的 .sol 文件（惰性遍历，输出顺序稳定）。"""
+    for root, dirs, files in os.walk(base):
+        dirs.sort()
+        for f in sorted(files):
             if f.endswith(".sol"):
                 yield Path(root) / f
 
 
+def discover_jobs(file_arg: Optional[str], base_dir: Path, out_dir: Path,
+                  seed: Optional[int]) -> Iterable[FileJob]:
+    """
+    --file 与 --dir 统一成 FileJob 流：文件键一律是相对 base_dir 的 posix 路径，
+    输出路径一律是 out_dir / 文件键（子目录结构保持一致）。
+    --file 指向 base_dir 之外的文件时抛 ValueError，不会写到 out_dir 之外或覆盖输入文件。
+    """
+    if file_arg:
+        for file_name in [f.strip() for f in file_arg.split(",") if f.strip()]:
+            src_path = Path(file_name)
+            if not src_path.name.endswith(".sol"):
+                raise ValueError("指定的文件必须以 .sol 结尾")
+            if not (src_path.is_absolute() or src_path.is_file()):
+                # 不是现成的路径时视为相对 base_dir
+                src_path = base_dir / src_path
+            try:
+                rel = src_path.resolve().relative_to(base_dir.resolve()).as_posix()
+            except ValueError:
+                raise ValueError(f"--file {file_name} 不在 --dir {base_dir} 之下") from None
+            yield _file_job(base_dir, rel, out_dir, seed)
+    else:
+        for src_file in enumerate_sol_files(base_dir):
+            rel = src_file.relative_to(base_dir).as_posix()
+            yield _file_job(base_dir, rel, out_dir, seed)
+
+
+def _file_job(base_dir: Path, rel: str, out_dir: Path, seed: Optional[int]) -> FileJob:
+    out_path = out_dir / rel
+    resolved = out_path.resolve()
+    try:
+        resolved.relative_to(out_dir.resolve())
+    except ValueError:
+        raise ValueError(f"输出路径 {out_path} 不在 --out {out_dir} 之下") from None
+    if resolved == (base_dir / rel).resolve():
+        raise ValueError(f"输出路径 {out_path} 与输入文件相同，--out 不能与 --dir 相同")
+    return FileJob(base_dir, rel, out_path, derive_file_seed(seed, rel))
+
+
+def build_passes(enable: Iterable[str] = ("cf", "dead", "literal", "layout"),
+                 cf_density: float = 0.9, dead_density: float = 0.3, literal_density: float = 1.0,
+                 layout_shuffle: float = 0.0, layout_names: str = "counter",
+                 layout_seed: Optional[int] = None,
+                 op_mode: str = DEFAULT_OP_MODE,
+                 profile: Optional[HotProfile] = None,
+                 literal_strategy: str = DEFAULT_LITERAL_STRATEGY,
+                 literal_strength: str = DEFAULT_LITERAL_STRENGTH,
+                 literal_max_gas: Optional[int] = None,
+                 literal_max_size: Optional[int] = None) -> List[ObfuscationPass]:
+    """
+    按启用列表组装 Pass（顺序固定，与 enable 的书写顺序无关）；默认值与命令行一致。
+    给出 profile（--profile-data）时，Operation / ControlFlow / DeadCode 按函数热度调低密度。
+    """
+    enable = set(enable)
+    passes: List[ObfuscationPass] = []
+    hot = {"profile": profile} if profile is not None else {}
+    if "op" in enable:
+        passes.append(OperationPass(mode=op_mode, **hot))
+    if "cf" in enable:
+        passes.append(ControlFlowPass(density=cf_density, **hot))
+    if "dead" in enable:
+        passes.append(DeadCodePass(density=dead_density, **hot))
+    if "literal" in enable:
+        passes.append(StringLiteralPass(density=literal_density, strategy=literal_strategy,
+                                        strength=literal_strength, max_gas=literal_max_gas,
+                                        max_size=literal_max_size))
+    if "layout" in enable:
+        passes.append(LayoutPass(shuffle=layout_shuffle, names=layout_names, seed=layout_seed))
+    if "chaos" in enable:
+        passes.append(ChaosPass())
+    return passes
+
+
 def get_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser(description="Solidity Obfuscation Pipeline (scaffold)")
     ap.add_argument("--file", type=str, default="TheContract.sol", help="指定.sol 文件, 以,分割")
@@ -383,7 +972,45 @@ def get_args() -> argparse.Namespace:
     ap.add_argument("--cf-density", type=float, default=0.9, help="ControlFlow 注入密度（占位）")
     ap.add_argument("--dead-density", type=float, default=0.3, help="DeadCode 注入密度（占位）")
     ap.add_argument("--literal-density", type=float, default=1.0, help="String literal obfuscation rate (0.0-1.0)")
+    ap.add_argument("--literal-strategy", type=str, default=DEFAULT_LITERAL_STRATEGY,
+                    choices=LITERAL_STRATEGIES + (AUTO_STRATEGY,),
+                    help="字符串编码: chunk(多字符分段) / chars(逐字符, 默认) / rotate(循环移位) / xor(滚动异或) / "
+                         "auto(满足 --literal-strength 的最便宜策略)")
+    ap.add_argument("--literal-strength", type=str, default=DEFAULT_LITERAL_STRENGTH, choices=LITERAL_STRATEGIES,
+                    help="auto 时要求的最低强度(由弱到强 chunk < chars < rotate < xor)")
+    ap.add_argument("--literal-max-gas", type=int, default=None, metavar="GAS",
+                    help="单个字面量的估计 gas 上限，超出时改用上限内最便宜的策略，都超出则保留原样")
+    ap.add_argument("--literal-max-size", type=int, default=None, metavar="BYTES",
+                    help="单个字面量的估计字节码大小上限(规则同 --literal-max-gas)")
     ap.add_argument("--layout-shuffle", type=float, default=0.0, help="Layout 重排强度（占位）")
+    ap.add_argument("--op-mode", type=str, default=DEFAULT_OP_MODE, choices=OP_MODES,
+                    help="Operation 改写方式: mba(MBA 恒等式, 默认) / asm(内联汇编库函数) / loop(旧的逐位循环库函数)")
+    ap.add_argument("--profile-data", type=str, default=None, metavar="PROFILE",
+                    help="函数调用次数/gas 数据(本项目 JSON 或 Foundry gas report)，热函数少混淆或不混淆")
+    ap.add_argument("--hot-threshold", type=float, default=DEFAULT_HOT_THRESHOLD,
+                    help="热度(0.0-1.0)不低于该值的函数完全跳过 op/cf/dead")
+    ap.add_argument("--layout-names", type=str, default="counter", choices=sorted(NAME_STRATEGIES),
+                    help="Layout 新名字策略: counter(短计数器) / hash(哈希稳定) / confusable(易混淆字形)")
+    ap.add_argument("--layout-project", action="store_true",
+                    help="Layout 项目模式：跨文件建立全局定义索引并一致重命名，映射持久化到 --rename-map")
+    ap.add_argument("--rename-map", type=str, default=None, help="项目模式的重命名映射文件(默认 <out>/layout_map.json)")
+    ap.add_argument("--manifest", type=str, default=None, help="增量构建清单文件(默认 <out>.manifest.json)")
+    ap.add_argument("--force", action="store_true", help="忽略清单，重新混淆所有文件")
+    ap.add_argument("--profile", type=str, default=None, metavar="REPORT.json",
+                    help="记录每个 Pass 的耗时/CPU/峰值内存/解析与子进程次数/字节数/编辑数，写入 JSON 报告")
+    ap.add_argument("--gas-report", type=str, default=None, metavar="GAS.json",
+                    help="静态估计混淆前后每个函数的 gas，写入 JSON 报告")
+    ap.add_argument("--max-gas-delta", type=int, default=None, metavar="GAS",
+                    help="任一函数的估计 gas 增量超过该值时拒绝该文件的输出(不写出)")
+    ap.add_argument("--log-level", type=str, default="info", choices=list(LOG_LEVELS),
+                    help="日志级别: info 每文件一行, debug 每 Pass 一行, trace 每处编辑一行, off 不输出")
+    ap.add_argument("--journal", type=str, default=None, metavar="EDITS.jsonl",
+                    help="把每处编辑(文件/Pass/区间/替换文本)以 JSONL 追加写入该文件")
+    ap.add_argument("--parser-workers", type=int, default=2, help="常驻 Node.js 解析进程数量")
+    ap.add_argument("--cache-dir", type=str, default=None, help="AST 磁盘缓存目录(不指定则只用内存缓存)")
+    ap.add_argument("--cache-size", type=int, default=256, help="内存 AST 缓存条目上限")
+    ap.add_argument("--jobs", type=int, default=1, help="并行处理文件的进程数")
+    ap.add_argument("--queue-size", type=int, default=8, help="流水线各阶段之间的队列长度(在途文件数上限)")
     args = ap.parse_args()
     return args
 
@@ -391,53 +1018,112 @@ def get_args() -> argparse.Namespace:
 def main():
     args = get_args()
 
-    if args.seed is not None:
-        random.seed(args.seed)
+    configure_logging(args.log_level)
+    open_journal(Path(args.journal) if args.journal else None)
+    configure_pool(args.parser_workers)
+    configure_cache(args.cache_size, Path(args.cache_dir) if args.cache_dir else None)
 
     out_dir = Path(args.out)
     # if out_dir.exists():
     #     shutil.rmtree(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # 组装 Pass 列表（不实现，仅占位）
     enable = {x.strip() for x in args.enable.split(",") if x.strip()}
-    passes: List[ObfuscationPass] = []
-    if "op" in enable:
-        passes.append(OperationPass())
-    if "cf" in enable:
-        passes.append(ControlFlowPass(density=args.cf_density))
-    if "dead" in enable:
-        passes.append(DeadCodePass(density=args.dead_density))
-    if "literal" in enable:
-        passes.append(StringLiteralPass(density=args.literal_density))
-    if "layout" in enable:
-        passes.append(LayoutPass(shuffle=args.layout_shuffle))
-    if "chaos" in enable:
-        passes.append(ChaosPass())
+    hot_profile = None
+    if args.profile_data:
+        hot_profile = load_profile(Path(args.profile_data), args.hot_threshold)
+        hot = sum(1 for h in hot_profile.heat.values() if h >= args.hot_threshold)
+        log.info("[HOT] %d function(s) profiled, %d skipped as hot <- %s",
+                 len(hot_profile.heat), hot, args.profile_data)
+    passes = build_passes(enable, cf_density=args.cf_density, dead_density=args.dead_density,
+                          literal_density=args.literal_density, layout_shuffle=args.layout_shuffle,
+                          layout_names=args.layout_names, layout_seed=args.seed, op_mode=args.op_mode,
+                          profile=hot_profile,
+                          literal_strategy=args.literal_strategy, literal_strength=args.literal_strength,
+                          literal_max_gas=args.literal_max_gas, literal_max_size=args.literal_max_size)
 
     base_dir = Path(args.dir) # if args.dir else Path(".")
-    # 指定文件
-    if args.file:
-        for file_name in [f.strip() for f in args.file.split(",") if f.strip()]:
-            src_path = Path(file_name)
-            if not src_path.name.endswith(".sol"):
-                raise ValueError("指定的文件必须以 .sol 结尾")
-            obf_src = run_pipeline_on_file(base_dir, src_path.name, passes)
-            out_path = out_dir / src_path.name
-            out_path.write_text(obf_src, encoding="utf-8")
-            print(f"[WRITE] {out_path}")
-        return
-
-    # 目录下所有文件
-    for src_file in enumerate_sol_files(base_dir):
-        rel = src_file.relative_to(base_dir)
-        obf_src = run_pipeline_on_file(base_dir, src_file.name, passes)
-        out_path = out_dir / rel
-        out_path.write_text(obf_src, encoding="utf-8")
-        print(f"[WRITE] {out_path}")
-
-    print("=== Pipeline scaffold complete ===")
-
+    jobs: Iterable[FileJob] = discover_jobs(args.file, base_dir, out_dir, args.seed)
+
+    rename_map: Optional[RenameMap] = None
+    rename_map_path = Path(args.rename_map) if args.rename_map else out_dir / "layout_map.json"
+    if args.layout_project and "layout" in enable:
+        # 全局定义索引需要先看到所有文件
+        jobs = list(jobs)
+        rename_map = prepare_project_layout(jobs, passes, rename_map_path, args.layout_names, args.seed)
+
+    run_t0 = time.perf_counter()
+    profiles: Dict[str, List[Dict[str, Any]]] = {}
+    manifest = BuildManifest.load(Path(args.manifest) if args.manifest else default_manifest_path(out_dir))
+    config = config_fingerprint(p.fingerprint() for p in passes)
+    counts = {"files": 0, "skipped": 0, "failed": 0, "rejected": 0}
+    gas_reports: Dict[str, Dict[str, Any]] = {}
+    check_gas = args.gas_report is not None or args.max_gas_delta is not None
+
+    def read_job(job: FileJob) -> Optional[Tuple[str, Any]]:
+        src = (job.project_dir / job.file_name).read_text(encoding="utf-8")
+        key, entry, up_to_date = check_up_to_date(job, src, manifest, config, out_dir, force=args.force)
+        if up_to_date:
+            return None
+        return src, (key, entry)
+
+    def write_result(res: FileResult, extra: Any) -> None:
+        counts["files"] += 1
+        if res.skipped:
+            counts["skipped"] += 1
+            log.info("[SKIP] %s: up to date", res.job.project_dir / res.job.file_name)
+            return
+        if res.error is not None:
+            counts["failed"] += 1
+            log.error("[ERROR] %s: %s", res.job.project_dir / res.job.file_name, res.error)
+            return
+        key, entry = extra
+        if res.gas is not None:
+            gas_reports[key] = res.gas
+            if args.max_gas_delta is not None and "error" in res.gas:
+                # 无法估计时不能证明增量在上限内：按超限处理
+                counts["rejected"] += 1
+                log.error("[GAS] %s: rejected, gas estimate failed (%s) with --max-gas-delta set",
+                          res.job.project_dir / res.job.file_name, res.gas["error"])
+                return
+            if args.max_gas_delta is not None and res.gas.get("max_delta", 0) > args.max_gas_delta:
+                counts["rejected"] += 1
+                log.error("[GAS] %s: rejected, %s +%d gas > --max-gas-delta %d",
+                          res.job.project_dir / res.job.file_name, res.gas["max_delta_function"],
+                          res.gas["max_delta"], args.max_gas_delta)
+                return
+        res.job.out_path.parent.mkdir(parents=True, exist_ok=True)
+        res.job.out_path.write_text(res.src, encoding="utf-8")
+        changed = [m["pass"] for m in res.metas if m.get("changed")]
+        log.info("[WRITE] %s (seed=%s, changed_by=%s)", res.job.out_path, res.job.seed, changed)
+        manifest.record(key, entry, res.src)
+        if args.profile:
+            profiles[key] = [{"pass": m["pass"], **m["profile"]} for m in res.metas if "profile" in m]
+
+    stream_jobs(jobs, passes, read_job, write_result, n_jobs=args.jobs,
+                initargs=(1, args.cache_size, args.cache_dir, args.log_level, args.journal), queue_size=args.queue_size,
+                profile=bool(args.profile), gas=check_gas)
+
+    manifest.save()
+    if rename_map is not None:
+        rename_map.save(rename_map_path)
+        log.info("[LAYOUT] rename map: names=%d -> %s", len(rename_map.mapping), rename_map_path)
+
+    if args.profile:
+        write_report(Path(args.profile), profiles, time.perf_counter() - run_t0)
+        log.info("[PROFILE] %d file(s) -> %s", len(profiles), args.profile)
+    if args.gas_report:
+        path = Path(args.gas_report)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(dict(sorted(gas_reports.items())), indent=2, ensure_ascii=False),
+                        encoding="utf-8")
+        log.info("[GAS] %d file(s) -> %s", len(gas_reports), args.gas_report)
+    log.info("[CACHE] %s", get_cache().stats())
+    log.info("=== Pipeline scaffold complete: files=%d, skipped=%d, failed=%d, rejected=%d, jobs=%d ===",
+             counts["files"], counts["skipped"], counts["failed"], counts["rejected"], args.jobs)
+    if counts["failed"] or counts["rejected"]:
+        # 单个文件的异常/gas 超限只记录不中断，但整次运行仍以非零状态退出，CI 据此拦截
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
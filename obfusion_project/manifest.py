@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+增量构建清单：记录每个文件上次混淆时的全部输入与输出，未变化的文件下次直接跳过。
+
+每个文件一条记录：
+- input:  输入源码的 sha256
+- deps:   传递 import 到的各依赖文件 -> sha256（找不到的依赖记为 null）
+- config: Pass 列表及参数的指纹
+- seed:   该文件派生出的随机种子
+- output: 输出源码的 sha256（输出被删除/改动时也会重新生成）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from sol_lexer import tokenize
+
+MANIFEST_VERSION = 1
+
+_IMPORT_RE = re.compile(r"""\bimport\s+(?:[^;"']*?\bfrom\s+)?["']([^"']+)["']""")
+
+
+def digest_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def config_fingerprint(fingerprints: Iterable[Dict[str, Any]]) -> str:
+    """Pass 指纹列表（见 ObfuscationPass.fingerprint）的规范化哈希。"""
+    data = json.dumps(list(fingerprints), sort_keys=True, separators=(",", ":"), default=str)
+    return digest_text(data)
+
+
+def import_paths(src: str) -> List[str]:
+    """源码中 import 的路径（跳过注释/字符串里的 import 字样）。"""
+    tokens = tokenize(src)
+    return [m.group(1) for m in _IMPORT_RE.finditer(src) if not tokens.in_comment_or_string(m.start())]
+
+
+def _resolve_import(project_dir: Path, importer: str, path: str) -> str:
+    """把 import 路径解析为相对 project_dir 的文件键：./ ../ 相对导入者所在目录，其余相对项目根。"""
+    if path.startswith("./") or path.startswith("../"):
+        base = Path(importer).parent
+        return os.path.normpath((base / path).as_posix()).replace(os.sep, "/")
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def dependency_digests(project_dir: Path, file_name: str, src: str) -> Dict[str, Optional[str]]:
+    """file_name 传递依赖的 {文件键: sha256}；读不到的依赖记为 None。"""
+    return {k: digest_text(v) if v is not None else None
+            for k, v in dependency_sources(project_dir, file_name, src).items()}
+
+
+def dependency_sources(project_dir: Path, file_name: str, src: str) -> Dict[str, Optional[str]]:
+    """file_name 传递依赖的 {文件键: 源码}；读不到的依赖记为 None。"""
+    deps: Dict[str, Optional[str]] = {}
+    stack = [(file_name, src)]
+    while stack:
+        importer, text = stack.pop()
+        for path in import_paths(text):
+            key = _resolve_import(project_dir, importer, path)
+            if key in deps or key == file_name:
+                continue
+            try:
+                dep_src = (project_dir / key).read_text(encoding="utf-8")
+            except OSError:
+                deps[key] = None
+                continue
+            deps[key] = dep_src
+            stack.append((key, dep_src))
+    return dict(sorted(deps.items()))
+
+
+class BuildManifest:
+    """--out 旁边的清单文件（紧凑 JSON），键为输出文件相对 --out 的路径。"""
+
+    def __init__(self, path: Path, entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest":
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("files", {}))
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"version": MANIFEST_VERSION, "files": self.entries},
+                          sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def make_entry(project_dir: Path, file_name: str, src: str, config: str,
+                   seed: Optional[int]) -> Dict[str, Any]:
+        """本次运行的输入记录（不含 output）。"""
+        return {
+            "input": digest_text(src),
+            "deps": dependency_digests(project_dir, file_name, src),
+            "config": config,
+            "seed": seed,
+        }
+
+    def is_up_to_date(self, key: str, entry: Dict[str, Any], out_path: Path) -> bool:
+        old = self.entries.get(key)
+        if old is None or any(old.get(k) != v for k, v in entry.items()):
+            return False
+        try:
+            return digest_text(out_path.read_text(encoding="utf-8")) == old.get("output")
+        except OSError:
+            return False
+
+    def record(self, key: str, entry: Dict[str, Any], output: str) -> None:
+        self.entries[key] = dict(entry, output=digest_text(output))
+
+
+def default_manifest_path(out_dir: Path) -> Path:
+    """默认放在 --out 目录旁边：<out>.manifest.json"""
+    out_dir = Path(out_dir)
+    return out_dir.with_name(out_dir.name + ".manifest.json")
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+混淆管线的 asyncio 前端。
+
+- JS 解析：AsyncJsParser 通过 asyncio.create_subprocess_exec 连接常驻的
+  `node getGrammarTree.js --serve`，同一连接上可有多个请求在途，按 id 分发响应；
+  结果与同步路径共用 AST 缓存。
+- 管线：run_pipeline_on_file_async 在需要 JS AST 的 Pass 之前异步取得 AST
+  （初始源码的 AST 在开始时即预取），各 Pass 本身在执行器中运行，不阻塞事件循环。
+- obfuscate_many(paths, passes, concurrency=N)：并发处理多个文件，结果按输入顺序返回。
+
+各 Pass 使用全局 random；默认的 CPU 执行器只有一个线程，并且每个文件在 Pass 之间保存/恢复
+自己的随机状态，因此并发运行的输出与同步管线在相同种子下完全一致。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import json
+import random
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ast_cache import get_cache
+from js_parser import DEFAULT_REQUEST_TIMEOUT, GRAMMAR_TREE_SCRIPT, JsParserError, count_parser_io, parser_version
+from obf_log import flush_journal, get_logger
+from obf_profile import PassProbe
+from main import (REPR_JS_AST, FileJob, FileResult, ObfuscationPass, apply_pass,
+                  build_context, build_passes, derive_file_seed, log_pipeline_end)
+
+# 单行 JSON 的 AST 可能很大，StreamReader 默认 64KB 的行长度上限不够用
+_STREAM_LIMIT = 256 * 1024 * 1024
+
+log = get_logger("async")
+
+
+class AsyncJsParser:
+    """
+    一个常驻 node 解析进程的 asyncio 连接；进程退出时下一次请求自动重启。
+    请求在 timeout 秒内没有响应时与崩溃同样处理：杀掉进程，重启后重试一次。
+    """
+
+    def __init__(self, script: Path = GRAMMAR_TREE_SCRIPT, node: str = "node",
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        self.script = Path(script)
+        self.node = node
+        self.timeout = timeout
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        # 当前进程的在途请求；每个进程一份，旧进程的读协程只让发给它自己的请求失败
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._stderr_tail: collections.deque = collections.deque(maxlen=50)
+        self._tasks: List[asyncio.Task] = []
+        self._start_lock: Optional[asyncio.Lock] = None
+        self.restarts = 0
+
+    def _alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    async def _ensure_started(self) -> None:
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._alive():
+                return
+            if self._proc is not None:
+                self.restarts += 1
+            self._stderr_tail.clear()
+            self._proc = await asyncio.create_subprocess_exec(
+                self.node, str(self.script), "--serve",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=_STREAM_LIMIT,
+            )
+            count_parser_io(spawns=1)
+            self._pending = {}
+            self._tasks = [asyncio.ensure_future(self._read_responses(self._proc, self._pending)),
+                           asyncio.ensure_future(self._drain_stderr(self._proc))]
+
+    async def _read_responses(self, proc: asyncio.subprocess.Process,
+                              pending: Dict[int, asyncio.Future]) -> None:
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                line = await proc.stdout.readline()
+                if not line:
+                    break
+                count_parser_io(bytes_received=len(line))
+                resp = json.loads(line)
+                fut = pending.pop(resp.get("id"), None)
+                if fut is not None and not fut.done():
+                    fut.set_result(resp)
+        except (ValueError, OSError) as e:
+            error = e
+        # 进程退出或输出损坏：发给该进程的在途请求都失败
+        detail = "\n".join(self._stderr_tail)
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(JsParserError(f"parser worker failed (exit={proc.returncode}): {error}\n{detail}"))
+        pending.clear()
+
+    async def _drain_stderr(self, proc: asyncio.subprocess.Process) -> None:
+        async for line in proc.stderr:
+            self._stderr_tail.append(line.decode("utf-8", "replace").rstrip("\n"))
+
+    async def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """发送一个请求并等待响应；连接断开或超时时重启进程后重试一次。"""
+        for attempt in range(2):
+            await self._ensure_started()
+            proc, pending = self._proc, self._pending
+            self._next_id += 1
+            req_id = self._next_id
+            fut = asyncio.get_running_loop().create_future()
+            pending[req_id] = fut
+            try:
+                data = (json.dumps(dict(payload, id=req_id), ensure_ascii=False) + "\n").encode("utf-8")
+                proc.stdin.write(data)
+                count_parser_io(requests=1, bytes_sent=len(data))
+                await proc.stdin.drain()
+                resp = await asyncio.wait_for(fut, timeout=self.timeout)
+            except (OSError, JsParserError, asyncio.TimeoutError) as e:
+                pending.pop(req_id, None)
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                if attempt:
+                    if isinstance(e, JsParserError):
+                        raise
+                    detail = str(e) or f"no response from parser worker within {self.timeout:g}s"
+                    raise JsParserError(f"parser worker failed: {detail}") from e
+                continue
+            if "error" in resp:
+                raise JsParserError(json.dumps({"error": resp["error"], "location": resp.get("location")}))
+            return resp
+        raise JsParserError("unreachable")
+
+    async def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.returncode is None:
+            proc.stdin.close()
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+        for t in self._tasks:
+            await asyncio.gather(t, return_exceptions=True)
+        self._tasks = []
+
+
+class AsyncJsParserPool:
+    """若干 AsyncJsParser 轮流分配请求；解析结果经共享 AST 缓存。需在同一个事件循环中使用。"""
+
+    def __init__(self, size: int = 2, script: Path = GRAMMAR_TREE_SCRIPT, node: str = "node",
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        self.size = max(1, int(size))
+        self._parsers = [AsyncJsParser(script, node, timeout) for _ in range(self.size)]
+        self._next = 0
+
+    def _pick(self) -> AsyncJsParser:
+        parser = self._parsers[self._next % self.size]
+        self._next += 1
+        return parser
+
+    async def parse_source(self, source: str) -> Any:
+        cache = get_cache()
+        version = parser_version()
+        ast = cache.get("js", version, source, persist=True)
+        if ast is None:
+            ast = (await self._pick().request({"source": source}))["ast"]
+            cache.put("js", version, source, ast, persist=True)
+        return ast
+
+    async def close(self) -> None:
+        await asyncio.gather(*(p.close() for p in self._parsers), return_exceptions=True)
+
+    async def __aenter__(self) -> "AsyncJsParserPool":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+_CPU_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def _cpu_executor() -> ThreadPoolExecutor:
+    # 单线程：Pass 共享全局 random 与会话状态，串行执行才能保证可复现
+    global _CPU_EXECUTOR
+    if _CPU_EXECUTOR is None:
+        _CPU_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="obf-cpu")
+    return _CPU_EXECUTOR
+
+
+def _step(ctx, passes: List[ObfuscationPass], i: int, rng_state: Any,
+          probe: Optional[PassProbe]) -> Tuple[Any, Dict[str, Any]]:
+    """在执行器线程中运行一个 Pass，前后切换到该文件自己的随机状态。"""
+    random.setstate(rng_state)
+    meta = apply_pass(ctx, passes, i, probe)
+    return random.getstate(), meta
+
+
+async def run_pipeline_on_file_async(project_dir: Path, file_name: str, passes: List[ObfuscationPass],
+                                     seed: Optional[int] = None,
+                                     parser: Optional[AsyncJsParserPool] = None,
+                                     executor: Optional[Executor] = None,
+                                     profile: bool = False) -> Tuple[str, List[Dict[str, Any]]]:
+    """run_pipeline 的异步版本，返回 (混淆后源码, 每个 Pass 的 meta 列表)。"""
+    if parser is None:
+        async with AsyncJsParserPool(size=1) as own_parser:
+            return await run_pipeline_on_file_async(project_dir, file_name, passes, seed,
+                                                    own_parser, executor, profile)
+    loop = asyncio.get_running_loop()
+    executor = executor or _cpu_executor()
+
+    src = await asyncio.to_thread((Path(project_dir) / file_name).read_text, encoding="utf-8")
+    ctx = build_context(project_dir, file_name, src)
+    # 种子为 None 时与同步管线一样不可复现
+    rng_state = random.Random(seed).getstate()
+
+    # 初始源码的 JS AST 与前面的 Pass 并行预取
+    prefetch = None
+    if any(REPR_JS_AST in p.requires for p in passes):
+        prefetch = asyncio.ensure_future(parser.parse_source(src))
+
+    log.debug("[PIPELINE] Begin → %s", ctx.origin)
+    # 注意：JS AST 在 Pass 之外异步获取，其耗时不计入该 Pass 的 profile
+    probe = PassProbe() if profile else None
+    metas: List[Dict[str, Any]] = []
+    js_src: Optional[str] = None
+    try:
+        for i, p in enumerate(passes):
+            if REPR_JS_AST in p.requires and ctx.src is not js_src:
+                if prefetch is not None and ctx.src is src:
+                    ast = await prefetch
+                else:
+                    ast = await parser.parse_source(ctx.src)
+                ctx.set_js_ast(ast)
+                js_src = ctx.src
+            rng_state, meta = await loop.run_in_executor(executor, _step, ctx, passes, i, rng_state, probe)
+            metas.append(meta)
+    finally:
+        if prefetch is not None:
+            if not prefetch.done():
+                prefetch.cancel()
+            elif not prefetch.cancelled():
+                prefetch.exception()  # 未被使用的预取失败不应成为“未取回的异常”
+    log_pipeline_end(ctx)
+    flush_journal()
+    return ctx.src, metas
+
+
+def _job_for(path: Path, project_dir: Optional[Path], seed: Optional[int]) -> FileJob:
+    path = Path(path)
+    if project_dir is None:
+        base, rel = path.parent, path.name
+    else:
+        base = Path(project_dir)
+        try:
+            rel = path.resolve().relative_to(base.resolve()).as_posix()
+        except ValueError:
+            rel = path.as_posix()
+    return FileJob(base, rel, Path(rel), derive_file_seed(seed, rel))
+
+
+async def obfuscate_many(paths: Iterable[Path], passes: Optional[List[ObfuscationPass]] = None,
+                         concurrency: int = 8, seed: Optional[int] = None,
+                         project_dir: Optional[Path] = None, parser_workers: int = 2,
+                         executor: Optional[Executor] = None) -> List[FileResult]:
+    """
+    并发混淆多个 .sol 文件，至多 concurrency 个文件同时在途；结果按输入顺序返回，
+    单个文件的异常记录在对应 FileResult.error 中。
+    - passes: 不传时使用与命令行默认一致的 cf,dead,literal,layout
+    - project_dir: 文件键与符号解析的根目录；不传时取各文件所在目录
+    """
+    if passes is None:
+        passes = build_passes()
+    jobs = [_job_for(p, project_dir, seed) for p in paths]
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async with AsyncJsParserPool(size=parser_workers) as parser:
+        async def run_one(job: FileJob) -> FileResult:
+            async with sem:
+                try:
+                    src, metas = await run_pipeline_on_file_async(
+                        job.project_dir, job.file_name, passes, seed=job.seed,
+                        parser=parser, executor=executor)
+                    return FileResult(job=job, src=src, metas=metas)
+                except Exception as e:
+                    return FileResult(job=job, error=f"{type(e).__name__}: {e}")
+
+        return list(await asyncio.gather(*(run_one(job) for job in jobs)))
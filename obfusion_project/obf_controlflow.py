@@ -9,6 +9,7 @@ from pathlib import Path
 from dataclasses import dataclass
 from solidity_parser import filesys
 from solidity_parser.ast import symtab, ast2builder, solnodes2, solnodes
+from edit_buffer import EditBuffer, trailing_whitespace
 
 # this is user input
 files_to_obfuscate = ['FloatingFunc.sol', 'TestContract.sol', 'TheContract.sol']
@@ -114,15 +115,6 @@ class Insertion:
     stmt: solnodes.Stmt
     comment: str
 
-INDENT_REG = re.compile(r'[ \t]+$')
-
-def get_trailing_whitespace(s) -> str:
-    match = INDENT_REG.search(s)
-    if match:
-        return match.group(0)
-    else:
-        return ""
-
 LINE_REG = re.compile("\r?\n")
 
 def indent_by(s, indentation) -> str:
@@ -130,19 +122,22 @@ def indent_by(s, indentation) -> str:
 
 
 def modify_text(src_code, modifications):
-    reverse_sorted_modifications = sorted(modifications, key=lambda x: (-x.stmt.start_location.line, x.stmt.start_location.column))
-    current_source_code = src_code
+    return modification_buffer(src_code, modifications).render()
+
 
-    for ins in reverse_sorted_modifications:
-        left = current_source_code[0:ins.stmt.start_buffer_index]
-        right = current_source_code[ins.stmt.end_buffer_index:]
+def modification_buffer(src_code, modifications) -> EditBuffer:
+    # 所有替换都基于原始下标，由 EditBuffer 一次性线性拼接
+    buffer = EditBuffer(src_code)
+
+    for ins in modifications:
+        start, end = ins.stmt.start_buffer_index, ins.stmt.end_buffer_index
 
         # for formatting the comments nicely
-        whitespace = get_trailing_whitespace(left)
+        whitespace = trailing_whitespace(src_code, start)
         formatted_comment = indent_by(f'{ins.comment}', whitespace)
-        current_source_code = left + formatted_comment + '\n' + whitespace + right
+        buffer.replace(start, end, formatted_comment + '\n' + whitespace)
 
-    return current_source_code
+    return buffer
 
 def obfuscate_code_cf(src_code, ast_nodes, density=0.3):
     """
@@ -150,23 +145,32 @@ def obfuscate_code_cf(src_code, ast_nodes, density=0.3):
         :src_code: original code
         :ast_nodes: ast tree nodes
     """
+    code = plan_code_cf(src_code, ast_nodes, density).render()
+    # code = minify_code(code)
+    # code = shuffle_code_blocks(code)
+    return code
+
+
+def plan_code_cf(src_code, ast_nodes, density=0.3, density_for=None) -> EditBuffer:
+    """
+        Same as obfuscate_code_cf, but returns the pending edits (for pipelines that need the edited ranges)
+        density_for(unit, func) -> float overrides density per function (profile-guided)
+    """
     modifications = []
 
     for node in ast_nodes:
         if not node:
             continue
         for func in node.get_all_children(lambda x: isinstance(x, solnodes.FunctionDefinition)):
+            func_density = density_for(node, func) if density_for is not None else density
             for stmt in func.get_all_children(lambda x: isinstance(x, solnodes.ExprStmt)):
                 stmt_code = src_code[stmt.start_buffer_index:stmt.end_buffer_index] # complexify_conditions(src_code)
                 # print("Original Statement:", stmt_code)
-                if random.random() < density:
+                if random.random() < func_density:
                     obf_code = add_true_condition(stmt_code)
                     # print(f"Obfuscated Statement:\n{obf_code}\n")
                     modifications.append(Insertion(stmt, obf_code))
-    code = modify_text(src_code, modifications)
-    # code = minify_code(code)
-    # code = shuffle_code_blocks(code)
-    return code
+    return modification_buffer(src_code, modifications)
 
 
 def obfuscate_file(file_name):
@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+"""
+静态 gas 开销估计：在 getGrammarTree.js 的 JS AST 上按语法结构计价，比较混淆前后每个函数的估计 gas。
+
+这不是精确的 gas 计算，而是用来在编译前拦下明显过贵的输出：
+- 存储：每个函数内首次访问某个状态变量按冷 SLOAD 计，之后按热访问；首次写入按 SSTORE 计，再次写入按热访问计；
+  映射/数组下标额外计一次 keccak；constant/immutable 不计存储。
+- 调用：外部调用按 CALL 计；内部函数调用计调用开销 + 被调函数体（记忆化，递归时只计开销）。
+- 循环：`for (i = a; i < b; ...)` 这类字面量边界的循环按实际次数计，其余循环按 DEFAULT_LOOP_ITERATIONS 计并标记 unbounded。
+- 分支：条件只由字面量组成（ControlFlowPass 的不透明谓词、DeadCodePass 的 `if (1 == 0)`）时在编译期求值，
+  只计实际执行的分支与一次跳转；其余分支取较贵的一侧（上界）。
+- 注入的辅助代码：ObfOps 库函数按 HELPER_GAS 的模型计价（loop 版本按典型 64 位进位链估计），
+  string.concat 链（StringLiteralPass）按调用次数与参数个数计价，ObfStr.decode 按字节数计价。
+函数按（合约序号, 函数序号）对应前后两棵 AST（Layout 会改名，位置不变）；原文件中没有的合约/函数
+（如注入的 ObfOps 库）不单独报告，其开销已计入调用方。
+"""
+
+from __future__ import annotations
+
+from fractions import Fraction
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# ---------------- 价格表（近似值，单位 gas） ----------------
+LEAF_GAS = 3                 # 字面量 / 局部变量 (PUSH / DUP)
+SLOAD_COLD_GAS = 2100
+SLOAD_WARM_GAS = 100
+SSTORE_GAS = 2900            # 热槽位写入（非零 -> 非零）；首次访问另加冷访问
+KECCAK_GAS = 42              # 映射/数组槽位计算
+JUMP_GAS = 10                # 条件跳转
+INTERNAL_CALL_GAS = 30       # 内部调用的跳转与栈操作
+EXTERNAL_CALL_GAS = 2600     # 冷地址 CALL
+EVENT_GAS = 1125             # LOG 基础 + 一个 topic + 少量数据
+REQUIRE_GAS = 10
+STRING_LITERAL_GAS = 30      # 内存中构造字符串（每 32 字节另加 STRING_WORD_GAS）
+STRING_WORD_GAS = 6
+CONCAT_BASE_GAS = 160        # string.concat / bytes.concat：分配 + 长度计算
+CONCAT_ARG_GAS = 60          # 每个参数的拷贝
+ABI_ENCODE_GAS = 100
+HASH_GAS = 72
+DEFAULT_LOOP_ITERATIONS = 10
+
+OP_GAS = {
+    "+": 25, "-": 25, "*": 30, "/": 30, "%": 30, "**": 100,      # 0.8 checked 运算含溢出检查
+    "&": 3, "|": 3, "^": 3, "<<": 6, ">>": 6,
+    "==": 3, "!=": 6, "<": 3, ">": 3, "<=": 6, ">=": 6,
+    "&&": JUMP_GAS, "||": JUMP_GAS,
+}
+UNARY_GAS = {"!": 3, "~": 3, "-": 25, "++": 25, "--": 25, "delete": 5}
+
+# 注入的 ObfOps 库函数（不含参数求值）。loop 版本按 64 位进位链的典型情形估计，最坏情况（256 位）约为 4 倍
+_LOOP_ADD = 30 + 64 * 50
+HELPER_GAS = {
+    # mba
+    "mbaAdd": 90, "mbaSub": 100, "mbaMul": 150, "mbaDiv": 110, "mbaMod": 110,
+    # asm
+    "asmAdd": 60, "asmSub": 60, "asmMul": 80, "asmDiv": 60, "asmMod": 60,
+    # loop（旧实现）
+    "bitwiseAdd": _LOOP_ADD,
+    "bitwiseSubtractByAdd": 2 * _LOOP_ADD + 30,
+    "bitwiseSubtract": _LOOP_ADD,
+    "bitwiseMultiply": 64 * (60 + _LOOP_ADD // 2),
+    "bitwiseDivide": 64 * (32 * _LOOP_ADD + 2 * _LOOP_ADD),
+    "bitwiseModulo": 64 * (_LOOP_ADD + 40),
+}
+HELPER_LIBRARY = "ObfOps"
+
+# StringLiteralPass 注入的解码库：一次调用 + 每字节一轮循环（unchecked，含下标检查）
+STRING_LIBRARY = "ObfStr"
+STR_DECODE_BASE_GAS = 60
+STR_DECODE_BYTE_GAS = 75
+
+_ASSIGN_OPS = frozenset({"=", "+=", "-=", "*=", "/=", "%=", "|=", "&=", "^=", "<<=", ">>="})
+
+
+def literal_gas(nbytes: int) -> int:
+    """在内存中构造 nbytes 字节的字符串/hex 字面量"""
+    return STRING_LITERAL_GAS + STRING_WORD_GAS * ((nbytes + 31) // 32)
+
+
+def concat_gas(nargs: int) -> int:
+    return CONCAT_BASE_GAS + CONCAT_ARG_GAS * nargs
+
+
+class _Unknown(Exception):
+    """常量求值失败"""
+
+
+def _children(node: Any) -> Iterable[dict]:
+    if isinstance(node, dict):
+        for k, v in node.items():
+            if k in ("loc", "range"):
+                continue
+            if isinstance(v, dict):
+                yield v
+            elif isinstance(v, list):
+                yield from (x for x in v if isinstance(x, dict))
+
+
+def _number(node: dict) -> Fraction:
+    if node.get("subdenomination"):
+        raise _Unknown
+    text = str(node.get("number", "")).replace("_", "")
+    try:
+        return Fraction(int(text, 0)) if text.lower().startswith("0x") else Fraction(text)
+    except (ValueError, ZeroDivisionError):
+        raise _Unknown from None
+
+
+def const_value(node: Any) -> Any:
+    """只由字面量组成的表达式在编译期的值（Solidity 字面量按有理数运算）；无法确定时抛 _Unknown。"""
+    if not isinstance(node, dict):
+        raise _Unknown
+    t = node.get("type")
+    if t == "NumberLiteral":
+        return _number(node)
+    if t == "BooleanLiteral":
+        return bool(node.get("value"))
+    if t == "TupleExpression" and not node.get("isArray") and len(node.get("components") or []) == 1:
+        return const_value(node["components"][0])
+    if t == "UnaryOperation":
+        v = const_value(node.get("subExpression"))
+        op = node.get("operator")
+        if op == "!" and isinstance(v, bool):
+            return not v
+        if op == "-" and isinstance(v, Fraction):
+            return -v
+        raise _Unknown
+    if t == "BinaryOperation":
+        op = node.get("operator")
+        a, b = const_value(node.get("left")), const_value(node.get("right"))
+        if isinstance(a, bool) and isinstance(b, bool) and op in ("&&", "||", "==", "!="):
+            return {"&&": a and b, "||": a or b, "==": a == b, "!=": a != b}[op]
+        if isinstance(a, Fraction) and isinstance(b, Fraction):
+            if op in ("/", "%") and b == 0:
+                raise _Unknown
+            if op == "%" and (a.denominator != 1 or b.denominator != 1):
+                raise _Unknown
+            ops = {
+                "+": lambda: a + b, "-": lambda: a - b, "*": lambda: a * b, "/": lambda: a / b,
+                "%": lambda: Fraction(int(a) - int(b) * int(a / b)),
+                "==": lambda: a == b, "!=": lambda: a != b, "<": lambda: a < b,
+                ">": lambda: a > b, "<=": lambda: a <= b, ">=": lambda: a >= b,
+            }
+            if op in ops:
+                return ops[op]()
+    raise _Unknown
+
+
+class _FunctionCost:
+    """一个函数体的估计：gas 与是否含边界未知的循环。"""
+
+    def __init__(self, estimator: "GasEstimator", contract: str):
+        self.est = estimator
+        self.contract = contract
+        self.locals: Set[str] = set()
+        self.touched: Set[str] = set()
+        self.written: Set[str] = set()
+        self.unbounded = False
+
+    # ---------- 存储 ----------
+    def _storage_root(self, node: dict) -> Optional[str]:
+        while node.get("type") in ("IndexAccess", "MemberAccess", "IndexRangeAccess"):
+            node = node.get("base") or node.get("expression") or {}
+        if node.get("type") == "Identifier":
+            name = node.get("name")
+            if name not in self.locals and name in self.est.state_vars.get(self.contract, ()):
+                return name
+        return None
+
+    def _access(self, var: str) -> int:
+        if var in self.touched:
+            return SLOAD_WARM_GAS
+        self.touched.add(var)
+        return SLOAD_COLD_GAS
+
+    def _slot_cost(self, node: dict) -> int:
+        """左值/右值路径上的下标与成员计算（不含最终的读写）"""
+        cost = 0
+        while node.get("type") in ("IndexAccess", "MemberAccess", "IndexRangeAccess"):
+            if node.get("type") == "IndexAccess":
+                cost += KECCAK_GAS + self.expr(node.get("index"))
+                node = node.get("base") or {}
+            else:
+                node = node.get("base") or node.get("expression") or {}
+        return cost
+
+    def store(self, node: dict) -> int:
+        if not isinstance(node, dict):
+            return 0
+        if node.get("type") == "TupleExpression":
+            return sum(self.store(c) for c in node.get("components") or [] if c)
+        root = self._storage_root(node)
+        if root is None:
+            return LEAF_GAS + self._slot_cost(node)
+        if root in self.written:
+            # 同一交易内再次写入已改过的槽位（dirty）只需热访问的价格
+            return SLOAD_WARM_GAS + self._slot_cost(node)
+        extra = SLOAD_COLD_GAS if root not in self.touched else 0
+        self.touched.add(root)
+        self.written.add(root)
+        return SSTORE_GAS + extra + self._slot_cost(node)
+
+    # ---------- 表达式 ----------
+    def expr(self, node: Any) -> int:
+        if not isinstance(node, dict):
+            return 0
+        t = node.get("type")
+        if t in ("NumberLiteral", "BooleanLiteral", "HexNumber", "ElementaryTypeName"):
+            return LEAF_GAS
+        if t in ("StringLiteral", "HexLiteral"):
+            value = node.get("value") or ""
+            return literal_gas(len(value) // 2 if t == "HexLiteral" else len(value))
+        if t == "Identifier":
+            root = self._storage_root(node)
+            return self._access(root) if root else LEAF_GAS
+        if t in ("IndexAccess", "MemberAccess"):
+            root = self._storage_root(node)
+            if root is not None:
+                return self._access(root) + self._slot_cost(node)
+            return LEAF_GAS + sum(self.expr(c) for c in _children(node))
+        if t == "BinaryOperation":
+            op = node.get("operator")
+            if op in _ASSIGN_OPS:
+                cost = self.expr(node.get("right")) + self.store(node.get("left"))
+                if op != "=":
+                    cost += self.expr(node.get("left")) + OP_GAS.get(op[:-1], LEAF_GAS)
+                return cost
+            return OP_GAS.get(op, LEAF_GAS) + self.expr(node.get("left")) + self.expr(node.get("right"))
+        if t == "UnaryOperation":
+            op = node.get("operator")
+            sub = node.get("subExpression") or {}
+            cost = UNARY_GAS.get(op, LEAF_GAS) + self.expr(sub)
+            if op in ("++", "--", "delete"):
+                cost += self.store(sub)
+            return cost
+        if t == "Conditional":
+            try:
+                taken = node["trueExpression"] if const_value(node.get("condition")) else node["falseExpression"]
+                return JUMP_GAS + self.expr(taken)
+            except _Unknown:
+                return (JUMP_GAS + self.expr(node.get("condition"))
+                        + max(self.expr(node.get("trueExpression")), self.expr(node.get("falseExpression"))))
+        if t == "FunctionCall":
+            return self.call(node)
+        return sum(self.expr(c) for c in _children(node))
+
+    def call(self, node: dict) -> int:
+        callee = node.get("expression") or {}
+        arguments = node.get("arguments") or []
+        ct = callee.get("type")
+        if ct == "Identifier" and callee.get("name") in ("require", "assert"):
+            # 消息只在 revert 时构造
+            return REQUIRE_GAS + self.expr(arguments[0] if arguments else None)
+        args = sum(self.expr(a) for a in arguments)
+        if ct == "Identifier":
+            name = callee.get("name")
+            if name in ("keccak256", "sha256", "ripemd160", "ecrecover"):
+                return HASH_GAS + args
+            body = self.est.function_gas(self.contract, name)
+            return INTERNAL_CALL_GAS + (body or 0) + args
+        if ct == "ElementaryTypeName":   # 类型转换
+            return LEAF_GAS + args
+        if ct == "MemberAccess":
+            member = callee.get("memberName")
+            base = callee.get("expression") or {}
+            base_name = base.get("name") if base.get("type") in ("Identifier", "ElementaryTypeName") else None
+            if base_name in ("string", "bytes") and member == "concat":
+                return concat_gas(len(arguments)) + args
+            if base_name == HELPER_LIBRARY:
+                return HELPER_GAS.get(member, INTERNAL_CALL_GAS) + args
+            if base_name == STRING_LIBRARY and arguments:
+                data = arguments[0].get("value") or ""
+                return STR_DECODE_BASE_GAS + STR_DECODE_BYTE_GAS * (len(data) // 2) + args
+            if base_name == "abi":
+                return ABI_ENCODE_GAS + args
+            if member in ("push", "pop"):
+                return self.store(base) + args
+            if base_name in self.est.libraries:
+                return INTERNAL_CALL_GAS + (self.est.function_gas(base_name, member) or 0) + args
+            return EXTERNAL_CALL_GAS + self.expr(base) + args
+        return INTERNAL_CALL_GAS + args
+
+    # ---------- 语句 ----------
+    def _loop_iterations(self, node: dict) -> Optional[int]:
+        """for (uint i = A; i < B; i++) 形式且 A、B 为字面量时返回迭代次数"""
+        init = node.get("initExpression") or {}
+        cond = node.get("conditionExpression") or {}
+        if init.get("type") != "VariableDeclarationStatement" or cond.get("type") != "BinaryOperation":
+            return None
+        variables = [v for v in init.get("variables") or [] if v]
+        if len(variables) != 1 or (cond.get("left") or {}).get("name") != variables[0].get("name"):
+            return None
+        try:
+            start = const_value(init.get("initialValue"))
+            bound = const_value(cond.get("right"))
+        except _Unknown:
+            return None
+        op = cond.get("operator")
+        if op == "<":
+            return max(0, int(bound - start))
+        if op == "<=":
+            return max(0, int(bound - start) + 1)
+        if op == "!=":
+            return max(0, int(bound - start))
+        return None
+
+    def stmt(self, node: Any) -> int:
+        if not isinstance(node, dict):
+            return 0
+        t = node.get("type")
+        if t == "Block":
+            return sum(self.stmt(s) for s in node.get("statements") or [])
+        if t == "UncheckedStatement":
+            return self.stmt(node.get("block"))
+        if t == "ExpressionStatement":
+            return self.expr(node.get("expression"))
+        if t == "VariableDeclarationStatement":
+            for v in node.get("variables") or []:
+                if v and v.get("name"):
+                    self.locals.add(v["name"])
+            return LEAF_GAS + self.expr(node.get("initialValue"))
+        if t == "IfStatement":
+            try:
+                taken = node.get("trueBody") if const_value(node.get("condition")) else node.get("falseBody")
+                return JUMP_GAS + self.stmt(taken)
+            except _Unknown:
+                return (JUMP_GAS + self.expr(node.get("condition"))
+                        + max(self.stmt(node.get("trueBody")), self.stmt(node.get("falseBody"))))
+        if t == "ForStatement":
+            init = self.stmt(node.get("initExpression"))
+            per_iter = (JUMP_GAS + self.expr(node.get("conditionExpression")) + self.stmt(node.get("body"))
+                        + self.stmt(node.get("loopExpression")))
+            n = self._loop_iterations(node)
+            if n is None:
+                self.unbounded = True
+                n = DEFAULT_LOOP_ITERATIONS
+            return init + n * per_iter + JUMP_GAS
+        if t in ("WhileStatement", "DoWhileStatement"):
+            try:
+                if not const_value(node.get("condition")):
+                    return JUMP_GAS + (self.stmt(node.get("body")) if t == "DoWhileStatement" else 0)
+            except _Unknown:
+                pass
+            self.unbounded = True
+            per_iter = JUMP_GAS + self.expr(node.get("condition")) + self.stmt(node.get("body"))
+            return DEFAULT_LOOP_ITERATIONS * per_iter
+        if t == "ReturnStatement":
+            return JUMP_GAS + self.expr(node.get("expression"))
+        if t == "EmitStatement":
+            call = node.get("eventCall") or {}
+            return EVENT_GAS + sum(self.expr(a) for a in call.get("arguments") or [])
+        if t == "RevertStatement":
+            return 0   # revert 之后不再计费
+        return sum(self.stmt(c) if c.get("type", "").endswith("Statement") or c.get("type") == "Block"
+                   else self.expr(c) for c in _children(node))
+
+
+class GasEstimator:
+    """一棵 JS AST（一个源文件）的估计器。"""
+
+    def __init__(self, ast: dict):
+        self.ast = ast
+        self.contracts: List[dict] = [n for n in (ast.get("children") or [])
+                                      if isinstance(n, dict) and n.get("type") == "ContractDefinition"]
+        self.libraries: Set[str] = {c.get("name") for c in self.contracts if c.get("kind") == "library"}
+        self.state_vars: Dict[str, Set[str]] = {}
+        self._functions: Dict[Tuple[str, str], dict] = {}
+        for c in self.contracts:
+            names: Set[str] = set()
+            for sub in c.get("subNodes") or []:
+                if sub.get("type") == "StateVariableDeclaration":
+                    for v in sub.get("variables") or []:
+                        if not (v.get("isDeclaredConst") or v.get("isImmutable")):
+                            names.add(v.get("name"))
+                elif sub.get("type") == "FunctionDefinition" and sub.get("name"):
+                    # 重载只取第一个
+                    self._functions.setdefault((c.get("name"), sub["name"]), sub)
+            self.state_vars[c.get("name")] = names
+        self._memo: Dict[Tuple[str, str], int] = {}
+        self._active: Set[Tuple[str, str]] = set()
+
+    def function_gas(self, contract: str, name: str) -> Optional[int]:
+        """内部调用的被调函数体开销（同合约优先，其次任意合约）；递归调用返回 None。"""
+        key = (contract, name)
+        if key not in self._functions:
+            key = next((k for k in self._functions if k[1] == name), None)
+            if key is None:
+                return None
+        if key in self._memo:
+            return self._memo[key]
+        if key in self._active:
+            return None
+        self._active.add(key)
+        try:
+            gas, _ = self.estimate_function(key[0], self._functions[key])
+        finally:
+            self._active.discard(key)
+        self._memo[key] = gas
+        return gas
+
+    def estimate_function(self, contract: str, fn: dict) -> Tuple[int, bool]:
+        cost = _FunctionCost(self, contract)
+        for p in (fn.get("parameters") or []) + (fn.get("returnParameters") or []):
+            if isinstance(p, dict) and p.get("name"):
+                cost.locals.add(p["name"])
+        return cost.stmt(fn.get("body")), cost.unbounded
+
+    def functions(self) -> List[Tuple[int, int, str, dict]]:
+        """[(合约序号, 函数序号, "合约.函数", 节点)]，只含有函数体的函数"""
+        out = []
+        for ci, c in enumerate(self.contracts):
+            fi = 0
+            for sub in c.get("subNodes") or []:
+                if sub.get("type") != "FunctionDefinition":
+                    continue
+                if sub.get("body"):
+                    label = sub.get("name") or ("constructor" if sub.get("isConstructor") else
+                                                "receive" if sub.get("isReceiveEther") else "fallback")
+                    out.append((ci, fi, f"{c.get('name')}.{label}", sub))
+                fi += 1
+        return out
+
+    def estimate(self) -> Dict[Tuple[int, int], Tuple[str, int, bool]]:
+        return {(ci, fi): (label, *self.estimate_function(self.contracts[ci].get("name"), fn))
+                for ci, fi, label, fn in self.functions()}
+
+
+def estimate_delta(before_ast: dict, after_ast: dict) -> Dict[str, Any]:
+    """
+    混淆前后每个函数的估计 gas 与差值：
+    {"functions": {"C.f": {"before", "after", "delta", "unbounded"}}, "total_before", "total_after",
+     "total_delta", "max_delta", "max_delta_function"}
+    """
+    before = GasEstimator(before_ast).estimate()
+    after = GasEstimator(after_ast).estimate()
+    functions: Dict[str, Dict[str, Any]] = {}
+    for key, (label, gas0, unbounded0) in before.items():
+        if key not in after:
+            continue
+        _, gas1, unbounded1 = after[key]
+        if label in functions:
+            label = f"{label}#{key[1]}"
+        functions[label] = {"before": gas0, "after": gas1, "delta": gas1 - gas0,
+                            "unbounded": unbounded0 or unbounded1}
+    worst = max(functions.items(), key=lambda kv: kv[1]["delta"], default=(None, {"delta": 0}))
+    total_before = sum(f["before"] for f in functions.values())
+    total_after = sum(f["after"] for f in functions.values())
+    return {
+        "functions": functions,
+        "total_before": total_before,
+        "total_after": total_after,
+        "total_delta": total_after - total_before,
+        "max_delta": worst[1]["delta"],
+        "max_delta_function": worst[0],
+    }
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+--profile-data：按函数的调用频率/gas 数据调整混淆密度（热路径轻混淆）。
+
+支持的输入：
+- 本项目的 JSON：{"functions": [{"contract": "Token", "function": "transfer", "calls": 1200, "gas": 51234}, ...]}
+  或 {"functions": {"Token.transfer": {"calls": 1200, "gas": 51234}, ...}}（gas 为平均每次调用的 gas）；
+- Foundry 的 gas report：`forge test --gas-report --json` 的 JSON，或 `forge test --gas-report` 输出的表格文本。
+
+每个函数的总开销 cost = calls × gas，热度 heat = log(1+cost) / log(1+max_cost) ∈ [0, 1]。
+Pass 的有效密度 = 基础密度 × (1 - heat)；heat ≥ hot_threshold 的函数完全不混淆，
+数据中没有出现的函数（测试中从未调用）保持基础密度。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DEFAULT_HOT_THRESHOLD = 0.8
+
+# (合约名, 函数名, 调用次数, 平均 gas)
+Sample = Tuple[str, str, int, float]
+
+
+@dataclass
+class HotProfile:
+    heat: Dict[Tuple[str, str], float] = field(default_factory=dict)
+    hot_threshold: float = DEFAULT_HOT_THRESHOLD
+    digest: str = ""
+    # 源码中合约名未知时按函数名查找（同名取最热）
+    by_name: Dict[str, float] = field(default_factory=dict)
+
+    def heat_of(self, contract: str, function: str) -> Optional[float]:
+        """
+        精确匹配 (合约, 函数)；其次是数据中没有合约名的同名样本。
+        只有调用方也不知道合约名时才退回 by_name，避免 Token.transfer 的热度波及 Vault.transfer。
+        """
+        h = self.heat.get((contract, function))
+        if h is None:
+            h = self.heat.get(("", function))
+        if h is None and not contract:
+            h = self.by_name.get(function)
+        return h
+
+    def density(self, contract: str, function: str, base: float) -> float:
+        """contract.function 的有效密度。"""
+        h = self.heat_of(contract, function)
+        if h is None:
+            return base
+        if h >= self.hot_threshold:
+            return 0.0
+        return base * (1.0 - h)
+
+    def fingerprint(self) -> Dict[str, Any]:
+        return {"digest": self.digest, "hot_threshold": self.hot_threshold}
+
+
+def node_name(node: Any) -> str:
+    """solnodes 的合约/函数名（Ident 或 str）；匿名时返回空串。"""
+    n = getattr(node, "name", None)
+    if n is None:
+        return ""
+    return str(getattr(n, "value", n))
+
+
+def build_profile(samples: Iterable[Sample], hot_threshold: float = DEFAULT_HOT_THRESHOLD,
+                  digest: str = "") -> HotProfile:
+    cost: Dict[Tuple[str, str], float] = {}
+    for contract, function, calls, gas in samples:
+        # 重载按函数名合并
+        key = (contract, function)
+        cost[key] = cost.get(key, 0.0) + max(calls, 0) * max(gas, 1.0)
+    top = max(cost.values(), default=0.0)
+    profile = HotProfile(hot_threshold=hot_threshold, digest=digest)
+    for key, c in cost.items():
+        h = math.log1p(c) / math.log1p(top) if top > 0 else 0.0
+        profile.heat[key] = h
+        profile.by_name[key[1]] = max(h, profile.by_name.get(key[1], 0.0))
+    return profile
+
+
+def load_profile(path: Path, hot_threshold: float = DEFAULT_HOT_THRESHOLD) -> HotProfile:
+    """读取 path（自动识别格式）；无法识别时抛 ValueError。"""
+    text = Path(path).read_text(encoding="utf-8")
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        samples = list(_foundry_table_samples(text))
+        if not samples:
+            raise ValueError(f"{path}: neither JSON nor a Foundry gas report table")
+    else:
+        if isinstance(data, dict) and "functions" in data:
+            samples = list(_native_samples(data["functions"]))
+        elif isinstance(data, list):
+            samples = list(_foundry_json_samples(data))
+        else:
+            raise ValueError(f"{path}: unrecognized profile data")
+    return build_profile(samples, hot_threshold, digest)
+
+
+def _split_signature(name: str) -> str:
+    # "transfer(address,uint256)" -> "transfer"
+    return name.split("(", 1)[0].strip()
+
+
+def _split_contract(name: str) -> str:
+    # "src/Token.sol:Token" -> "Token"
+    return name.rsplit(":", 1)[-1].strip()
+
+
+def _native_samples(functions: Any) -> Iterable[Sample]:
+    if isinstance(functions, dict):
+        functions = [dict(v, name=k) for k, v in functions.items()]
+    for f in functions:
+        if "name" in f:
+            contract, _, function = f["name"].rpartition(".")
+        else:
+            contract, function = f.get("contract", ""), f["function"]
+        yield contract, _split_signature(function), int(f.get("calls", 1)), float(f.get("gas", 1))
+
+
+def _foundry_json_samples(reports: list) -> Iterable[Sample]:
+    for report in reports:
+        contract = _split_contract(report.get("contract", ""))
+        for sig, stats in (report.get("functions") or {}).items():
+            gas = stats.get("mean", stats.get("avg", stats.get("median", 1)))
+            yield contract, _split_signature(sig), int(stats.get("calls", 1)), float(gas)
+
+
+_CONTRACT_ROW = re.compile(r"^(.+?)\s+contract$", re.IGNORECASE)
+
+
+def _foundry_table_samples(text: str) -> Iterable[Sample]:
+    """
+    `forge test --gas-report` 的表格：每个合约一张表，表头行 "<path>:<Name> contract"，
+    函数段以 "Function Name | min | avg | median | max | # calls" 开头。
+    """
+    contract = ""
+    columns: Optional[Dict[str, int]] = None
+    for line in text.splitlines():
+        if "|" not in line:
+            continue
+        cells = [c.strip() for c in line.strip().strip("|").split("|")]
+        if not cells or set(cells[0]) <= set("-=+:"):
+            continue
+        m = _CONTRACT_ROW.match(cells[0])
+        if m and not any(cells[1:]):
+            contract, columns = _split_contract(m.group(1)), None
+            continue
+        lowered = [c.lower() for c in cells]
+        if lowered[0] == "function name":
+            columns = {c: i for i, c in enumerate(lowered)}
+            continue
+        if columns is None or "# calls" not in columns:
+            continue
+        try:
+            calls = int(cells[columns["# calls"]])
+            gas = float(cells[columns.get("avg", columns.get("median", 1))])
+        except (ValueError, IndexError):
+            continue
+        yield contract, _split_signature(cells[0]), calls, gas
+
+
+class FunctionDensity:
+    """一个 Pass 在一个文件中的逐函数密度（profile 为 None 时恒为基础密度）；记录被调低的函数。"""
+
+    def __init__(self, profile: Optional[HotProfile], base: float):
+        self.profile = profile
+        self.base = base
+        self.lightened: set = set()
+
+    def __call__(self, contract: str, function: str) -> float:
+        if self.profile is None:
+            return self.base
+        d = self.profile.density(contract, function, self.base)
+        if d < self.base:
+            self.lightened.add((contract, function))
+        return d
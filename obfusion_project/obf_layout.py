@@ -1,30 +1,35 @@
 # layout_obfuscate_runtime.py
-# 无硬编码版本：通过 get_grammar_tree(file_path) 解析 AST，
+# 无硬编码版本：通过 parse_grammar_tree(src) 解析 AST，
 # 用传入的 src 做正则定位与文本替换；返回 (new_src, stats)
 
-import subprocess
 import json
+import os
 import re
+import tempfile
+import threading
 import uuid
 
-from typing import Any
+from typing import Any, Dict, Optional
+from dataclasses import dataclass, field
 from pathlib import Path
+from js_parser import get_pool, parse_source
+from edit_buffer import EditBuffer
+from obf_names import NameGenerator, make_namer
+from obf_gas import HELPER_GAS, HELPER_LIBRARY, STRING_LIBRARY
+from obf_log import TRACE, get_logger, journal_buffer
+
+log = get_logger("layout")
 
 # -------------------- JS 桥接 --------------------
-def get_grammar_tree(file_path) -> str:
-    # 调用 Node.js 脚本
-    # 调用 Node.js 脚本（已支持传入目标文件路径）
-    result = subprocess.run(
-        ["node", "./obfusion_project/getGrammarTree.js", file_path],
-        capture_output=True,
-        text=True
-    )
-    if result.returncode != 0 and result.stderr:
-        raise RuntimeError(result.stderr)
-
-    return result.stdout
-
-# -------------------- 你原脚本里的全局对象（保留） --------------------
+def get_grammar_tree(file_path) -> Any:
+    # 经由常驻 Node.js 解析进程（getGrammarTree.js --serve）解析，返回 AST(dict)
+    return get_pool().parse_file(file_path)
+
+def parse_grammar_tree(src: str) -> Any:
+    # 直接把内存中的源码发给解析进程，无需落盘；相同源码命中 AST 缓存
+    return parse_source(src)
+
+# -------------------- 关键字表（只读，可全局共享） --------------------
 predefined_keywords = {
     'pragma', 'solidity', 'contract', 'function', 'public', 'private', 'internal',
     'external', 'pure', 'view', 'payable', 'returns', 'return', 'if', 'else',
@@ -39,213 +44,338 @@ predefined_keywords = {
     'immutable', 'transparent', 'import', 'as', 'from', '_', 'push'
 }
 
+# 其他 Pass 注入的库及其函数保持原名：obf_gas 按这些名字识别辅助函数并套用专门的计价模型，
+# Layout 在管线末尾运行，改名后 --gas-report / --max-gas-delta 就只能按通用库函数体估计
+INJECTED_NAMES = frozenset({HELPER_LIBRARY, STRING_LIBRARY, "decode", *HELPER_GAS})
+
+# 各类定义头部的名字位置：按种类预编译一次，在节点自身的 range 内 search，
+# 不再为每个名字编译正则、也不再从文件开头重新扫描（同名定义也能各自定位）。
+_IDENT = r"(?P<name>[A-Za-z_$][A-Za-z0-9_$]*)"
+_DEF_PATTERNS = {
+    "FunctionDefinition": re.compile(rf"\bfunction\s+{_IDENT}\s*(?=\()", re.ASCII),
+    "ContractDefinition": re.compile(rf"\b(?:contract|interface|library)\s+{_IDENT}", re.ASCII),
+    "StructDefinition": re.compile(rf"\bstruct\s+{_IDENT}", re.ASCII),
+    "EnumDefinition": re.compile(rf"\benum\s+{_IDENT}", re.ASCII),
+    "ModifierDefinition": re.compile(rf"\bmodifier\s+{_IDENT}\s*(?=\(|\{{)", re.ASCII),
+}
+_IDENT_RE = re.compile(_IDENT, re.ASCII)
+
+
 class Match:
-    # 注意：运行时会把 content 设置为当前 src
-    content: str = ""
+    """在给定源码上定位定义名；每次重命名运行持有自己的实例。"""
 
-    @classmethod
-    def match_concretefunction(cls, funcName):
-        pattern = re.compile(rf'\bfunction\s+(?P<name>{re.escape(funcName)})\s*(?=\()', re.ASCII)
-        m = pattern.search(cls.content)
-        return (m.span("name")[0], m.span("name")[1])
+    def __init__(self, content: str):
+        self.content = content
 
-    @classmethod
-    def match_concreteContract(cls, contractName):
-        pattern = re.compile(rf'\bcontract\s+(?P<name>{re.escape(contractName)})\s*\b', re.ASCII)
-        m = pattern.search(cls.content)
-        return (m.span("name")[0], m.span("name")[1])
+    def locate(self, kind: str, name: str, start: int = 0, end: int = None):
+        """在 [start, end) 内找 kind 定义头部的名字，返回 (s, e)；名字不符或找不到时返回 None。"""
+        pattern = _DEF_PATTERNS[kind]
+        m = pattern.search(self.content, start, len(self.content) if end is None else end)
+        if m is None or m.group("name") != name:
+            return None
+        return m.span("name")
 
-    @classmethod
-    def match_concreteStruct(cls, structName):
-        pattern = re.compile(rf'\bstruct\s+(?P<name>{re.escape(structName)})\s*\b', re.ASCII)
-        m = pattern.search(cls.content)
-        return (m.span("name")[0], m.span("name")[1])
+    def locate_node(self, node: dict):
+        """按 JS AST 节点的 range（闭区间）定位其定义名。"""
+        start, end = node.get("range") or (0, len(self.content) - 1)
+        return self.locate(node["type"], node["name"], start, end + 1)
 
-    @classmethod
-    def match_concreteEnum(cls, enumName):
-        pattern = re.compile(rf'\benum\s+(?P<name>{re.escape(enumName)})\s*\b', re.ASCII)
-        m = pattern.search(cls.content)
-        return (m.span("name")[0], m.span("name")[1])
+    def match_concretefunction(self, funcName, start=0, end=None):
+        return self.locate("FunctionDefinition", funcName, start, end)
 
-    @classmethod
-    def match_concreteModifier(cls, modifierName):
-        pattern = re.compile(rf'\bmodifier\s+(?P<name>{re.escape(modifierName)})\s*(?=\(|\{{)', re.ASCII)
-        m = pattern.search(cls.content)
-        return (m.span("name")[0], m.span("name")[1])
-
-# 这些集合在每次调用入口时会被重置
-obfuscatable: set[str] = set()
-mapping: dict[str, str] = {}
-change_log: list[dict] = []
-
-def collect_definitions(node: Any) -> None:
-    if isinstance(node, dict):
-        t = node.get("type")
-        if t in {"FunctionDefinition", "ModifierDefinition", "StructDefinition",
-                 "ContractDefinition", "EnumDefinition"} and node.get("name"):
-            obfuscatable.add(node["name"])
-        elif t == "VariableDeclaration" and node.get("name"):
-            obfuscatable.add(node["name"])
-        for v in node.values():
-            collect_definitions(v)
-    elif isinstance(node, list):
-        for v in node:
-            collect_definitions(v)
-
-def rename(name: str) -> str:
-    if name not in mapping:
-        mapping[name] = f"obf_{uuid.uuid4().hex}"
-    return mapping[name]
-
-def add2Log(newName: str, start: int, end: int):
-    change_log.append({"newName": newName, "start": start, "end": end})
-
-def _process_member_chain(node: dict[str, Any]) -> int:
-    # 重命名链式 MemberAccess，每个段只处理一次
-    if node.get("type") == "Identifier" and "name" in node and node["name"] not in predefined_keywords:
-        start, end = node["range"]
-        new_name = rename(node["name"])
-        add2Log(new_name, start, end + 1)
-        return end + 2
-
-    expression = node.get("expression")
-    if isinstance(expression, dict):
-        current_start = _process_member_chain(expression)
-    else:
-        current_start = node.get("range", [0, 0])[0]
-
-    chain_end = node.get("range", [0, 0])[1]
-    member_name = node.get("memberName")
-    if member_name:
-        new_name = rename(member_name)
-        add2Log(new_name, current_start, chain_end + 1)
-    return chain_end + 2
-
-def _handle_named_node(node: dict[str, Any]) -> None:
-    t = node.get("type")
-
-    if t == "FunctionDefinition" and node.get("name") and node.get("name") not in predefined_keywords:
-        old = node["name"]
-        new = rename(old)
-        s, e = Match.match_concretefunction(old)
-        add2Log(new, s, e); return
-
-    if t == "ModifierDefinition" and node.get("name") and node.get("name") not in predefined_keywords:
-        old = node["name"]
-        new = rename(old)
-        s, e = Match.match_concreteModifier(old)
-        add2Log(new, s, e); return
-
-    if t == "StructDefinition" and node.get("name") and node.get("name") not in predefined_keywords:
-        old = node["name"]
-        new = rename(old)
-        s, e = Match.match_concreteStruct(old)
-        add2Log(new, s, e); return
-
-    if t == "ContractDefinition" and node.get("name") and node.get("name") not in predefined_keywords:
-        old = node["name"]
-        new = rename(old)
-        s, e = Match.match_concreteContract(old)
-        add2Log(new, s, e); return
-
-    if t == "EnumDefinition" and node.get("name") and node.get("name") not in predefined_keywords:
-        old = node["name"]
-        new = rename(old)
-        s, e = Match.match_concreteEnum(old)
-        add2Log(new, s, e); return
-
-    if t == "UserDefinedTypeName" and node.get("name") and node.get("range") and node.get("name") not in predefined_keywords:
-        s, e = node["range"]
-        new = rename(node["name"])
-        add2Log(new, s, e + 1); return
-
-    if t == "UserDefinedTypeName" and node.get("namePath") and node.get("range") and node.get("namePath") not in predefined_keywords:
-        s, e = node["range"]
-        new = rename(node["namePath"])
-        add2Log(new, s, e + 1); return
-
-    if t == "Identifier" and node.get("name") and node.get("name") not in predefined_keywords:
-        s, e = node["range"]
-        new = rename(node["name"])
-        add2Log(new, s, e + 1); return
-
-    if t == "ModifierInvocation" and node.get("name") and node.get("name") not in predefined_keywords:
-        old = node["name"]
-        new = rename(old)
-        s, e = node["range"]
-        # 截到 '(' 或空格为止
-        for i in range(s, e + 1):
-            if (Match.content[i] == '(') or (Match.content[i] == ' '):
-                e = i
-                break
-        add2Log(new, s, e); return
-
-def traverse(node: Any, inside_member: bool = False) -> None:
-    if inside_member:
-        return
-    if isinstance(node, dict):
+    def match_concreteContract(self, contractName, start=0, end=None):
+        return self.locate("ContractDefinition", contractName, start, end)
+
+    def match_concreteStruct(self, structName, start=0, end=None):
+        return self.locate("StructDefinition", structName, start, end)
+
+    def match_concreteEnum(self, enumName, start=0, end=None):
+        return self.locate("EnumDefinition", enumName, start, end)
+
+    def match_concreteModifier(self, modifierName, start=0, end=None):
+        return self.locate("ModifierDefinition", modifierName, start, end)
+
+    def identifier_at(self, pos: int):
+        """pos 处开始的标识符区间 (s, e)；不是标识符时返回 None。"""
+        m = _IDENT_RE.match(self.content, pos)
+        return m.span() if m else None
+
+
+class LayoutRenamer:
+    """
+    实例级的重命名引擎：符号表(obfuscatable)与映射(mapping)挂在实例上，
+    不再使用模块全局变量，因此多个实例可以在不同线程中并发运行。
+    同一个实例可以跨文件复用，从而让整个项目里的同名标识符得到一致的新名字；
+    mapping 的读写有锁保护，复用的实例也可以被多个线程同时调用。
+    新名字由 namer（obf_names 中的生成器）产生；给定种子时输出可逐字节复现。
+
+    restrict=True 时只重命名 mapping 中已有的名字（项目模式下由全局定义索引预先分配），
+    其余标识符保持原样，mapping 只读，可以直接发给各个子进程。
+    """
+
+    def __init__(self, namer: NameGenerator = None, mapping: dict[str, str] = None, restrict: bool = False):
+        self.obfuscatable: set[str] = set()
+        self.mapping: dict[str, str] = dict(mapping or {})
+        self.namer = namer if namer is not None else make_namer("counter")
+        self.restrict = restrict
+        self._lock = threading.Lock()
+
+    def rename(self, name: str) -> Optional[str]:
+        """返回 name 的新名字；restrict 模式下不在 mapping 中的名字、注入库的名字返回 None（不改）。"""
+        if name in INJECTED_NAMES:
+            return None
+        with self._lock:
+            if name not in self.mapping:
+                if self.restrict:
+                    return None
+                self.mapping[name] = self.namer.name_for(name)
+            return self.mapping[name]
+
+    def obfuscate(self, src: str, file_path: str = "<memory>", solidity_ast: Any = None) -> tuple[str, dict]:
+        """
+        - src: 当前要混淆的源码（字符串），直接交给 Node 解析，不经过临时文件
+        - file_path: 仅用于日志显示
+        - solidity_ast: 已解析好的 JS AST（可选，不传则解析 src）
+        """
+        log.log(TRACE, "[Layout] %s", file_path)
+        if solidity_ast is None:
+            solidity_ast = parse_grammar_tree(src)
+
+        # 新名字不得与本文件中已有的标识符相同
+        if not self.restrict:
+            self.namer.reserve_from_source(src)
+        run = _RenameRun(self, src)
+        run.collect_definitions(solidity_ast)
+        with self._lock:
+            self.obfuscatable |= run.obfuscatable
+        run.traverse(solidity_ast)
+
+        buffer = run.edit_buffer()
+        journal_buffer(file_path, "Layout", buffer)
+        new_src = buffer.render()
+        stats = {
+            "changed": new_src != src,
+            "renamed": len(run.change_log),
+            "obfuscatable": len(run.obfuscatable),
+            "spans": buffer.spans(),
+            "edit_ops": len(buffer),
+        }
+        return new_src, stats
+
+
+class _RenameRun:
+    """一次 obfuscate 调用的局部状态：定义集合、正则定位器与编辑日志。"""
+
+    def __init__(self, renamer: LayoutRenamer, src: str):
+        self.renamer = renamer
+        self.src = src
+        self.match = Match(src)
+        self.obfuscatable: set[str] = set()
+        self.change_log: list[dict] = []
+
+    def collect_definitions(self, node: Any) -> None:
+        if isinstance(node, dict):
+            t = node.get("type")
+            if t in {"FunctionDefinition", "ModifierDefinition", "StructDefinition",
+                     "ContractDefinition", "EnumDefinition"} and node.get("name"):
+                self.obfuscatable.add(node["name"])
+            elif t == "VariableDeclaration" and node.get("name"):
+                self.obfuscatable.add(node["name"])
+            for v in node.values():
+                self.collect_definitions(v)
+        elif isinstance(node, list):
+            for v in node:
+                self.collect_definitions(v)
+
+    def rename(self, name: str) -> Optional[str]:
+        return self.renamer.rename(name)
+
+    def add2Log(self, newName: Optional[str], start: int, end: int):
+        if newName is None:
+            return
+        self.change_log.append({"newName": newName, "start": start, "end": end})
+
+    def _process_member_chain(self, node: dict[str, Any]) -> int:
+        # 重命名链式 MemberAccess，每个段只处理一次
+        if node.get("type") == "Identifier" and "name" in node and node["name"] not in predefined_keywords:
+            start, end = node["range"]
+            new_name = self.rename(node["name"])
+            self.add2Log(new_name, start, end + 1)
+            return end + 2
+
+        expression = node.get("expression")
+        if isinstance(expression, dict):
+            current_start = self._process_member_chain(expression)
+        else:
+            current_start = node.get("range", [0, 0])[0]
+
+        chain_end = node.get("range", [0, 0])[1]
+        member_name = node.get("memberName")
+        if member_name:
+            new_name = self.rename(member_name)
+            self.add2Log(new_name, current_start, chain_end + 1)
+        return chain_end + 2
+
+    def _handle_named_node(self, node: dict[str, Any]) -> None:
         t = node.get("type")
-        if t == "MemberAccess":
-            if not inside_member:
-                _process_member_chain(node)
-            traverse(node.get("expression"), inside_member=True)
+
+        if t in _DEF_PATTERNS and node.get("name") and node.get("name") not in predefined_keywords:
+            span = self.match.locate_node(node)
+            if span is not None:
+                self.add2Log(self.rename(node["name"]), span[0], span[1])
+            return
+
+        if t == "UserDefinedTypeName" and node.get("name") and node.get("range") and node.get("name") not in predefined_keywords:
+            s, e = node["range"]
+            new = self.rename(node["name"])
+            self.add2Log(new, s, e + 1); return
+
+        if t == "UserDefinedTypeName" and node.get("namePath") and node.get("range") and node.get("namePath") not in predefined_keywords:
+            s, e = node["range"]
+            new = self.rename(node["namePath"])
+            self.add2Log(new, s, e + 1); return
+
+        if t == "Identifier" and node.get("name") and node.get("name") not in predefined_keywords:
+            s, e = node["range"]
+            new = self.rename(node["name"])
+            self.add2Log(new, s, e + 1); return
+
+        if t == "ModifierInvocation" and node.get("name") and node.get("name") not in predefined_keywords:
+            old = node["name"]
+            new = self.rename(old)
+            # 只替换调用开头的标识符（到 '(' 或空白为止）
+            span = self.match.identifier_at(node["range"][0])
+            if span is not None:
+                self.add2Log(new, span[0], span[1])
+            return
+
+    def traverse(self, node: Any, inside_member: bool = False) -> None:
+        if inside_member:
             return
-        _handle_named_node(node)
-        for v in node.values():
-            traverse(v, inside_member=False)
-    elif isinstance(node, list):
-        for v in node:
-            traverse(v, inside_member)
-
-def _apply_changes(src: str) -> str:
-    """把 change_log 按 start 逆序应用到 src。"""
-    out = src
-    change_log.sort(key=lambda item: item["start"], reverse=True)
-    for c in change_log:
-        out = out[:c["start"]] + c["newName"] + out[c["end"]:]
-    return out
+        if isinstance(node, dict):
+            t = node.get("type")
+            if t == "MemberAccess":
+                if not inside_member:
+                    self._process_member_chain(node)
+                self.traverse(node.get("expression"), inside_member=True)
+                return
+            self._handle_named_node(node)
+            for v in node.values():
+                self.traverse(v, inside_member=False)
+        elif isinstance(node, list):
+            for v in node:
+                self.traverse(v, inside_member)
+
+    def edit_buffer(self) -> EditBuffer:
+        """把 change_log 交给 EditBuffer，由它一次性线性拼接出新源码。"""
+        buffer = EditBuffer(self.src)
+        for c in self.change_log:
+            buffer.replace(c["start"], c["end"], c["newName"])
+        return buffer
+
+    def apply_changes(self) -> str:
+        return self.edit_buffer().render()
+
+
+# -------------------- 项目级重命名：全局定义索引 + 持久化映射 --------------------
+RENAME_MAP_VERSION = 1
+
+
+def collect_definition_names(solidity_ast: Any) -> set[str]:
+    """一个文件 JS AST 中可重命名的定义名（函数/修饰器/结构体/合约/枚举/变量）。"""
+    run = _RenameRun(None, "")
+    run.collect_definitions(solidity_ast)
+    return {n for n in run.obfuscatable if n not in predefined_keywords and n not in INJECTED_NAMES}
+
+
+@dataclass
+class RenameMap:
+    """
+    跨文件一致的重命名映射（原名 -> 新名，整个项目共用），以紧凑 JSON 保存在磁盘上。
+    哪些文件需要重新混淆由增量构建清单（manifest.py）判断。
+    generation 在映射从头建立时生成，之后只追加新名字时保持不变；
+    映射文件被删除或因策略/种子变化而重建时换新，LayoutPass 把它计入指纹。
+    """
+    strategy: str
+    seed: Optional[int]
+    mapping: Dict[str, str] = field(default_factory=dict)
+    generation: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["RenameMap"]:
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != RENAME_MAP_VERSION:
+            return None
+        # 旧版映射文件没有 generation：视为新的一代，已有输出全部重跑一次
+        return cls(data["strategy"], data.get("seed"), data.get("mapping", {}),
+                   data.get("generation") or uuid.uuid4().hex)
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"version": RENAME_MAP_VERSION, "strategy": self.strategy, "seed": self.seed,
+                           "generation": self.generation, "mapping": self.mapping},
+                          separators=(",", ":"), ensure_ascii=False, sort_keys=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def compatible_with(self, strategy: str, seed: Optional[int]) -> bool:
+        return self.strategy == strategy and self.seed == seed
+
+
+def build_project_map(sources: Dict[str, str], asts: Dict[str, Any], strategy: str = "counter",
+                      seed: Optional[int] = None, previous: Optional[RenameMap] = None) -> RenameMap:
+    """
+    基于所有文件的定义名建立全局映射：名字按字典序分配，与文件顺序/并行度无关；
+    previous 与本次策略、种子一致时沿用其中已有的映射，只为新出现的名字分配新名。
+    :param sources: 相对路径 -> 源码
+    :param asts:    相对路径 -> JS AST（解析失败的文件可缺省）
+    """
+    namer = make_namer(strategy, seed)
+    keep = previous is not None and previous.compatible_with(strategy, seed)
+    rmap = RenameMap(strategy, seed, dict(previous.mapping), previous.generation) if keep else RenameMap(strategy, seed)
+    namer.adopt(rmap.mapping)
+    for src in sources.values():
+        namer.reserve_from_source(src)
+
+    names: set[str] = set()
+    for ast in asts.values():
+        names |= collect_definition_names(ast)
+    for name in sorted(names):
+        rmap.mapping[name] = namer.name_for(name)
+    return rmap
+
 
 # -------------------- 入口：无硬编码版本 --------------------
-def layout_obfuscate(src: str, file_path: str) -> tuple[str, dict]:
+def layout_obfuscate(src: str, file_path: str = "<memory>", renamer: LayoutRenamer = None,
+                     solidity_ast: Any = None) -> tuple[str, dict]:
     """
-    - src: 当前要混淆的源码（字符串）
-    - file_path: 让 Node 解析的“同一份源”的磁盘路径（由外部保证 file_path 内容与 src 一致）
-      * 若你在 pipeline 里已经把 src 写到了一个临时路径 tmp.sol, 则把 tmp.sol 的绝对路径传进来即可
+    - src: 当前要混淆的源码（字符串），直接交给 Node 解析，不经过临时文件
+    - file_path: 仅用于日志显示
+    - renamer: 复用的 LayoutRenamer（跨文件保持一致命名）；不传则每次新建
+    - solidity_ast: 已解析好的 JS AST（可选）
     """
-    # 1) 重置全局状态
-    obfuscatable.clear()
-    mapping.clear()
-    change_log.clear()
-    Match.content = src  # 供正则定位
-
-    # 2) 解析 AST(JSON)
-    print(file_path)
-    ast_json = get_grammar_tree(file_path)
-    solidity_ast = json.loads(ast_json)
-
-    # 3) 收集与遍历（与你原脚本一致）
-    collect_definitions(solidity_ast)
-    traverse(solidity_ast)
-
-    # 4) 应用替换
-    new_src = _apply_changes(src)
-    stats = {
-        "changed": new_src != src,
-        "renamed": len(change_log),
-        "obfuscatable": len(obfuscatable),
-    }
-    return new_src, stats
+    if renamer is None:
+        renamer = LayoutRenamer()
+    return renamer.obfuscate(src, file_path, solidity_ast)
 
 # -------------------- 可选：本地测试 CLI --------------------
 if __name__ == "__main__":
     import argparse
     ap = argparse.ArgumentParser(description="Layout obfuscation (no hardcode)")
-    ap.add_argument("--file", required=True, help="要混淆的 .sol 文件路径（将传给 getGrammarTree.js）")
+    ap.add_argument("--file", required=True, help="要混淆的 .sol 文件路径")
+    ap.add_argument("--names", default="counter", help="新名字策略: counter / hash / confusable")
+    ap.add_argument("--seed", type=int, default=None)
     args = ap.parse_args()
 
     p = Path(args.file)
     src_text = p.read_text(encoding="utf-8")
-    out_text, info = layout_obfuscate(src_text, str(p))
+    out_text, info = layout_obfuscate(src_text, str(p), LayoutRenamer(make_namer(args.names, args.seed)))
     print("stats:", info)
     print("========obfuscated code========")
     print(out_text)
\ No newline at end of file
@@ -5,11 +5,14 @@ if __name__ == '__main__':
 import random
 import re
 
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from dataclasses import dataclass
 from solidity_parser import filesys
 from solidity_parser.ast import symtab, solnodes
+from edit_buffer import EditBuffer, trailing_whitespace
+from obf_gas import (CONCAT_ARG_GAS, CONCAT_BASE_GAS, STR_DECODE_BASE_GAS, STR_DECODE_BYTE_GAS, STRING_LIBRARY,
+                     concat_gas, literal_gas)
 
 files_to_obfuscate = ['FloatingFunc.sol', 'TestContract.sol', 'TheContract.sol']
 project_dir = Path('solidity_project/contracts')
@@ -29,6 +32,208 @@ class Obfuscation:
     obfuscated_expr: solnodes.Expr
     start_index: int
     end_index: int
+    # 非 chars 编码直接给出生成的代码
+    obfuscated_code: Optional[str] = None
+
+
+# =========================================================
+# 编码策略：按混淆强度由弱到强
+#   chunk  - 切成 2~4 个字符的片段，string.concat 拼接（每次最多 MAX_CONCAT_ARGS 个参数）
+#   chars  - 逐字符切分，嵌套 string.concat（原实现）
+#   rotate - 循环左移后的 hex 常量，运行时由 ObfStr.decode 还原
+#   xor    - 滚动密钥异或后的 hex 常量，同一个 ObfStr.decode 还原
+# auto 在满足 --literal-strength 的策略中选估计 gas 最低的一个；
+# 任何策略的估计 gas/字节码大小超过上限时，改选上限内最便宜的策略，都超过则保留原字面量。
+# =========================================================
+
+LITERAL_STRATEGIES = ("chunk", "chars", "rotate", "xor")
+AUTO_STRATEGY = "auto"
+DEFAULT_LITERAL_STRATEGY = "chars"
+# auto 模式下允许的最弱策略（--literal-strength 的默认值），与默认的固定策略相互独立
+DEFAULT_LITERAL_STRENGTH = "chars"
+MAX_CONCAT_ARGS = 8     # 参数过多时 string.concat 会 stack too deep
+
+# 字节码大小的粗略模型（字节）；ObfStr 库本身每个文件只计一次，不计入单个字面量
+LITERAL_SIZE = 8
+CONCAT_SIZE = 90
+CONCAT_ARG_SIZE = 25
+DECODE_CALL_SIZE = 20
+
+STRING_HELPER = f"""library {STRING_LIBRARY} {{
+    function decode(bytes memory data, uint8 key, bool rotate) internal pure returns (string memory) {{
+        unchecked {{
+            for (uint256 i = 0; i < data.length; ++i) {{
+                uint8 c = uint8(data[i]);
+                if (rotate) {{
+                    data[i] = bytes1((c >> key) | (c << (8 - key)));
+                }} else {{
+                    data[i] = bytes1(c ^ key);
+                    key = key * 29 + 7;
+                }}
+            }}
+        }}
+        return string(data);
+    }}
+}}"""
+
+
+@dataclass
+class EncodedLiteral:
+    strategy: str
+    code: Optional[str]     # chars 用表达式树生成，其余直接给出代码
+    expr: Optional[solnodes.Expr]
+    gas: int
+    size: int
+
+
+def quote_string(value: str) -> str:
+    """生成普通字符串字面量：可打印 ASCII 原样，引号/反斜杠转义，其余字节一律 \\xNN。"""
+    out = []
+    for b in value.encode("utf-8", "surrogateescape"):
+        ch = chr(b)
+        if ch in ('"', "\\"):
+            out.append("\\" + ch)
+        elif 0x20 <= b < 0x7f:
+            out.append(ch)
+        else:
+            out.append(f"\\x{b:02x}")
+    return '"' + "".join(out) + '"'
+
+
+_TOKEN_PART = re.compile(r'(unicode|hex)?("(?:[^"\\\r\n]|\\.)*"|\'(?:[^\'\\\r\n]|\\.)*\')\s*', re.S)
+_SIMPLE_ESCAPES = {"n": b"\n", "r": b"\r", "t": b"\t", "\\": b"\\", "'": b"'", '"': b'"', "\n": b""}
+
+
+def decode_string_token(token: str) -> Optional[str]:
+    """
+    把源码中的字符串字面量（可含 unicode 前缀与相邻拼接）还原成实际内容；
+    非字节串用 surrogateescape 保留。hex 字面量或无法识别时返回 None。
+    """
+    data = bytearray()
+    pos = 0
+    token = token.strip()
+    while pos < len(token):
+        m = _TOKEN_PART.match(token, pos)
+        if m is None or m.group(1) == "hex":
+            return None
+        body = m.group(2)[1:-1]
+        i = 0
+        while i < len(body):
+            ch = body[i]
+            if ch != "\\":
+                data += ch.encode("utf-8")
+                i += 1
+                continue
+            esc = body[i + 1]
+            if esc == "x":
+                data.append(int(body[i + 2:i + 4], 16))
+                i += 4
+            elif esc == "u":
+                data += chr(int(body[i + 2:i + 6], 16)).encode("utf-8")
+                i += 6
+            elif esc in _SIMPLE_ESCAPES:
+                data += _SIMPLE_ESCAPES[esc]
+                i += 2
+            else:
+                return None
+        pos = m.end()
+    return data.decode("utf-8", "surrogateescape")
+
+
+def _concat_tree(parts: List[str]) -> Tuple[str, int, int]:
+    """拼接 parts（已是代码），返回 (代码, concat 调用次数, 参数总数)"""
+    calls = args = 0
+    while len(parts) > 1:
+        grouped = []
+        for i in range(0, len(parts), MAX_CONCAT_ARGS):
+            group = parts[i:i + MAX_CONCAT_ARGS]
+            if len(group) == 1:
+                grouped.append(group[0])
+                continue
+            grouped.append(f"string.concat({', '.join(group)})")
+            calls += 1
+            args += len(group)
+        parts = grouped
+    return parts[0], calls, args
+
+
+def _encode_chars(value: str) -> EncodedLiteral:
+    n = len(value)
+    expr = _create_manual_concat_method(list(value), value)
+    gas = sum(literal_gas(len(c.encode("utf-8", "surrogateescape"))) for c in value) + (n - 1) * concat_gas(2)
+    size = n * LITERAL_SIZE + len(value.encode("utf-8", "surrogateescape")) \
+        + (n - 1) * (CONCAT_SIZE + 2 * CONCAT_ARG_SIZE)
+    return EncodedLiteral("chars", None, expr, gas, size)
+
+
+def _encode_chunk(value: str) -> EncodedLiteral:
+    pieces = []
+    i = 0
+    limit = max(1, (len(value) + 1) // 2)   # 至少切成两段
+    while i < len(value):
+        k = min(random.randint(2, 4), limit)
+        pieces.append(value[i:i + k])
+        i += k
+    code, calls, args = _concat_tree([quote_string(p) for p in pieces])
+    nbytes = [len(p.encode("utf-8", "surrogateescape")) for p in pieces]
+    gas = sum(literal_gas(b) for b in nbytes) + calls * CONCAT_BASE_GAS + args * CONCAT_ARG_GAS
+    size = len(pieces) * LITERAL_SIZE + sum(nbytes) + calls * CONCAT_SIZE + args * CONCAT_ARG_SIZE
+    return EncodedLiteral("chunk", code, None, gas, size)
+
+
+def _encode_bytes(value: str, strategy: str) -> EncodedLiteral:
+    data = value.encode("utf-8", "surrogateescape")
+    encoded = bytearray()
+    if strategy == "rotate":
+        key = random.randint(1, 7)
+        for b in data:
+            encoded.append(((b << key) | (b >> (8 - key))) & 0xFF)
+        rotate = "true"
+    else:
+        key = k = random.randint(1, 255)
+        for b in data:
+            encoded.append(b ^ k)
+            k = (k * 29 + 7) & 0xFF
+        rotate = "false"
+    code = f'{STRING_LIBRARY}.decode(hex"{encoded.hex()}", {key}, {rotate})'
+    gas = literal_gas(len(data)) + STR_DECODE_BASE_GAS + STR_DECODE_BYTE_GAS * len(data)
+    size = LITERAL_SIZE + len(data) + DECODE_CALL_SIZE
+    return EncodedLiteral(strategy, code, None, gas, size)
+
+
+def encode_literal(value: str, strategy: str) -> EncodedLiteral:
+    if strategy == "chars":
+        return _encode_chars(value)
+    if strategy == "chunk":
+        return _encode_chunk(value)
+    if strategy in ("rotate", "xor"):
+        return _encode_bytes(value, strategy)
+    raise ValueError(f"unknown literal strategy {strategy!r}; choose from {LITERAL_STRATEGIES + (AUTO_STRATEGY,)}")
+
+
+def choose_encoding(value: str, strategy: str = DEFAULT_LITERAL_STRATEGY, strength: str = DEFAULT_LITERAL_STRENGTH,
+                    max_gas: Optional[int] = None, max_size: Optional[int] = None) -> Optional[EncodedLiteral]:
+    """按策略与上限选择编码；所有策略都超过上限时返回 None（保留原字面量）。"""
+    if not value:
+        return None
+
+    def fits(e: EncodedLiteral) -> bool:
+        return (max_gas is None or e.gas <= max_gas) and (max_size is None or e.size <= max_size)
+
+    def cheapest(cands: List[EncodedLiteral]) -> Optional[EncodedLiteral]:
+        cands = [e for e in cands if fits(e)]
+        # 代价相同时取更强的策略
+        return min(cands, key=lambda e: (e.gas, e.size, -LITERAL_STRATEGIES.index(e.strategy))) if cands else None
+
+    if strategy != AUTO_STRATEGY:
+        chosen = encode_literal(value, strategy)
+        if fits(chosen):
+            return chosen
+        return cheapest([encode_literal(value, s) for s in LITERAL_STRATEGIES if s != strategy])
+    encodings = [encode_literal(value, s) for s in LITERAL_STRATEGIES]
+    floor = LITERAL_STRATEGIES.index(strength)
+    strong = cheapest(encodings[floor:])
+    return strong if strong is not None else cheapest(encodings[:floor])
 
 
 def obfuscate_string_literal(literal):
@@ -67,15 +272,6 @@ def find_string_literals_in_ast(node):
 
     return string_literals
 
-INDENT_REG = re.compile(r'[ \t]+$')
-
-def get_trailing_whitespace(s):
-    match = INDENT_REG.search(s)
-    if match:
-        return match.group(0)
-    else:
-        return ""
-
 LINE_REG = re.compile("\r?\n")
 
 def indent_by(s, indentation):
@@ -88,31 +284,40 @@ def generate_obfuscated_code(obfuscated_expr):
         return f"string.concat({left_code}, {right_code})"
 
     elif isinstance(obfuscated_expr, solnodes.Literal):
-        return f'"{obfuscated_expr.value}"' if isinstance(obfuscated_expr.value, str) else str(obfuscated_expr.value)
+        return quote_string(obfuscated_expr.value) if isinstance(obfuscated_expr.value, str) else str(obfuscated_expr.value)
 
     else:
         return "/* obfuscated_string */"
 
 def modify_text_with_obfuscation(src_code, obfuscations):
-    reverse_sorted_obfuscations = sorted(obfuscations, key=lambda x: -x.start_index)
-    current_source_code = src_code
+    return obfuscation_buffer(src_code, obfuscations).render()
 
-    for obf in reverse_sorted_obfuscations:
-        left_part = current_source_code[:obf.start_index]
-        right_part = current_source_code[obf.end_index:]
+def obfuscation_buffer(src_code, obfuscations) -> EditBuffer:
+    # 所有替换都基于原始下标，由 EditBuffer 一次性线性拼接
+    buffer = EditBuffer(src_code)
 
-        obfuscated_code = generate_obfuscated_code(obf.obfuscated_expr)
+    for obf in obfuscations:
+        obfuscated_code = obf.obfuscated_code or generate_obfuscated_code(obf.obfuscated_expr)
 
-        whitespace = get_trailing_whitespace(left_part)
+        whitespace = trailing_whitespace(src_code, obf.start_index)
 
         formatted_obfuscation = indent_by(obfuscated_code, whitespace)
 
-        current_source_code = left_part + formatted_obfuscation + right_part
+        buffer.replace(obf.start_index, obf.end_index, formatted_obfuscation)
 
-    return current_source_code
+    return buffer
 
 def obfuscate_code_literals(src_code, ast_nodes):
+    return plan_code_literals(src_code, ast_nodes).render()
+
+def plan_code_literals(src_code, ast_nodes, strategy=DEFAULT_LITERAL_STRATEGY, strength=DEFAULT_LITERAL_STRENGTH,
+                       max_gas=None, max_size=None, stats: Optional[Dict[str, int]] = None) -> EditBuffer:
+    """
+        strategy/strength/max_gas/max_size 见 choose_encoding；stats 给出时累加每种策略的使用次数、
+        保留原样的字面量数（kept）与估计 gas（gas）
+    """
     obfuscations = []
+    stats = stats if stats is not None else {}
 
     for node in ast_nodes:
         if not node:
@@ -122,16 +327,32 @@ def obfuscate_code_literals(src_code, ast_nodes):
 
         for literal in string_literals:
             if should_obfuscate_literal(literal):
-                obfuscated_expr = obfuscate_string_literal(literal)
+                token = src_code[literal.start_buffer_index:literal.end_buffer_index]
+                value = decode_string_token(token)
+                if value is None:
+                    value = literal.value
+                encoded = choose_encoding(value, strategy, strength, max_gas, max_size)
+                if encoded is None:
+                    stats["kept"] = stats.get("kept", 0) + 1
+                    continue
+                stats[encoded.strategy] = stats.get(encoded.strategy, 0) + 1
+                stats["gas"] = stats.get("gas", 0) + encoded.gas
                 obfuscations.append(Obfuscation(
                     original_literal=literal,
-                    obfuscated_expr=obfuscated_expr,
+                    obfuscated_expr=encoded.expr,
                     start_index=literal.start_buffer_index,
-                    end_index=literal.end_buffer_index
+                    end_index=literal.end_buffer_index,
+                    obfuscated_code=encoded.code
                 ))
 
-    code = modify_text_with_obfuscation(src_code, obfuscations)
-    return code
+    buffer = obfuscation_buffer(src_code, obfuscations)
+    # 用到解码函数且文件中还没有时，在文件末尾追加一次
+    if any(o.obfuscated_code and o.obfuscated_code.startswith(STRING_LIBRARY + ".") for o in obfuscations) \
+            and f"library {STRING_LIBRARY}" not in src_code:
+        tail_sep = "" if src_code.endswith("\n") else "\n"
+        buffer.insert(len(src_code), f"{tail_sep}\n{STRING_HELPER}\n")
+        stats["library_appended"] = 1
+    return buffer
 
 def obfuscate_file(file_name):
     """
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+分级日志与可选的编辑日志（edit journal）。
+
+- 日志：各模块通过 get_logger(__name__) 取 "obf.*" 下的 logger。
+  info    每个文件一行（写出/跳过/失败）及运行汇总（默认）
+  debug   每个 Pass 一行
+  trace   每处编辑一行（热循环中先判断 isEnabledFor，关闭时不做任何格式化）
+- 编辑日志：--journal PATH 时把每处编辑以 JSONL 追加写入 PATH，经缓冲批量写出；
+  未开启时 journal_buffer() 立即返回，不产生任何开销。
+  进程池中的各子进程以追加方式写同一文件，每次写入的都是完整的若干行。
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+
+LOG_ROOT = "obf"
+LOG_LEVELS = {
+    "trace": TRACE,
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "off": logging.CRITICAL + 1,
+}
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOG_ROOT}.{name}")
+
+
+def configure_logging(level: str = "info", stream=None) -> None:
+    """配置 "obf" logger；重复调用只会替换级别与输出流。"""
+    root = logging.getLogger(LOG_ROOT)
+    root.setLevel(LOG_LEVELS[level])
+    root.propagate = False
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    root.addHandler(handler)
+
+
+class EditJournal:
+    """缓冲的 JSONL 写入器：攒够 buffer_bytes 或 flush() 时一次性追加写出。"""
+
+    def __init__(self, path: Path, buffer_bytes: int = 1 << 16):
+        self.path = Path(path)
+        self.buffer_bytes = buffer_bytes
+        self._lines: List[str] = []
+        self._size = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._lines.append(line)
+            self._size += len(line)
+            if self._size >= self.buffer_bytes:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._lines:
+            return
+        data = "".join(self._lines).encode("utf-8")
+        self._lines, self._size = [], 0
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+
+_JOURNAL: Optional[EditJournal] = None
+
+
+def open_journal(path: Optional[Path]) -> None:
+    """开启（path 为 None 时关闭）编辑日志。"""
+    global _JOURNAL
+    flush_journal()
+    _JOURNAL = EditJournal(path) if path else None
+
+
+def journal_enabled() -> bool:
+    return _JOURNAL is not None
+
+
+def journal_buffer(file: str, pass_name: str, buffer) -> None:
+    """把一个 EditBuffer 中的全部编辑记入编辑日志（未开启时直接返回）。"""
+    journal = _JOURNAL
+    if journal is None:
+        return
+    for e in buffer.edits():
+        journal.record({"file": file, "pass": pass_name, "start": e.start, "end": e.end, "text": e.text})
+
+
+def flush_journal() -> None:
+    if _JOURNAL is not None:
+        _JOURNAL.flush()
+
+
+atexit.register(flush_journal)
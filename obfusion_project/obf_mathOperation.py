@@ -1,7 +1,51 @@
 import dataclasses
 import random
+import re
 import warnings
-from typing import Optional, Final
+from typing import Dict, Optional, Final
+
+# OperationPass 的改写方式：
+#   mba  - 混合布尔-算术恒等式（默认）：操作数无副作用时直接内联，否则调用同样用恒等式实现的库函数
+#   asm  - 内联汇编实现的库函数（同样是恒等式，保留 0.8 的溢出/除零 Panic）
+#   loop - 旧的逐位进位循环库函数（gas 随数值位数增长，仅为兼容保留）
+OP_MODES = ("mba", "asm", "loop")
+DEFAULT_OP_MODE = "mba"
+
+_HELPER_NAMES = {
+    "mba": {"+": "mbaAdd", "-": "mbaSub", "*": "mbaMul", "/": "mbaDiv", "%": "mbaMod"},
+    "asm": {"+": "asmAdd", "-": "asmSub", "*": "asmMul", "/": "asmDiv", "%": "asmMod"},
+    "loop": {"+": "bitwiseAdd", "-": "bitwiseSubtractByAdd", "*": "bitwiseMultiply",
+             "/": "bitwiseDivide", "%": "bitwiseModulo"},
+}
+
+# 内联用的恒等式，{x} {y} 为（无副作用的）操作数文本。对无符号数：原运算不溢出时各中间项也不溢出，
+# 原运算溢出/下溢时改写后同样 revert，因此 checked 语义不变
+_MBA_TEMPLATES = {
+    "+": ("(({x} ^ {y}) + 2 * ({x} & {y}))",
+          "(({x} | {y}) + ({x} & {y}))"),
+    "-": ("(({x} ^ {y}) - 2 * (({x} ^ {y}) & {y}))",
+          "(({x} ^ ({x} & {y})) - (({x} ^ {y}) & {y}))"),
+    "*": ("(({x} & {y}) * ({x} | {y}) + ({x} ^ ({x} & {y})) * ({y} ^ ({x} & {y})))",),
+    "/": ("(({x} - {x} % {y}) / {y})",),
+    "%": ("({x} - {y} * ({x} / {y}))",),
+}
+
+# 对有符号数同样精确的形式（按整数恒等，各中间项的绝对值都不超过原运算的操作数/结果）：
+# 操作数不能证明为无符号时只用这些；其余运算保持原样
+_SIGN_SAFE_TEMPLATES = {
+    "+": ("(({x} | {y}) + ({x} & {y}))",),
+    "-": ("(({x} ^ ({x} & {y})) - (({x} ^ {y}) & {y}))",),
+}
+
+_UINT_RE = re.compile(r"^uint(\d*)$")
+# 总是 uint256 的内建成员：只在基是对应的全局对象时成立（结构体字段 s.value 可以是任何类型）；
+# x.length 对任何基都按 uint256，<address>.balance 另行判断
+_GLOBAL_UINT256_MEMBERS = {
+    "msg": frozenset({"value"}),
+    "tx": frozenset({"gasprice"}),
+    "block": frozenset({"timestamp", "number", "chainid", "basefee", "gaslimit", "difficulty",
+                        "prevrandao", "blobbasefee"}),
+}
 
 
 @dataclasses.dataclass
@@ -91,6 +135,75 @@ function bitwiseModulo(uint256 _x, uint256 _y) internal pure returns (uint256) {
 """
     max_value: Final[int] = 2 ** 16  # 最大支持的数值范围
 
+    # ================ MBA 库函数（O(1) gas） ================
+    pre_defined_mba_helpers: Final[str] = """
+function mbaAdd(uint256 _x, uint256 _y) internal pure returns (uint256) {
+    // x + y == (x ^ y) + 2 * (x & y)
+    return (_x ^ _y) + 2 * (_x & _y);
+}
+
+function mbaSub(uint256 _x, uint256 _y) internal pure returns (uint256) {
+    // x - y == (x ^ y) - 2 * (~x & y)，其中 ~x & y == (x ^ y) & y
+    return (_x ^ _y) - 2 * ((_x ^ _y) & _y);
+}
+
+function mbaMul(uint256 _x, uint256 _y) internal pure returns (uint256) {
+    // x * y == (x & y) * (x | y) + (x & ~y) * (~x & y)
+    uint256 __both__ = _x & _y;
+    return __both__ * (_x | _y) + (_x ^ __both__) * (_y ^ __both__);
+}
+
+function mbaDiv(uint256 _x, uint256 _y) internal pure returns (uint256) {
+    return (_x - _x % _y) / _y;
+}
+
+function mbaMod(uint256 _x, uint256 _y) internal pure returns (uint256) {
+    return _x - _y * (_x / _y);
+}
+"""
+
+    # 内联汇编版本：与 MBA 相同的恒等式，溢出/除零时抛出与 checked 运算相同的 Panic(0x11/0x12)
+    pre_defined_asm_helpers: Final[str] = """
+function asmAdd(uint256 _x, uint256 _y) internal pure returns (uint256 r) {
+    assembly {
+        r := add(xor(_x, _y), shl(1, and(_x, _y)))
+        if lt(r, _x) { mstore(0x00, shl(224, 0x4e487b71)) mstore(0x04, 0x11) revert(0x00, 0x24) }
+    }
+}
+
+function asmSub(uint256 _x, uint256 _y) internal pure returns (uint256 r) {
+    assembly {
+        if gt(_y, _x) { mstore(0x00, shl(224, 0x4e487b71)) mstore(0x04, 0x11) revert(0x00, 0x24) }
+        let d := xor(_x, _y)
+        r := sub(d, shl(1, and(d, _y)))
+    }
+}
+
+function asmMul(uint256 _x, uint256 _y) internal pure returns (uint256 r) {
+    assembly {
+        let b := and(_x, _y)
+        r := add(mul(b, or(_x, _y)), mul(xor(_x, b), xor(_y, b)))
+        if iszero(or(iszero(_x), eq(div(r, _x), _y))) {
+            mstore(0x00, shl(224, 0x4e487b71)) mstore(0x04, 0x11) revert(0x00, 0x24)
+        }
+    }
+}
+
+function asmDiv(uint256 _x, uint256 _y) internal pure returns (uint256 r) {
+    assembly {
+        if iszero(_y) { mstore(0x00, shl(224, 0x4e487b71)) mstore(0x04, 0x12) revert(0x00, 0x24) }
+        r := div(sub(_x, mod(_x, _y)), _y)
+    }
+}
+
+function asmMod(uint256 _x, uint256 _y) internal pure returns (uint256 r) {
+    assembly {
+        if iszero(_y) { mstore(0x00, shl(224, 0x4e487b71)) mstore(0x04, 0x12) revert(0x00, 0x24) }
+        r := sub(_x, mul(_y, div(_x, _y)))
+    }
+}
+"""
+
     # ================ 位运算混淆 ================
     """
     结构（关心）：
@@ -698,3 +811,148 @@ function bitwiseModulo(uint256 _x, uint256 _y) internal pure returns (uint256) {
 
         return func_def, call_node
 
+    # ================ MBA 改写引擎 ================
+    @classmethod
+    def is_constant_operation(cls, binary_operation_node: dict) -> bool:
+        """两侧都是数字字面量：编译期按有理数折叠（如 7 / 2），不做改写"""
+        return (binary_operation_node.get("left", {}).get("type") == "NumberLiteral"
+                and binary_operation_node.get("right", {}).get("type") == "NumberLiteral")
+
+    @classmethod
+    def is_side_effect_free(cls, node: dict) -> bool:
+        """
+        操作数可否在恒等式中重复出现：标识符、数字字面量、对它们的成员访问（msg.value、s.x）及其括号形式。
+        函数调用、下标访问（重复读存储）、赋值、++/-- 等一律不算。
+        """
+        t = node.get("type")
+        if t in ("Identifier", "NumberLiteral"):
+            return True
+        if t == "MemberAccess":
+            return cls.is_side_effect_free(node.get("expression") or {})
+        if t == "TupleExpression" and not node.get("isArray"):
+            components = node.get("components") or []
+            return len(components) == 1 and components[0] is not None and cls.is_side_effect_free(components[0])
+        return False
+
+    @classmethod
+    def type_width(cls, type_name: Optional[dict]) -> Optional[int]:
+        """JS AST 类型节点是 uintN 时返回 N，否则 None"""
+        if not isinstance(type_name, dict) or type_name.get("type") != "ElementaryTypeName":
+            return None
+        m = _UINT_RE.match(type_name.get("name") or "")
+        return int(m.group(1) or 256) if m else None
+
+    @classmethod
+    def _indexed_type(cls, node: dict, types: Dict[str, dict]) -> Optional[dict]:
+        """下标访问 a[i] / m[k][j] 的元素类型节点（映射的值类型 / 数组的元素类型）"""
+        base = node.get("base") or {}
+        if base.get("type") == "Identifier":
+            container = types.get(base.get("name"))
+        elif base.get("type") == "IndexAccess":
+            container = cls._indexed_type(base, types)
+        else:
+            return None
+        if not isinstance(container, dict):
+            return None
+        if container.get("type") == "Mapping":
+            return container.get("valueType")
+        if container.get("type") == "ArrayTypeName":
+            return container.get("baseTypeName")
+        return None
+
+    @classmethod
+    def unsigned_width(cls, node: dict, types: Dict[str, dict]) -> Optional[int]:
+        """
+        表达式可证明为无符号整数时返回其位宽；数字字面量返回 0（类型随另一侧）；
+        无法证明（有符号、类型未知）时返回 None。types 为可见的 名字 -> 类型节点。
+        """
+        t = node.get("type")
+        if t == "NumberLiteral":
+            return 0
+        if t == "Identifier":
+            return cls.type_width(types.get(node.get("name")))
+        if t == "MemberAccess":
+            return cls._member_width(node, types)
+        if t == "IndexAccess":
+            return cls.type_width(cls._indexed_type(node, types))
+        if t == "TupleExpression" and not node.get("isArray"):
+            components = node.get("components") or []
+            if len(components) == 1 and isinstance(components[0], dict):
+                return cls.unsigned_width(components[0], types)
+            return None
+        if t == "FunctionCall":
+            # 类型转换 uintN(x)
+            return cls.type_width(node.get("expression"))
+        if t == "BinaryOperation" and node.get("operator") in ("+", "-", "*", "/", "%", "**", "&", "|", "^"):
+            return cls.combined_width(cls.unsigned_width(node.get("left") or {}, types),
+                                      cls.unsigned_width(node.get("right") or {}, types))
+        return None
+
+    @classmethod
+    def _member_width(cls, node: dict, types: Dict[str, dict]) -> Optional[int]:
+        member = node.get("memberName")
+        base = node.get("expression") or {}
+        if member == "length":
+            return 256
+        if base.get("type") == "Identifier" and base.get("name") not in types \
+                and member in _GLOBAL_UINT256_MEMBERS.get(base.get("name"), ()):
+            return 256
+        if member == "balance" and cls._is_address(base, types):
+            return 256
+        return None
+
+    @classmethod
+    def _is_address(cls, node: dict, types: Dict[str, dict]) -> bool:
+        """声明为 address 的标识符，或 address(...) 转换"""
+        t = node.get("type")
+        if t == "Identifier":
+            decl = types.get(node.get("name")) or {}
+            return decl.get("type") == "ElementaryTypeName" and decl.get("name") == "address"
+        if t == "FunctionCall":
+            callee = node.get("expression") or {}
+            return callee.get("type") == "ElementaryTypeName" and callee.get("name") == "address"
+        return False
+
+    @classmethod
+    def combined_width(cls, left: Optional[int], right: Optional[int]) -> Optional[int]:
+        """两侧都可证明无符号时运算结果的位宽（0 表示两侧都是字面量）"""
+        if left is None or right is None:
+            return None
+        return max(left, right)
+
+    @classmethod
+    def can_inline(cls, operator: str, unsigned: bool) -> bool:
+        return operator in (_MBA_TEMPLATES if unsigned else _SIGN_SAFE_TEMPLATES)
+
+    @classmethod
+    def mba_inline(cls, operator: str, left_text: str, right_text: str, unsigned: bool = True) -> str:
+        """
+        按恒等式改写 left operator right（随机选一种等价形式）；操作数必须无副作用。
+        unsigned=False 时只用对有符号数也精确的形式（见 can_inline）。
+        """
+        template = random.choice((_MBA_TEMPLATES if unsigned else _SIGN_SAFE_TEMPLATES)[operator])
+        return template.format(x=left_text, y=right_text)
+
+    @classmethod
+    def helper_name(cls, operator: str, mode: str = DEFAULT_OP_MODE) -> str:
+        return _HELPER_NAMES[mode][operator]
+
+    @classmethod
+    def helper_library(cls, mode: str = DEFAULT_OP_MODE, lib_name: str = "ObfOps") -> str:
+        """mode 对应的完整库源码"""
+        if mode == "mba":
+            body = cls.pre_defined_mba_helpers
+        elif mode == "asm":
+            body = cls.pre_defined_asm_helpers
+        elif mode == "loop":
+            body = "\n".join([
+                cls.pre_defined_bitwise_adder,
+                cls.pre_defined_bitwise_subtractor_simpler,
+                cls.pre_defined_bitwise_subtractor,
+                cls.pre_defined_bitwise_multiplier,
+                cls.pre_defined_bitwise_divider,
+                cls.pre_defined_bitwise_modulo,
+            ])
+        else:
+            raise ValueError(f"unknown op mode {mode!r}; choose from {OP_MODES}")
+        return f"library {lib_name} {{\n" + body.strip("\n") + "\n}"
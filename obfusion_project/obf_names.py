@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+重命名用的新名字生成器（取代 obf_<uuid4> 形式的 36 字符标识符）。
+
+策略：
+- counter:    带种子的短计数器名（base-N，字母表按种子打乱），最短、可复现；
+- hash:       由 (种子, 原名) 的哈希派生，与重命名顺序无关，跨运行稳定；
+- confusable: 只由 l/I/1/O/0 这类易混淆字形组成的名字。
+所有策略都保证新名字不与 Solidity 关键字/内建名、已登记的现有标识符以及已发出的名字冲突。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+import threading
+
+from typing import Dict, Iterable, Optional, Set
+
+# Solidity 关键字、保留字与常见内建名；新名字一律避开
+SOLIDITY_RESERVED = frozenset({
+    # 关键字 / 保留字
+    'abstract', 'after', 'alias', 'anonymous', 'apply', 'as', 'assembly', 'auto', 'break',
+    'calldata', 'case', 'catch', 'constant', 'constructor', 'continue', 'contract', 'copyof',
+    'default', 'define', 'delete', 'do', 'else', 'emit', 'enum', 'error', 'event', 'external',
+    'fallback', 'false', 'final', 'for', 'from', 'function', 'global', 'if', 'immutable',
+    'implements', 'import', 'in', 'indexed', 'inline', 'interface', 'internal', 'is', 'let',
+    'library', 'macro', 'mapping', 'match', 'memory', 'modifier', 'mutable', 'new', 'null',
+    'of', 'override', 'partial', 'payable', 'pragma', 'private', 'promise', 'public', 'pure',
+    'receive', 'reference', 'relocatable', 'return', 'returns', 'revert', 'sealed', 'sizeof',
+    'static', 'storage', 'struct', 'supports', 'switch', 'throw', 'true', 'try', 'type',
+    'typedef', 'typeof', 'unchecked', 'unicode', 'using', 'var', 'view', 'virtual', 'while',
+    'solidity', 'hex', 'leave',
+    # 基本类型
+    'address', 'bool', 'string', 'bytes', 'byte', 'int', 'uint', 'fixed', 'ufixed',
+    # 单位
+    'wei', 'gwei', 'ether', 'seconds', 'minutes', 'hours', 'days', 'weeks', 'years',
+    # 全局变量与函数
+    'abi', 'block', 'msg', 'tx', 'now', 'this', 'super', 'gasleft', 'blockhash', 'blobhash',
+    'keccak256', 'sha256', 'sha3', 'ripemd160', 'ecrecover', 'addmod', 'mulmod',
+    'selfdestruct', 'suicide', 'require', 'assert', '_',
+})
+
+_SIZED_TYPE_RE = re.compile(r"(?:u?int|bytes|u?fixed)\d+(?:x\d+)?")
+_IDENT_RE = re.compile(r"[A-Za-z_$][A-Za-z0-9_$]*")
+
+_LETTERS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_ALNUM = _LETTERS + "0123456789"
+
+
+def is_reserved(name: str) -> bool:
+    return name in SOLIDITY_RESERVED or _SIZED_TYPE_RE.fullmatch(name) is not None
+
+
+def _encode(n: int, first: str, rest: str, min_len: int = 1) -> str:
+    """把非负整数编码成标识符：首字符取自 first，其余取自 rest。"""
+    # 先按长度分段，保证每个长度段内的名字都用满，再在段内编码
+    length = min_len
+    count = len(first) * len(rest) ** (length - 1)
+    while n >= count:
+        n -= count
+        length += 1
+        count = len(first) * len(rest) ** (length - 1)
+    chars = []
+    for _ in range(length - 1):
+        n, r = divmod(n, len(rest))
+        chars.append(rest[r])
+    chars.append(first[n])
+    return "".join(reversed(chars))
+
+
+class NameGenerator:
+    """
+    名字生成器基类：name_for(原名) 返回新名字，同一原名总得到同一新名字。
+    子类只需实现 _candidate(原名, 第几次尝试)。线程安全。
+    """
+
+    strategy = "base"
+
+    def __init__(self, seed: Optional[int] = None, prefix: str = ""):
+        self.seed = seed
+        self.prefix = prefix
+        self._rng = random.Random(seed)
+        self._reserved: Set[str] = set()
+        self._issued: Dict[str, str] = {}
+        self._taken: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def reserve(self, names: Iterable[str]) -> None:
+        """登记已有标识符，新名字不会与之相同。"""
+        with self._lock:
+            self._reserved.update(names)
+
+    def reserve_from_source(self, src: str) -> None:
+        """登记源码中出现的全部标识符（含注释/字符串中的，宁可多避开）。"""
+        self.reserve(_IDENT_RE.findall(src))
+
+    def adopt(self, mapping: Dict[str, str]) -> None:
+        """沿用已有的 原名 -> 新名 映射（如上次运行保存的映射），之后发出的名字不会与之冲突。"""
+        with self._lock:
+            self._issued.update(mapping)
+            self._taken.update(mapping.values())
+
+    def _available(self, name: str) -> bool:
+        return not (name in self._taken or name in self._reserved or is_reserved(name))
+
+    def name_for(self, original: str) -> str:
+        with self._lock:
+            new = self._issued.get(original)
+            if new is None:
+                attempt = 0
+                new = self.prefix + self._candidate(original, attempt)
+                while not self._available(new):
+                    attempt += 1
+                    new = self.prefix + self._candidate(original, attempt)
+                self._issued[original] = new
+                self._taken.add(new)
+            return new
+
+    def _candidate(self, original: str, attempt: int) -> str:
+        raise NotImplementedError
+
+
+class CounterNames(NameGenerator):
+    """按首次出现顺序编号：a, b, …, aa, ab …；字母表按种子打乱。"""
+
+    strategy = "counter"
+
+    def __init__(self, seed: Optional[int] = None, prefix: str = ""):
+        super().__init__(seed, prefix)
+        letters = list(_LETTERS)
+        self._rng.shuffle(letters)
+        rest = letters + list("0123456789")
+        self._first = "".join(letters)
+        self._rest = "".join(rest)
+        self._counter = 0
+
+    def _candidate(self, original: str, attempt: int) -> str:
+        n = self._counter
+        self._counter += 1
+        return _encode(n, self._first, self._rest)
+
+
+class HashNames(NameGenerator):
+    """由 sha256(种子, 原名) 派生，与调用顺序无关；冲突时加长。"""
+
+    strategy = "hash"
+    MIN_LEN = 6
+
+    def _candidate(self, original: str, attempt: int) -> str:
+        digest = hashlib.sha256(f"{self.seed}:{original}".encode("utf-8")).digest()
+        n = int.from_bytes(digest, "big")
+        length = self.MIN_LEN + attempt
+        chars = [_LETTERS[n % len(_LETTERS)]]
+        n //= len(_LETTERS)
+        for _ in range(length - 1):
+            n, r = divmod(n, len(_ALNUM))
+            chars.append(_ALNUM[r])
+        return "".join(chars)
+
+
+class ConfusableNames(NameGenerator):
+    """只用 l/I/O（首字符）与 l/I/1/O/0 组成的名字，肉眼难以区分。"""
+
+    strategy = "confusable"
+    MIN_LEN = 6
+
+    def __init__(self, seed: Optional[int] = None, prefix: str = ""):
+        super().__init__(seed, prefix)
+        first = list("lIO")
+        rest = list("lI1O0")
+        self._rng.shuffle(first)
+        self._rng.shuffle(rest)
+        self._first = "".join(first)
+        self._rest = "".join(rest)
+        self._counter = 0
+
+    def _candidate(self, original: str, attempt: int) -> str:
+        n = self._counter
+        self._counter += 1
+        return _encode(n, self._first, self._rest, self.MIN_LEN)
+
+
+NAME_STRATEGIES = {
+    CounterNames.strategy: CounterNames,
+    HashNames.strategy: HashNames,
+    ConfusableNames.strategy: ConfusableNames,
+}
+
+
+def make_namer(strategy: str = "counter", seed: Optional[int] = None, prefix: str = "") -> NameGenerator:
+    try:
+        cls = NAME_STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(f"unknown name strategy {strategy!r}; choose from {sorted(NAME_STRATEGIES)}") from None
+    return cls(seed=seed, prefix=prefix)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+--profile 的逐 Pass 度量与报告。
+
+每个 Pass 记录：墙钟时间、CPU 时间（当前线程）、tracemalloc 峰值内存、
+该 Pass 期间触发的解析次数与耗时（py/js/symtab，取自 ModuleContext.meta 的差值）、
+node 子进程启动/请求次数与收发字节数、输入/输出字节数以及应用的编辑数。
+记录随 meta 一起返回（可跨进程传递），由 main 汇总成逐文件 + 汇总的 JSON 报告。
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from js_parser import parser_stats
+
+# ModuleContext.meta 中按 Pass 取差值的计数与耗时
+CTX_COUNTERS = ("py_parses", "incremental_rebuilds", "js_parses", "symtab_builds")
+CTX_TIMERS = ("py_parse_s", "js_parse_s", "symtab_s")
+PARSER_COUNTERS = ("spawns", "requests", "bytes_sent", "bytes_received")
+
+
+class PassProbe:
+    """包住一次 Pass 执行：start() 取快照，stop() 返回该 Pass 的度量。"""
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+
+    def start(self, ctx_meta: Dict[str, Any]) -> None:
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._mem0 = tracemalloc.get_traced_memory()[0]
+        self._ctx0 = {k: ctx_meta.get(k, 0) for k in CTX_COUNTERS + CTX_TIMERS}
+        self._parser0 = parser_stats()
+        self._cpu0 = time.thread_time()
+        self._wall0 = time.perf_counter()
+
+    def stop(self, ctx_meta: Dict[str, Any], bytes_in: int, bytes_out: int,
+             edits: Optional[int]) -> Dict[str, Any]:
+        wall = time.perf_counter() - self._wall0
+        cpu = time.thread_time() - self._cpu0
+        rec: Dict[str, Any] = {"wall_s": round(wall, 6), "cpu_s": round(cpu, 6)}
+        if self.trace_memory:
+            rec["peak_mem_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - self._mem0)
+        for k in CTX_COUNTERS:
+            rec[k] = ctx_meta.get(k, 0) - self._ctx0[k]
+        for k in CTX_TIMERS:
+            rec[k] = round(ctx_meta.get(k, 0) - self._ctx0[k], 6)
+        parser1 = parser_stats()
+        for k in PARSER_COUNTERS:
+            rec[f"node_{k}"] = parser1[k] - self._parser0[k]
+        rec["bytes_in"] = bytes_in
+        rec["bytes_out"] = bytes_out
+        rec["edits"] = edits
+        return rec
+
+
+def aggregate(file_profiles: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """按 Pass 名汇总：数值求和，峰值内存取最大值。"""
+    agg: Dict[str, Dict[str, Any]] = {}
+    for passes in file_profiles.values():
+        for rec in passes:
+            slot = agg.setdefault(rec["pass"], {"calls": 0})
+            slot["calls"] += 1
+            for k, v in rec.items():
+                if k == "pass" or not isinstance(v, (int, float)):
+                    continue
+                if k == "peak_mem_bytes":
+                    slot[k] = max(slot.get(k, 0), v)
+                else:
+                    slot[k] = slot.get(k, 0) + v
+    for slot in agg.values():
+        for k in ("wall_s", "cpu_s") + CTX_TIMERS:
+            if k in slot:
+                slot[k] = round(slot[k], 6)
+    return agg
+
+
+def file_totals(passes: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    passes = list(passes)
+    return {
+        "wall_s": round(sum(r["wall_s"] for r in passes), 6),
+        "cpu_s": round(sum(r["cpu_s"] for r in passes), 6),
+        "bytes_in": passes[0]["bytes_in"] if passes else 0,
+        "bytes_out": passes[-1]["bytes_out"] if passes else 0,
+    }
+
+
+def write_report(path: Path, file_profiles: Dict[str, List[Dict[str, Any]]], wall_s: float) -> None:
+    report = {
+        "files": {k: {"passes": v, "total": file_totals(v)} for k, v in sorted(file_profiles.items())},
+        "aggregate": aggregate(file_profiles),
+        "run": {"files": len(file_profiles), "wall_s": round(wall_s, 6)},
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
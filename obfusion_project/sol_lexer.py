@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+共享的 Solidity 轻量词法扫描器。
+
+只关心结构相关的记号：注释、字符串、以及 { } ( ) [ ] ;。
+整个文件由一个预编译正则一次切分成 token 流（数组存储），
+之后括号匹配、块内顶层分号、行号等查询都只是对 token 流/索引表的查找，
+取代各模块里逐字符的注释/字符串/转义状态机。
+"""
+
+from __future__ import annotations
+
+import re
+
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+# token 种类：注释 'c'、字符串 's'，其余为标点字符本身
+KIND_COMMENT = "c"
+KIND_STRING = "s"
+
+_TOKEN_RE = re.compile(
+    r"//[^\n]*"                          # 行注释（不含换行）
+    r"|/\*[\s\S]*?(?:\*/|\Z)"            # 块注释（未闭合则到文件末尾）
+    r"|\"(?:[^\"\\]|\\[\s\S]?)*\"?"      # 双引号字符串（含转义，未闭合则到文件末尾）
+    r"|'(?:[^'\\]|\\[\s\S]?)*'?"         # 单引号字符串
+    r"|[{}()\[\];]"
+)
+
+# 空白与注释的连续序列
+_WS_COMMENT_RE = re.compile(r"(?:[ \t\r\n]+|//[^\n]*|/\*[\s\S]*?(?:\*/|\Z))*")
+
+
+def skip_ws_and_comments(src: str, i: int, end: int) -> int:
+    """从 i 起跳过空白与注释（不越过 end），返回下一个代码字符的位置。"""
+    return _WS_COMMENT_RE.match(src, i, end).end()
+
+
+def line_starts(src: str) -> array:
+    starts = array("q", [0])
+    pos = src.find("\n")
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = src.find("\n", pos + 1)
+    return starts
+
+
+class TokenStream:
+    """
+    一个文件的 token 流及其结构索引：
+    - kinds/starts/ends: 第 k 个 token 的种类与 [start, end) 区间
+    - block_ends:        '{' 位置 -> 匹配的 '}' 位置
+    - block_semis:       '{' 位置 -> 该块内顶层（paren/bracket 深度为 0）分号位置
+    - line_starts:       行首偏移表
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        kinds: List[str] = []
+        starts = array("q")
+        ends = array("q")
+        for m in _TOKEN_RE.finditer(source):
+            s, e = m.span()
+            ch = source[s]
+            if ch == "/":
+                kinds.append(KIND_COMMENT)
+            elif ch == '"' or ch == "'":
+                kinds.append(KIND_STRING)
+            else:
+                kinds.append(ch)
+            starts.append(s)
+            ends.append(e)
+        self.kinds = "".join(kinds)
+        self.starts = starts
+        self.ends = ends
+        self.line_starts = line_starts(source)
+        self.block_ends: Dict[int, int] = {}
+        self.block_semis: Dict[int, List[int]] = {}
+        self._index_blocks()
+
+    def _index_blocks(self) -> None:
+        # 每个打开的 '{' 一帧：[位置, paren 深度, bracket 深度, 顶层分号列表]
+        frames: List[list] = []
+        starts = self.starts
+        for k, ch in enumerate(self.kinds):
+            if ch == "{":
+                frames.append([starts[k], 0, 0, []])
+            elif not frames or ch == KIND_COMMENT or ch == KIND_STRING:
+                continue
+            elif ch == "}":
+                frame = frames.pop()
+                self.block_ends[frame[0]] = starts[k]
+                self.block_semis[frame[0]] = frame[3]
+            else:
+                top = frames[-1]
+                if ch == ";":
+                    if top[1] == 0 and top[2] == 0:
+                        top[3].append(starts[k])
+                elif ch == "(":
+                    top[1] += 1
+                elif ch == ")":
+                    top[1] = max(top[1] - 1, 0)
+                elif ch == "[":
+                    top[2] += 1
+                elif ch == "]":
+                    top[2] = max(top[2] - 1, 0)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def block_end(self, open_brace_idx: int) -> int:
+        """'{' 对应的 '}' 位置；不是代码中的 '{' 或未闭合时返回 -1。"""
+        return self.block_ends.get(open_brace_idx, -1)
+
+    def top_level_semicolons(self, open_brace_idx: int) -> List[int]:
+        return self.block_semis.get(open_brace_idx, [])
+
+    def line_no(self, pos: int) -> int:
+        """pos 所在行号（1 起始）。"""
+        return bisect_right(self.line_starts, pos)
+
+    def line_start(self, pos: int) -> int:
+        return self.line_starts[bisect_right(self.line_starts, pos) - 1]
+
+    def token_at(self, pos: int) -> int:
+        """覆盖 pos 的 token 下标；pos 不在任何 token 内时返回 -1。"""
+        k = bisect_right(self.starts, pos) - 1
+        if k >= 0 and pos < self.ends[k]:
+            return k
+        return -1
+
+    def in_comment_or_string(self, pos: int) -> bool:
+        k = self.token_at(pos)
+        return k >= 0 and self.kinds[k] in (KIND_COMMENT, KIND_STRING)
+
+
+_LAST: Optional[TokenStream] = None
+
+
+def tokenize(source: str) -> TokenStream:
+    """取 source 的 token 流；对同一份源码的连续查询复用同一个结果。"""
+    global _LAST
+    ts = _LAST
+    if ts is None or ts.source is not source:
+        ts = _LAST = TokenStream(source)
+    return ts
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""EditBuffer 的拼接、去重、冲突检测与 spans() 合并。"""
+
+import sys
+
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "obfusion_project"))
+
+from edit_buffer import EditBuffer, EditConflictError  # noqa: E402
+
+SRC = "contract A { uint x; }"
+
+
+def test_render_applies_edits_by_position_not_submission_order():
+    buf = EditBuffer(SRC)
+    buf.replace(18, 19, "y")
+    buf.replace(9, 10, "B")
+    assert buf.render() == "contract B { uint y; }"
+
+
+def test_inserts_at_same_position_keep_call_order_and_precede_replacement():
+    buf = EditBuffer(SRC)
+    buf.replace(9, 10, "B")
+    buf.insert(9, "1")
+    buf.insert(9, "2")
+    assert buf.render() == "contract 12B { uint x; }"
+
+
+def test_identical_replacements_are_merged():
+    buf = EditBuffer(SRC)
+    buf.replace(9, 10, "B")
+    buf.replace(9, 10, "B")
+    assert len(buf) == 2
+    assert len(buf.edits()) == 1
+    assert buf.render() == "contract B { uint x; }"
+
+
+@pytest.mark.parametrize("first,second", [
+    ((9, 12, "X"), (11, 14, "Y")),      # 部分重叠
+    ((9, 14, "X"), (10, 11, "Y")),      # 包含
+    ((9, 10, "B"), (9, 10, "C")),       # 同一区间、不同文本
+    ((9, 12, "X"), (10, 10, "Y")),      # 插入点落在替换内部
+])
+def test_overlapping_edits_conflict(first, second):
+    buf = EditBuffer(SRC)
+    buf.replace(*first)
+    buf.replace(*second)
+    with pytest.raises(EditConflictError):
+        buf.render()
+
+
+def test_out_of_bounds_edit_is_rejected():
+    buf = EditBuffer(SRC)
+    with pytest.raises(EditConflictError):
+        buf.replace(5, len(SRC) + 1, "x")
+
+
+def test_spans_merge_adjacent_and_same_position_edits():
+    buf = EditBuffer(SRC)
+    buf.insert(9, "pre")
+    buf.replace(9, 10, "B")          # 与插入同位置
+    buf.replace(10, 11, "")          # 紧邻上一条
+    buf.replace(18, 19, "yy")        # 不相邻
+    assert buf.spans() == [(9, 11, 4), (18, 19, 2)]
+    assert len(buf) == 4
+
+
+def test_spans_describe_the_rendered_text():
+    buf = EditBuffer(SRC)
+    buf.replace(0, 8, "library")
+    buf.insert(13, "uint y; ")
+    buf.insert(len(SRC), "\n")
+    out = buf.render()
+    # 区间之外的原文在新文本中按累计长度差平移后保持不变
+    delta, prev = 0, 0
+    for start, end, new_len in buf.spans():
+        assert out[prev + delta:start + delta] == SRC[prev:start]
+        delta += new_len - (end - start)
+        prev = end
+    assert out[prev + delta:] == SRC[prev:]
+    assert len(out) == len(SRC) + delta
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+reparse_incremental 回归测试：对同一份修改，增量重建与完整重解析必须得到相同的树
+（节点类型、buffer 下标、行列号逐一相同），且旧 AST 不被修改。
+真实解析器（Zellic solidity_parser）用例基于 solidity_project/src 下的示例合约；
+未安装解析器时跳过，另用一个极简的假解析器覆盖平移/复用逻辑。
+"""
+
+import re
+import sys
+
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "obfusion_project"))
+
+from edit_buffer import EditBuffer  # noqa: E402
+from incremental_ast import _iter_nodes, reparse_incremental  # noqa: E402
+
+SAMPLES = sorted((ROOT / "solidity_project" / "src").glob("*.sol"))
+
+FUNC_BODY_REG = re.compile(r"function\s+(\w+)\s*\([^)]*\)[^{;]*\{")
+PROBE_STMT = "\n        uint256 incrementalProbe = 1;"
+
+
+def dump(roots):
+    """把 AST 摊平成可比较的元组列表。"""
+    out = []
+    for root in roots:
+        for node in _iter_nodes(root):
+            locs = []
+            for attr in ("start_location", "end_location"):
+                loc = getattr(node, attr, None)
+                locs.append(None if loc is None else (loc.line, loc.column))
+            out.append((type(node).__name__, getattr(node, "start_buffer_index", None),
+                        getattr(node, "end_buffer_index", None), *locs))
+    return out
+
+
+def assert_same_as_full_parse(src, buf, roots, parse):
+    before = dump(roots)
+    new_src = buf.render()
+    incremental = reparse_incremental(src, new_src, roots, buf.spans(), parse)
+    assert incremental is not None
+    assert dump(incremental) == dump(parse(new_src))
+    assert dump(roots) == before
+
+
+# ---------------------------------------------------------------- 示例合约（真实解析器）
+
+def sample_corpus():
+    """把全部示例合约拼成一个源文件，返回 (源码, 每个示例的 [start, end) 区间)。"""
+    parts, ranges, pos = [], [], 0
+    for path in SAMPLES:
+        text = path.read_text(encoding="utf-8").rstrip() + "\n\n"
+        parts.append(text)
+        ranges.append((pos, pos + len(text)))
+        pos += len(text)
+    return "".join(parts), ranges
+
+
+def edit_sample(buf, src, start, end):
+    """在区间内第一个函数体开头插入一条语句，并重命名区间内最后一个函数。"""
+    funcs = list(FUNC_BODY_REG.finditer(src, start, end))
+    assert funcs
+    buf.insert(funcs[0].end(), PROBE_STMT)
+    last = funcs[-1]
+    buf.replace(last.start(1), last.end(1), last.group(1) + "Renamed")
+
+
+@pytest.mark.parametrize("edited", [[i] for i in range(len(SAMPLES))] + [[0, len(SAMPLES) - 1]],
+                         ids=[p.stem for p in SAMPLES] + ["first+last"])
+def test_incremental_matches_full_reparse_on_samples(edited):
+    helper = pytest.importorskip("solidity_parser.ast.helper")
+    src, ranges = sample_corpus()
+    roots = helper.make_ast(src)
+    buf = EditBuffer(src)
+    for i in edited:
+        edit_sample(buf, src, *ranges[i])
+    assert_same_as_full_parse(src, buf, roots, helper.make_ast)
+
+
+# ---------------------------------------------------------------- 假解析器
+
+class Loc:
+    def __init__(self, line, column):
+        self.line, self.column = line, column
+
+
+class Node:
+    def __init__(self, src, start, end, children=()):
+        self.start_buffer_index, self.end_buffer_index = start, end
+        self.start_location = Loc(*_line_col(src, start))
+        self.end_location = Loc(*_line_col(src, end))
+        self.children = list(children)
+
+    def get_all_children(self, predicate):
+        for child in self.children:
+            if predicate(child):
+                yield child
+            yield from child.get_all_children(predicate)
+
+
+class Unit(Node):
+    pass
+
+
+class Stmt(Node):
+    pass
+
+
+def _line_col(src, pos):
+    line_start = src.rfind("\n", 0, pos) + 1
+    return src.count("\n", 0, pos) + 1, pos - line_start + 1
+
+
+UNIT_REG = re.compile(r"unit \w+ \{[^}]*\}")
+STMT_REG = re.compile(r"\w+;")
+
+
+def fake_parse(src):
+    units = []
+    for m in UNIT_REG.finditer(src):
+        stmts = [Stmt(src, s.start(), s.end()) for s in STMT_REG.finditer(src, m.start(), m.end())]
+        units.append(Unit(src, m.start(), m.end(), stmts))
+    return units
+
+
+FAKE_SRC = (
+    "unit A { a; }\n"
+    "unit B {\n  b1;\n  b2;\n}\n"
+    "unit C { c; } unit D { d; }\n"
+    "\n"
+    "unit E {\n  e;\n}\n"
+)
+
+
+@pytest.mark.parametrize("edits", [
+    [("insert", FAKE_SRC.index("b1;"), "x;\n  ")],                          # 新增行，后续单元行号平移
+    [("replace", FAKE_SRC.index("c;"), FAKE_SRC.index("c;") + 2, "cc;")],   # 同行后续单元 D 列号平移
+    [("insert", FAKE_SRC.index("a;"), "p; "),
+     ("replace", FAKE_SRC.index("e;"), FAKE_SRC.index("e;") + 2, "e1;\n  e2;")],
+    [("insert", FAKE_SRC.index("\n\nunit E") + 1, "unit N { n; }\n")],      # 间隙中新增单元
+])
+def test_incremental_matches_full_reparse_fake_parser(edits):
+    roots = fake_parse(FAKE_SRC)
+    buf = EditBuffer(FAKE_SRC)
+    for kind, *args in edits:
+        getattr(buf, kind)(*args)
+    assert_same_as_full_parse(FAKE_SRC, buf, roots, fake_parse)
+
+
+def test_unaffected_units_are_shared_or_copied():
+    roots = fake_parse(FAKE_SRC)
+    buf = EditBuffer(FAKE_SRC)
+    buf.insert(FAKE_SRC.index("b1;"), "x;\n  ")
+    new_roots = reparse_incremental(FAKE_SRC, buf.render(), roots, buf.spans(), fake_parse)
+    assert new_roots[0] is roots[0]             # 位于编辑之前，位置不变：直接共享
+    assert new_roots[2] is not roots[2]         # 位于编辑之后：平移的是副本
+    assert roots[2].start_location.line == 6
+
+
+def test_large_edit_falls_back_to_full_parse():
+    roots = fake_parse(FAKE_SRC)
+    buf = EditBuffer(FAKE_SRC)
+    buf.replace(0, len(FAKE_SRC) - 1, "unit Z { z; }")
+    assert reparse_incremental(FAKE_SRC, buf.render(), roots, buf.spans(), fake_parse) is None
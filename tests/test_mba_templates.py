@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+OperationPass 内联恒等式的穷举回归测试：在 8 位宽度上模拟 Solidity 0.8 的 checked 运算，
+改写后的表达式必须与原运算得到相同的值，并且恰好在原运算 revert 时 revert。
+无符号形式（_MBA_TEMPLATES）只对无符号数成立；_SIGN_SAFE_TEMPLATES 对两种符号都必须成立。
+"""
+
+import sys
+
+from itertools import product
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "obfusion_project"))
+
+from obf_mathOperation import _MBA_TEMPLATES, _SIGN_SAFE_TEMPLATES, ConfusingMathOperationClass  # noqa: E402
+
+BITS = 8
+
+
+class Revert(Exception):
+    pass
+
+
+class Checked:
+    """同一类型（BITS 位，有/无符号）的 checked 整数；与 Python int 运算时 int 视为同类型字面量"""
+
+    def __init__(self, value: int, signed: bool):
+        self.signed = signed
+        lo, hi = (-(1 << (BITS - 1)), (1 << (BITS - 1)) - 1) if signed else (0, (1 << BITS) - 1)
+        if not lo <= value <= hi:
+            raise Revert()
+        self.value = value
+
+    def _wrap(self, raw: int) -> "Checked":
+        # 位运算的结果按补码解释
+        raw &= (1 << BITS) - 1
+        if self.signed and raw >= 1 << (BITS - 1):
+            raw -= 1 << BITS
+        return Checked(raw, self.signed)
+
+    def _other(self, other) -> int:
+        return other.value if isinstance(other, Checked) else Checked(other, self.signed).value
+
+    def __add__(self, other):
+        return Checked(self.value + self._other(other), self.signed)
+
+    def __sub__(self, other):
+        return Checked(self.value - self._other(other), self.signed)
+
+    def __mul__(self, other):
+        return Checked(self.value * self._other(other), self.signed)
+
+    def __truediv__(self, other):
+        d = self._other(other)
+        if d == 0:
+            raise Revert()
+        q = abs(self.value) // abs(d)
+        return Checked(q if (self.value < 0) == (d < 0) else -q, self.signed)
+
+    def __mod__(self, other):
+        d = self._other(other)
+        if d == 0:
+            raise Revert()
+        r = abs(self.value) % abs(d)
+        return Checked(-r if self.value < 0 else r, self.signed)
+
+    def __and__(self, other):
+        return self._wrap(self.value & self._other(other))
+
+    def __or__(self, other):
+        return self._wrap(self.value | self._other(other))
+
+    def __xor__(self, other):
+        return self._wrap(self.value ^ self._other(other))
+
+    __radd__ = __add__
+    __rmul__ = __mul__
+    __rand__ = __and__
+    __ror__ = __or__
+    __rxor__ = __xor__
+
+
+def _evaluate(expr: str, x: Checked, y: Checked):
+    try:
+        return eval(expr, {}, {"x": x, "y": y}).value
+    except Revert:
+        return "revert"
+
+
+def _mismatches(op: str, template: str, signed: bool) -> int:
+    lo, hi = (-(1 << (BITS - 1)), 1 << (BITS - 1)) if signed else (0, 1 << BITS)
+    rewritten = template.format(x="x", y="y")
+    bad = 0
+    for a, b in product(range(lo, hi), repeat=2):
+        x, y = Checked(a, signed), Checked(b, signed)
+        if _evaluate(f"x {op} y", x, y) != _evaluate(rewritten, x, y):
+            bad += 1
+    return bad
+
+
+@pytest.mark.parametrize("op,template", [(op, t) for op, ts in _MBA_TEMPLATES.items() for t in ts])
+def test_unsigned_templates_are_exact(op, template):
+    assert _mismatches(op, template, signed=False) == 0
+
+
+@pytest.mark.parametrize("op,template", [(op, t) for op, ts in _SIGN_SAFE_TEMPLATES.items() for t in ts])
+@pytest.mark.parametrize("signed", [False, True])
+def test_sign_safe_templates_are_exact(op, template, signed):
+    assert _mismatches(op, template, signed) == 0
+
+
+def test_unsigned_only_templates_differ_for_signed():
+    # 确认模拟器能发现有符号下的差异（否则上面的测试没有意义）
+    assert _mismatches("+", _MBA_TEMPLATES["+"][0], signed=True) > 0
+
+
+def _ident(name):
+    return {"type": "Identifier", "name": name}
+
+
+def _member(base, member):
+    return {"type": "MemberAccess", "expression": base, "memberName": member}
+
+
+_ADDRESS_CAST = {"type": "FunctionCall", "expression": {"type": "ElementaryTypeName", "name": "address"},
+                 "arguments": [_ident("this")]}
+_TYPES = {"s": {"type": "UserDefinedTypeName", "namePath": "S"},
+          "owner": {"type": "ElementaryTypeName", "name": "address"}}
+
+
+@pytest.mark.parametrize("node,width", [
+    (_member(_ident("msg"), "value"), 256),
+    (_member(_ident("block"), "timestamp"), 256),
+    (_member(_ident("tx"), "gasprice"), 256),
+    (_member(_ident("s"), "length"), 256),
+    (_member(_ident("owner"), "balance"), 256),
+    (_member(_ADDRESS_CAST, "balance"), 256),
+    # 结构体字段只按名字无法确定类型
+    (_member(_ident("s"), "value"), None),
+    (_member(_ident("s"), "balance"), None),
+    (_member(_ident("s"), "number"), None),
+    (_member(_ident("msg"), "sender"), None),
+])
+def test_member_access_width(node, width):
+    assert ConfusingMathOperationClass.unsigned_width(node, _TYPES) == width